@@ -1,19 +1,27 @@
-from accounts.models import User, Token
+from django.conf import settings
+from django.core.cache import cache
+from accounts.models import User, Token, user_cache_key
 
 class PasswordlessAuthenticationBackend(object):
 
     def authenticate(self, uid):
-        try:
-            token = Token.objects.get(uid=uid)
-            return User.objects.get(email=token.email)
-        except User.DoesNotExist:
-            return User.objects.create(email=token.email)
-        except Token.DoesNotExist:
+        email = Token.consume(uid)
+        if email is None:
             return None
+        user, _ = User.objects.get_or_create(email=email)
+        return user
 
 
     def get_user(self, email):
+        # called on every authenticated request; the models' save/delete
+        # signals drop the cached copy
+        key = user_cache_key(email)
+        user = cache.get(key)
+        if user is not None:
+            return user
         try:
-            return User.objects.get(email=email)
+            user = User.objects.get(email=email)
         except User.DoesNotExist:
             return None
+        cache.set(key, user, settings.USER_CACHE_TIMEOUT)
+        return user
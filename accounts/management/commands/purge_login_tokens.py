@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from accounts.models import Token
+
+
+class Command(BaseCommand):
+    help = 'Delete expired login tokens in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        purged = purge_expired_tokens(options['batch_size'])
+        self.stdout.write('Purged %d expired login tokens' % (purged,))
+
+
+def purge_expired_tokens(batch_size):
+    # small batches keep each delete's write lock short, so logins
+    # aren't held up while a large backlog is cleared
+    purged = 0
+    while True:
+        ids = list(Token.objects.expired().values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return purged
+        Token.objects.filter(pk__in=ids).delete()
+        purged += len(ids)
@@ -0,0 +1,28 @@
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = 'Delete expired sessions in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        purged = purge_expired_sessions(options['batch_size'])
+        self.stdout.write('Purged %d expired sessions' % (purged,))
+
+
+def purge_expired_sessions(batch_size):
+    # like clearsessions, but in batches so a large backlog doesn't hold
+    # the write lock for long; cached copies expire on their own
+    purged = 0
+    while True:
+        keys = list(
+            Session.objects.filter(expire_date__lt=timezone.now())
+            .values_list('pk', flat=True)[:batch_size])
+        if not keys:
+            return purged
+        Session.objects.filter(pk__in=keys).delete()
+        purged += len(keys)
@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from accounts.models import QueuedEmail
+from accounts.outbox import send_queued_mail
+
+
+class Command(BaseCommand):
+    help = 'Send queued outgoing email, optionally as a long-running worker'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--loop', action='store_true',
+            help='keep polling the queue instead of exiting once it is empty')
+        parser.add_argument('--interval', type=float, default=2.0,
+            help='seconds to sleep between polls of an empty queue')
+        parser.add_argument('--purge-failed', action='store_true',
+            help='delete messages that ran out of attempts instead of reporting them')
+
+    def handle(self, *args, **options):
+        self.handle_given_up(options['purge_failed'])
+        while True:
+            sent, failed = send_queued_mail(options['batch_size'])
+            if sent or failed:
+                self.stdout.write('Sent %d, failed %d' % (sent, failed))
+            if failed:
+                # a failure may have been some message's last attempt
+                self.handle_given_up(options['purge_failed'])
+            if not options['loop']:
+                return
+            close_old_connections()
+            if sent + failed < options['batch_size']:
+                time.sleep(options['interval'])
+
+    def handle_given_up(self, purge):
+        # messages given up on stay queued, for their last_error, until purged
+        if purge:
+            deleted, _ = QueuedEmail.objects.failed().delete()
+            if deleted:
+                self.stdout.write('Purged %d messages that ran out of attempts' % (deleted,))
+            return
+        count = QueuedEmail.objects.failed().count()
+        if count:
+            self.stderr.write(
+                '%d messages ran out of attempts; --purge-failed deletes them' % (count,))
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.4 on 2026-10-18 03:30
+from __future__ import unicode_literals
+
+import accounts.models
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_auto_20161230_2346'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='token',
+            name='expires',
+            field=models.DateTimeField(db_index=True, default=accounts.models.default_token_expiry),
+        ),
+        migrations.AlterField(
+            model_name='token',
+            name='email',
+            field=models.EmailField(db_index=True, max_length=254),
+        ),
+        migrations.AlterField(
+            model_name='token',
+            name='uid',
+            field=models.CharField(default=uuid.uuid4, max_length=40, unique=True),
+        ),
+    ]
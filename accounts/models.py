@@ -1,6 +1,12 @@
 import uuid
+from datetime import timedelta
+from django.conf import settings
 from django.contrib import auth
-from django.db import models
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
 
 auth.signals.user_logged_in.disconnect(auth.models.update_last_login)
 
@@ -18,6 +24,67 @@ class User(models.Model):
     def __str__(self):
         return "email %s" % self.email
 
+
+def user_cache_key(email):
+    return 'user:%s' % (email,)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_user(sender, instance, **kwargs):
+    cache.delete(user_cache_key(instance.pk))
+
+
+def default_token_expiry():
+    return timezone.now() + timedelta(seconds=settings.LOGIN_TOKEN_LIFETIME)
+
+
+class TokenQuerySet(models.QuerySet):
+
+    def expired(self):
+        return self.filter(expires__lte=timezone.now())
+
+
 class Token(models.Model):
-    email = models.EmailField()
-    uid = models.CharField(default=uuid.uuid4, max_length=40)
+    email = models.EmailField(db_index=True)
+    uid = models.CharField(default=uuid.uuid4, max_length=40, unique=True)
+    expires = models.DateTimeField(default=default_token_expiry, db_index=True)
+
+    objects = TokenQuerySet.as_manager()
+
+    @staticmethod
+    def consume(uid):
+        # single use: whoever deletes the row gets the email, so two
+        # requests racing on the same link can't both log in
+        with transaction.atomic():
+            token = (
+                Token.objects.select_for_update()
+                .filter(uid=uid, expires__gt=timezone.now())
+                .first())
+            if token is None:
+                return None
+            deleted, _ = Token.objects.filter(pk=token.pk).delete()
+        return token.email if deleted else None
+
+
+class QueuedEmailQuerySet(models.QuerySet):
+
+    def due(self):
+        return self.filter(next_attempt__lte=timezone.now()).order_by('next_attempt', 'id')
+
+    def failed(self):
+        return self.filter(next_attempt=None)
+
+
+class QueuedEmail(models.Model):
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    to = models.EmailField()
+    created = models.DateTimeField(auto_now_add=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # null once we've given up on the message
+    next_attempt = models.DateTimeField(default=timezone.now, null=True, db_index=True)
+    last_error = models.TextField(blank=True)
+
+    objects = QueuedEmailQuerySet.as_manager()
@@ -0,0 +1,88 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+
+from accounts.models import QueuedEmail
+
+logger = logging.getLogger(__name__)
+
+
+def queue_mail(subject, message, from_email, recipient_list):
+    QueuedEmail.objects.bulk_create([
+        QueuedEmail(subject=subject, body=message, from_email=from_email, to=to)
+        for to in recipient_list
+    ])
+
+
+def claim_due_mail(batch_size=100):
+    """Claims up to `batch_size` due messages by moving their next attempt
+    on to the end of a lease, so no other worker sends them meanwhile."""
+    now = timezone.now()
+    lease = now + timedelta(seconds=settings.QUEUED_EMAIL_LEASE)
+    ids = list(QueuedEmail.objects.due().values_list('id', flat=True)[:batch_size])
+    # only rows still due are taken, and the lease time, unique to this
+    # claim, tells them apart from any another worker got to first
+    QueuedEmail.objects.filter(id__in=ids, next_attempt__lte=now).update(next_attempt=lease)
+    return list(QueuedEmail.objects.filter(id__in=ids, next_attempt=lease).order_by('id'))
+
+
+def send_queued_mail(batch_size=100, connection=None):
+    """Send due messages over a single connection; returns (sent, failed)."""
+    queued = claim_due_mail(batch_size)
+    if not queued:
+        return 0, 0
+    connection = connection or get_connection()
+    sent, failed = 0, 0
+    try:
+        try:
+            connection.open()
+        except Exception as e:
+            return 0, _retry_all(queued, e)
+        for index, email in enumerate(queued):
+            message = EmailMessage(
+                email.subject, email.body, email.from_email, [email.to],
+                connection=connection)
+            try:
+                connection.send_messages([message])
+            except Exception as e:
+                failed += 1
+                _schedule_retry(email, e)
+                # the SMTP session may be unusable after an error
+                connection.close()
+                try:
+                    connection.open()
+                except Exception as e:
+                    failed += _retry_all(queued[index + 1:], e)
+                    break
+            else:
+                # removed at once, so nothing already sent goes out again
+                # if the batch is cut short
+                QueuedEmail.objects.filter(id=email.id).delete()
+                sent += 1
+    finally:
+        connection.close()
+    return sent, failed
+
+
+def _retry_all(emails, error):
+    # the server couldn't be reached: every message waits as if it had failed
+    for email in emails:
+        _schedule_retry(email, error)
+    return len(emails)
+
+
+def _schedule_retry(email, error):
+    email.attempts += 1
+    email.last_error = str(error)
+    if email.attempts >= settings.QUEUED_EMAIL_MAX_ATTEMPTS:
+        email.next_attempt = None
+        logger.error('Giving up on email %d to %s: %s', email.id, email.to, error)
+    else:
+        delay = settings.QUEUED_EMAIL_RETRY_DELAY * 2 ** (email.attempts - 1)
+        email.next_attempt = timezone.now() + timedelta(seconds=delay)
+        logger.warning('Email %d to %s failed, retrying in %ds: %s',
+                       email.id, email.to, delay, error)
+    email.save(update_fields=['attempts', 'last_error', 'next_attempt'])
@@ -1,4 +1,7 @@
+from datetime import timedelta
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 from accounts.authentication import PasswordlessAuthenticationBackend
 from accounts.models import Token
@@ -29,8 +32,26 @@ class AuthenticateTest(TestCase):
         user = PasswordlessAuthenticationBackend().authenticate(token.uid)
         self.assertEqual(user, existing_user)
 
+
+    def test_returns_None_if_token_expired(self):
+        token = Token.objects.create(
+            email='edith@example.com',
+            expires=timezone.now() - timedelta(minutes=1))
+        user = PasswordlessAuthenticationBackend().authenticate(token.uid)
+        self.assertIsNone(user)
+
+
+    def test_token_cannot_be_used_twice(self):
+        token = Token.objects.create(email='edith@example.com')
+        PasswordlessAuthenticationBackend().authenticate(token.uid)
+        self.assertIsNone(
+            PasswordlessAuthenticationBackend().authenticate(token.uid))
+
 class GetUserTest(TestCase):
 
+    def setUp(self):
+        cache.clear()
+
     def test_gets_user_by_email(self):
         User.objects.create(email='another@example.com')
         desired_user = User.objects.create(email='edith@example.com')
@@ -44,3 +65,27 @@ class GetUserTest(TestCase):
         self.assertIsNone(
             PasswordlessAuthenticationBackend().get_user('edith@example.com')
         )
+
+
+    def test_caches_user_between_calls(self):
+        User.objects.create(email='edith@example.com')
+        backend = PasswordlessAuthenticationBackend()
+        backend.get_user('edith@example.com')
+        with self.assertNumQueries(0):
+            user = backend.get_user('edith@example.com')
+        self.assertEqual(user.email, 'edith@example.com')
+
+
+    def test_deleting_user_invalidates_cache(self):
+        user = User.objects.create(email='edith@example.com')
+        backend = PasswordlessAuthenticationBackend()
+        backend.get_user('edith@example.com')
+        user.delete()
+        self.assertIsNone(backend.get_user('edith@example.com'))
+
+
+    def test_does_not_cache_missing_user(self):
+        backend = PasswordlessAuthenticationBackend()
+        backend.get_user('edith@example.com')
+        User.objects.create(email='edith@example.com')
+        self.assertIsNotNone(backend.get_user('edith@example.com'))
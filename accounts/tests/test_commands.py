@@ -0,0 +1,37 @@
+from datetime import timedelta
+from io import StringIO
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from accounts.models import Token
+
+
+class PurgeLoginTokensTest(TestCase):
+
+    def test_deletes_only_expired_tokens(self):
+        past = timezone.now() - timedelta(minutes=1)
+        for i in range(5):
+            Token.objects.create(email='old%d@example.com' % (i,), expires=past)
+        live = Token.objects.create(email='new@example.com')
+        out = StringIO()
+        call_command('purge_login_tokens', batch_size=2, stdout=out)
+        self.assertEqual(list(Token.objects.all()), [live])
+        self.assertIn('Purged 5', out.getvalue())
+
+
+
+class PurgeSessionsTest(TestCase):
+
+    def test_deletes_only_expired_sessions(self):
+        past = timezone.now() - timedelta(minutes=1)
+        for i in range(5):
+            Session.objects.create(
+                session_key='old%d' % (i,), session_data='', expire_date=past)
+        live = Session.objects.create(
+            session_key='new', session_data='',
+            expire_date=timezone.now() + timedelta(days=1))
+        out = StringIO()
+        call_command('purge_sessions', batch_size=2, stdout=out)
+        self.assertEqual(list(Session.objects.all()), [live])
+        self.assertIn('Purged 5', out.getvalue())
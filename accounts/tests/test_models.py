@@ -1,5 +1,8 @@
+from datetime import timedelta
 from django.test import TestCase
+from django.utils import timezone
 from django.contrib import auth
+from django.db import IntegrityError
 from accounts.models import Token
 from django.contrib.auth import get_user_model
 
@@ -30,3 +33,27 @@ class TokenModelTest(TestCase):
         token1 = Token.objects.create(email='a@b.com')
         token2 = Token.objects.create(email='a@b.com')
         self.assertNotEqual(token1.uid, token2.uid)
+
+    def test_uid_is_unique(self):
+        token = Token.objects.create(email='a@b.com')
+        with self.assertRaises(IntegrityError):
+            Token.objects.create(email='c@d.com', uid=token.uid)
+
+    def test_expires_in_the_future_by_default(self):
+        token = Token.objects.create(email='a@b.com')
+        self.assertGreater(token.expires, timezone.now())
+
+    def test_consume_returns_email_and_deletes_token(self):
+        token = Token.objects.create(email='a@b.com')
+        self.assertEqual(Token.consume(token.uid), 'a@b.com')
+        self.assertFalse(Token.objects.exists())
+
+    def test_consume_only_works_once(self):
+        token = Token.objects.create(email='a@b.com')
+        Token.consume(token.uid)
+        self.assertIsNone(Token.consume(token.uid))
+
+    def test_consume_rejects_expired_token(self):
+        token = Token.objects.create(
+            email='a@b.com', expires=timezone.now() - timedelta(seconds=1))
+        self.assertIsNone(Token.consume(token.uid))
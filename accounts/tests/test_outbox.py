@@ -0,0 +1,145 @@
+from datetime import timedelta
+from io import StringIO
+from smtplib import SMTPException
+from unittest.mock import Mock
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from accounts.models import QueuedEmail
+from accounts.outbox import claim_due_mail, queue_mail, send_queued_mail
+
+
+class QueueMailTest(TestCase):
+
+    def test_queues_one_row_per_recipient(self):
+        queue_mail('subject', 'body', 'from@example.com',
+                   ['a@example.com', 'b@example.com'])
+        self.assertEqual(
+            sorted(QueuedEmail.objects.values_list('to', flat=True)),
+            ['a@example.com', 'b@example.com'])
+
+
+class SendQueuedMailTest(TestCase):
+
+    def test_sends_due_messages_and_removes_them(self):
+        queue_mail('subject', 'body', 'from@example.com', ['a@example.com'])
+        sent, failed = send_queued_mail()
+        self.assertEqual((sent, failed), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['a@example.com'])
+        self.assertEqual(mail.outbox[0].body, 'body')
+        self.assertFalse(QueuedEmail.objects.exists())
+
+    def test_uses_one_connection_for_the_batch(self):
+        queue_mail('subject', 'body', 'from@example.com',
+                   ['a@example.com', 'b@example.com', 'c@example.com'])
+        connection = Mock()
+        send_queued_mail(connection=connection)
+        self.assertEqual(connection.open.call_count, 1)
+        self.assertEqual(connection.send_messages.call_count, 3)
+
+    def test_skips_messages_not_yet_due(self):
+        QueuedEmail.objects.create(
+            subject='s', body='b', from_email='f@example.com', to='a@example.com',
+            next_attempt=timezone.now() + timedelta(minutes=5))
+        self.assertEqual(send_queued_mail(), (0, 0))
+
+    @override_settings(QUEUED_EMAIL_RETRY_DELAY=10, QUEUED_EMAIL_MAX_ATTEMPTS=3)
+    def test_failed_message_backs_off(self):
+        queue_mail('subject', 'body', 'from@example.com', ['a@example.com'])
+        connection = Mock()
+        connection.send_messages.side_effect = SMTPException('nope')
+        self.assertEqual(send_queued_mail(connection=connection), (0, 1))
+        email = QueuedEmail.objects.get()
+        self.assertEqual(email.attempts, 1)
+        self.assertEqual(email.last_error, 'nope')
+        self.assertGreater(email.next_attempt, timezone.now() + timedelta(seconds=5))
+
+        email.next_attempt = timezone.now()
+        email.save()
+        send_queued_mail(connection=connection)
+        email.refresh_from_db()
+        self.assertGreater(email.next_attempt, timezone.now() + timedelta(seconds=15))
+
+    @override_settings(QUEUED_EMAIL_MAX_ATTEMPTS=1)
+    def test_gives_up_after_max_attempts(self):
+        queue_mail('subject', 'body', 'from@example.com', ['a@example.com'])
+        connection = Mock()
+        connection.send_messages.side_effect = SMTPException('nope')
+        send_queued_mail(connection=connection)
+        self.assertIsNone(QueuedEmail.objects.get().next_attempt)
+        self.assertEqual(send_queued_mail(connection=connection), (0, 0))
+
+    def test_failed_connect_backs_off_every_message(self):
+        queue_mail('subject', 'body', 'from@example.com', ['a@example.com', 'b@example.com'])
+        connection = Mock()
+        connection.open.side_effect = OSError('refused')
+        self.assertEqual(send_queued_mail(connection=connection), (0, 2))
+        for email in QueuedEmail.objects.all():
+            self.assertEqual(email.attempts, 1)
+            self.assertGreater(email.next_attempt, timezone.now())
+
+    def test_failed_reconnect_keeps_what_was_sent_deleted(self):
+        queue_mail('subject', 'body', 'from@example.com',
+                   ['a@example.com', 'b@example.com', 'c@example.com'])
+        connection = Mock()
+        connection.send_messages.side_effect = [None, SMTPException('nope')]
+        connection.open.side_effect = [None, OSError('refused')]
+        self.assertEqual(send_queued_mail(connection=connection), (1, 2))
+        self.assertEqual(
+            sorted(QueuedEmail.objects.values_list('to', 'attempts')),
+            [('b@example.com', 1), ('c@example.com', 1)])
+
+    def test_messages_claimed_by_one_worker_are_not_sent_by_another(self):
+        queue_mail('subject', 'body', 'from@example.com', ['a@example.com', 'b@example.com'])
+        other_worker = Mock()
+        connection = Mock()
+        # the other worker polls while this one is halfway through its batch
+        connection.send_messages.side_effect = (
+            lambda messages: send_queued_mail(connection=other_worker))
+        self.assertEqual(send_queued_mail(connection=connection), (2, 0))
+        self.assertFalse(other_worker.send_messages.called)
+
+    def test_claim_leaves_messages_claimed_elsewhere(self):
+        queue_mail('subject', 'body', 'from@example.com', ['a@example.com', 'b@example.com'])
+        first = QueuedEmail.objects.order_by('id').first()
+        QueuedEmail.objects.filter(id=first.id).update(
+            next_attempt=timezone.now() + timedelta(minutes=5))
+        self.assertEqual(
+            [email.to for email in claim_due_mail()], ['b@example.com'])
+        self.assertEqual(claim_due_mail(), [])
+
+    @override_settings(QUEUED_EMAIL_LEASE=60)
+    def test_claimed_messages_are_due_again_after_the_lease(self):
+        queue_mail('subject', 'body', 'from@example.com', ['a@example.com'])
+        email, = claim_due_mail()
+        self.assertGreater(
+            QueuedEmail.objects.get().next_attempt, timezone.now() + timedelta(seconds=50))
+        QueuedEmail.objects.update(next_attempt=timezone.now())
+        self.assertEqual(claim_due_mail(), [email])
+
+    def test_management_command_drains_queue(self):
+        queue_mail('subject', 'body', 'from@example.com', ['a@example.com'])
+        out = StringIO()
+        call_command('send_queued_mail', stdout=out)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn('Sent 1, failed 0', out.getvalue())
+
+    def test_management_command_reports_messages_given_up_on(self):
+        QueuedEmail.objects.create(
+            subject='s', body='b', from_email='f@example.com', to='a@example.com',
+            next_attempt=None)
+        err = StringIO()
+        call_command('send_queued_mail', stdout=StringIO(), stderr=err)
+        self.assertIn('1 messages ran out of attempts', err.getvalue())
+        self.assertTrue(QueuedEmail.objects.exists())
+
+    def test_management_command_purges_messages_given_up_on(self):
+        QueuedEmail.objects.create(
+            subject='s', body='b', from_email='f@example.com', to='a@example.com',
+            next_attempt=None)
+        out = StringIO()
+        call_command('send_queued_mail', purge_failed=True, stdout=out)
+        self.assertIn('Purged 1 messages', out.getvalue())
+        self.assertFalse(QueuedEmail.objects.exists())
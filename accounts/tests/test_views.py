@@ -1,7 +1,8 @@
 from django.test import TestCase
 import accounts
 from unittest.mock import patch, call
-from accounts.models import Token
+from django.core import mail
+from accounts.models import QueuedEmail, Token
 
 class SendLoginEmailViewTest(TestCase):
 
@@ -12,19 +13,29 @@ class SendLoginEmailViewTest(TestCase):
         self.assertRedirects(response, '/')
 
 
-    @patch('accounts.views.send_mail')
-    def test_sends_mail_to_address_from_post(self, mock_send_mail):
+    @patch('accounts.views.queue_mail')
+    def test_sends_mail_to_address_from_post(self, mock_queue_mail):
         self.client.post('/accounts/send_login_email', data={
             'email': 'edith@example.com'
         })
 
-        self.assertEqual(mock_send_mail.called, True)
-        (subject, body, from_email, to_list), kwargs = mock_send_mail.call_args
+        self.assertEqual(mock_queue_mail.called, True)
+        (subject, body, from_email, to_list), kwargs = mock_queue_mail.call_args
         self.assertEqual(subject, 'Your login link for Superlists')
         self.assertEqual(from_email, 'noreply@superlists')
         self.assertEqual(to_list, ['edith@example.com'])
 
 
+    def test_queues_mail_instead_of_sending_it(self):
+        self.client.post('/accounts/send_login_email', data={
+            'email': 'edith@example.com'
+        })
+        self.assertEqual(len(mail.outbox), 0)
+        queued = QueuedEmail.objects.get()
+        self.assertEqual(queued.to, 'edith@example.com')
+        self.assertEqual(queued.subject, 'Your login link for Superlists')
+
+
     def test_adds_success_message(self):
         response = self.client.post('/accounts/send_login_email', data={
             'email': 'edith@example.com'
@@ -46,8 +57,8 @@ class SendLoginEmailViewTest(TestCase):
         self.assertEqual(token.email, 'edith@example.com')
 
 
-    @patch('accounts.views.send_mail')
-    def test_sends_link_to_login_using_token_uid(self, mock_send_mail):
+    @patch('accounts.views.queue_mail')
+    def test_sends_link_to_login_using_token_uid(self, mock_queue_mail):
         self.client.post('/accounts/send_login_email', data={
             'email': 'edith@example.com'
         })
@@ -56,7 +67,7 @@ class SendLoginEmailViewTest(TestCase):
         expected_url = 'http://testserver/accounts/login?token={uid}'.format(
             uid=token.uid
         )
-        (subject, body, from_email, to_list), kwargs = mock_send_mail.call_args
+        (subject, body, from_email, to_list), kwargs = mock_queue_mail.call_args
         self.assertIn(expected_url, body)
 
 
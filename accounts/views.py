@@ -2,11 +2,11 @@ import sys
 from django.contrib.auth import authenticate
 from django.contrib.auth import login as auth_login, logout as auth_logout
 from django.shortcuts import redirect, render
-from django.core.mail import send_mail
 from django.contrib import messages, auth
 from django.core.urlresolvers import reverse
 
 from accounts.models import Token
+from accounts.outbox import queue_mail
 import logging
 
 def send_login_email(request):
@@ -15,7 +15,7 @@ def send_login_email(request):
     url = request.build_absolute_uri(
         reverse('login') + '?token={uid}'.format(uid=str(token.uid)))
     message_body = 'Use this link to log in:\n\n{url}'.format(url=url)
-    send_mail(
+    queue_mail(
         'Your login link for Superlists',
         message_body,
         'noreply@superlists',
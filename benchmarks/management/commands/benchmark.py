@@ -0,0 +1,65 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks import runner
+from benchmarks.scenarios import SCENARIOS
+from benchmarks.stats import compare
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a throwaway database and measure latency, throughput and '
+        'queries per request for each scenario'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenarios', nargs='*',
+            help='scenarios to run (default: all of %s)' % (', '.join(sorted(SCENARIOS)),))
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--lists', type=int, default=10, help='lists per user')
+        parser.add_argument('--items', type=int, default=20, help='items per list')
+        parser.add_argument('--requests', type=int, default=200,
+            help='measured iterations per scenario')
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--conn-max-age', type=int,
+            help='override CONN_MAX_AGE for the run (0 closes the connection after every request)')
+        parser.add_argument('--output', help='write results as JSON to this file')
+        parser.add_argument('--compare', help='JSON results of an earlier run to check against')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+            help='allowed fractional p95 slowdown before --compare fails')
+
+    def handle(self, *args, **options):
+        scenarios = options['scenarios'] or sorted(SCENARIOS)
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            raise CommandError('Unknown scenarios: %s' % (', '.join(sorted(unknown)),))
+
+        results = runner.run(
+            scenarios, options['users'], options['lists'], options['items'],
+            options['requests'], warmup=options['warmup'],
+            random_seed=options['seed'], log=self.report,
+            max_age=options['conn_max_age'])
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)
+            regressions = compare(baseline, results, options['tolerance'])
+            for regression in regressions:
+                self.stderr.write('REGRESSION ' + regression)
+            if regressions:
+                sys.exit(1)
+
+    def report(self, name, result):
+        queries = result['queries_per_request']
+        self.stdout.write(
+            '%-16s p50 %7.2fms  p95 %7.2fms  p99 %7.2fms  %8.1f req/s  %s queries/req  %.2f connects/req' % (
+                name, result['p50_ms'], result['p95_ms'], result['p99_ms'],
+                result['requests_per_second'],
+                '-' if queries is None else '%.1f' % (queries,),
+                result['connections_per_request']))
@@ -0,0 +1,44 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from benchmarks import runner
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure per-request connection overhead by running view_list and '
+        'new_list with connections closed after every request (CONN_MAX_AGE=0) '
+        'and with persistent connections. Runs against whatever database the '
+        'settings point at: the sqlite file by default, or e.g. a local '
+        'PostgreSQL using superlists.backends.postgresql.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--persistent-max-age', type=int, default=600)
+        parser.add_argument('--output', help='write results as JSON to this file')
+
+    def handle(self, *args, **options):
+        scenarios = ['view_list', 'new_list']
+        runs = {}
+        for label, max_age in (('per_request', 0), ('persistent', options['persistent_max_age'])):
+            runs[label] = runner.run(
+                scenarios, users=20, lists_per_user=10, items_per_list=20,
+                iterations=options['requests'], max_age=max_age)
+
+        self.stdout.write('database: %s' % (connection.vendor,))
+        for name in scenarios:
+            before = runs['per_request']['results'][name]
+            after = runs['persistent']['results'][name]
+            self.stdout.write(
+                '%-10s mean %.2fms -> %.2fms (connection overhead %.2fms/request), '
+                'connects/request %.2f -> %.2f' % (
+                    name, before['mean_ms'], after['mean_ms'],
+                    before['mean_ms'] - after['mean_ms'],
+                    before['connections_per_request'], after['connections_per_request']))
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(runs, f, indent=2, sort_keys=True)
@@ -0,0 +1,32 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from benchmarks import render
+from benchmarks.runner import benchmark_database
+
+
+class Command(BaseCommand):
+    help = (
+        'Time rendering list.html for lists of 10, 1,000 and 10,000 items, '
+        'with templates compiled on every render and no fragment cache, and '
+        'with the cached loader and fragment caching production uses.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=list(render.SIZES))
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--output', help='write results as JSON to this file')
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            results = render.run(options['sizes'], options['iterations'])
+        for size, runs in sorted(results.items()):
+            plain, fast = runs['plain'], runs['fast']
+            self.stdout.write(
+                '%6d items  plain p50 %8.2fms  fast p50 %8.2fms  (%.1fx)' % (
+                    size, plain['p50_ms'], fast['p50_ms'], plain['p50_ms'] / fast['p50_ms']))
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2, sort_keys=True)
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from benchmarks.seed import seed
+
+
+class Command(BaseCommand):
+    help = 'Fill an empty database with generated users, lists and items'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--lists', type=int, default=10, help='lists per user')
+        parser.add_argument('--items', type=int, default=20, help='items per list')
+        parser.add_argument('--share-ratio', type=float, default=0.2,
+            help='fraction of lists shared with one other user')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        counts = seed(options['users'], options['lists'], options['items'],
+                      share_ratio=options['share_ratio'], random_seed=options['seed'])
+        self.stdout.write(
+            'Created {users} users, {lists} lists, {items} items, {shares} shares'.format(**counts))
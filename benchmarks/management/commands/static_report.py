@@ -0,0 +1,54 @@
+import re
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management.base import BaseCommand
+from django.template.loader import get_template
+
+ENCODINGS = ('.gz', '.br')
+
+_STATIC_TAG_RE = re.compile(r"""{%\s*static\s+['"]([^'"]+)['"]\s*%}""")
+
+
+def page_assets(template_name='base.html'):
+    """The static files a template links to, in order."""
+    return _STATIC_TAG_RE.findall(get_template(template_name).template.source)
+
+
+def static_sizes(storage, path):
+    """The collected file's name and its size in bytes, uncompressed ('')
+    and for each pre-compressed sibling found."""
+    name = storage.stored_name(path) if hasattr(storage, 'stored_name') else path
+    sizes = {'': storage.size(name)}
+    for encoding in ENCODINGS:
+        if storage.exists(name + encoding):
+            sizes[encoding] = storage.size(name + encoding)
+    return name, sizes
+
+
+class Command(BaseCommand):
+    help = (
+        'Report the size of collected static files as stored and as sent '
+        '(the smallest version nginx serves), by default for the files '
+        'every page loads. Run after collectstatic.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', help='static paths (default: those base.html links to)')
+        # nginx.template.conf only has gzip_static on; the .br files are
+        # written anyway, for when ngx_brotli is built in
+        parser.add_argument('--brotli', action='store_true',
+            help='count .br files as sent, for an nginx with brotli_static on')
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or page_assets()
+        served = ('', '.gz', '.br') if options['brotli'] else ('', '.gz')
+        total = sent = 0
+        for path in paths:
+            name, sizes = static_sizes(staticfiles_storage, path)
+            smallest = min(size for encoding, size in sizes.items() if encoding in served)
+            total += sizes['']
+            sent += smallest
+            self.stdout.write('%-40s %9d bytes  gzip %9s  brotli %9s  sent %9d  %s' % (
+                path, sizes[''], sizes.get('.gz', '-'), sizes.get('.br', '-'), smallest, name))
+        self.stdout.write('%-40s %9d bytes  sent %d (%.0f%%)' % (
+            'total', total, sent, 100.0 * sent / total if total else 0))
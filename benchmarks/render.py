@@ -0,0 +1,86 @@
+"""Micro-benchmark for rendering list.html on its own, away from the rest
+of the request, for lists of a few sizes with every item on one page.
+
+"plain" reads and compiles the templates on every render and has no
+fragment cache to hit; "fast" is production's configuration: the cached
+template loader and {% cache %} fragments in the default cache.
+"""
+from time import time
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+from django.test.utils import override_settings
+
+from benchmarks.stats import summarize
+from lists.cache import get_list_version
+from lists.forms import ExistingListItemForm, ShareListForm
+from lists.models import List
+
+SIZES = (10, 1000, 10000)
+
+DUMMY_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+def _templates(cached):
+    loaders = settings.UNCACHED_TEMPLATE_LOADERS
+    if cached:
+        loaders = [('django.template.loaders.cached.Loader', loaders)]
+    return [
+        dict(engine, APP_DIRS=False, OPTIONS=dict(engine['OPTIONS'], loaders=loaders))
+        for engine in settings.TEMPLATES
+    ]
+
+
+def configurations():
+    """(name, settings overrides) for each way of rendering."""
+    return [
+        ('plain', dict(TEMPLATES=_templates(cached=False), CACHES=DUMMY_CACHES)),
+        ('fast', dict(TEMPLATES=_templates(cached=True), CACHES=settings.CACHES)),
+    ]
+
+
+def make_list(size):
+    list_ = List.create_new('item 0')
+    list_.add_items(['item %d' % (i,) for i in range(1, size)])
+    return List.objects.get(id=list_.id)
+
+
+def render_list(list_, request):
+    # the same context view_list builds, minus the page size cap
+    return render_to_string('list.html', {
+        'list': list_,
+        'page': list_.items_page(page_size=list_.item_set.count()),
+        'list_version': get_list_version(list_.id),
+        'list_cache_timeout': settings.LIST_CACHE_TIMEOUT,
+        'form': ExistingListItemForm(for_list=list_),
+        'share_form': ShareListForm(),
+    }, request=request)
+
+
+def time_renders(list_, iterations, warmup=3):
+    request = RequestFactory().get(list_.get_absolute_url())
+    request.user = AnonymousUser()
+    for _ in range(warmup):
+        render_list(list_, request)
+    latencies = []
+    start = time()
+    for _ in range(iterations):
+        render_start = time()
+        render_list(list_, request)
+        latencies.append(time() - render_start)
+    return summarize(latencies, [], time() - start)
+
+
+def run(sizes=SIZES, iterations=20):
+    """{size: {configuration: stats}} for lists of each size, which are
+    created in whatever database is connected."""
+    results = {}
+    for size in sizes:
+        list_ = make_list(size)
+        results[size] = {}
+        for name, overrides in configurations():
+            with override_settings(**overrides):
+                results[size][name] = time_renders(list_, iterations)
+    return results
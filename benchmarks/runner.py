@@ -0,0 +1,127 @@
+import contextlib
+import os
+import platform
+import shutil
+import tempfile
+from time import time
+
+import django
+from django.core.cache import cache
+from django.db import close_old_connections, connection
+from django.db.backends.signals import connection_created
+from django.test import Client
+from django.test.utils import override_settings
+
+from benchmarks.scenarios import SCENARIOS, Context
+from benchmarks.seed import seed
+from benchmarks.stats import summarize
+
+
+@contextlib.contextmanager
+def benchmark_database():
+    """Run against a fresh, file-backed copy of the schema, the way the
+    test runner would, but on disk so connection handling is realistic."""
+    tmpdir = tempfile.mkdtemp(prefix='superlists-bench-')
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    old_test_name = test_settings.get('NAME')
+    if connection.vendor == 'sqlite':
+        test_settings['NAME'] = os.path.join(tmpdir, 'bench.sqlite3')
+    old_name = connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, serialize=False)
+    try:
+        with override_settings(DEBUG=False, ALLOWED_HOSTS=['testserver']):
+            cache.clear()
+            yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        test_settings['NAME'] = old_test_name
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+class ScenarioError(Exception):
+    pass
+
+
+def _query_count(response):
+    stats = getattr(response.wsgi_request, 'performance_stats', None)
+    return len(stats.queries) if stats is not None else None
+
+
+@contextlib.contextmanager
+def conn_max_age(max_age):
+    old_max_age = connection.settings_dict['CONN_MAX_AGE']
+    connection.settings_dict['CONN_MAX_AGE'] = max_age
+    # close_at is worked out when connecting, so start afresh
+    connection.close()
+    try:
+        yield
+    finally:
+        connection.close()
+        connection.settings_dict['CONN_MAX_AGE'] = old_max_age
+
+
+def _run_once(name, func, ctx):
+    # the test client unhooks close_old_connections from the request
+    # signals, so do what a real server would at the end of a request
+    responses = func(ctx)
+    close_old_connections()
+    for response in responses:
+        # timing error pages would make a broken scenario look fast
+        if not 200 <= response.status_code < 400:
+            raise ScenarioError('%s: %s %s answered %d' % (
+                name, response.wsgi_request.method, response.wsgi_request.get_full_path(),
+                response.status_code))
+    return responses
+
+
+def run_scenario(name, ctx, iterations, warmup=10):
+    func = SCENARIOS[name]
+    for _ in range(warmup):
+        _run_once(name, func, ctx)
+    latencies, queries, connects = [], [], []
+    count_connect = lambda **kwargs: connects.append(1)
+    connection_created.connect(count_connect, weak=False)
+    try:
+        start = time()
+        for _ in range(iterations):
+            request_start = time()
+            responses = _run_once(name, func, ctx)
+            latencies.append(time() - request_start)
+            counts = [_query_count(response) for response in responses]
+            if None not in counts:
+                queries.append(sum(counts))
+        elapsed = time() - start
+    finally:
+        connection_created.disconnect(count_connect)
+    result = summarize(latencies, queries, elapsed)
+    result['connections_per_request'] = len(connects) / iterations if iterations else None
+    return result
+
+
+def run(scenarios, users, lists_per_user, items_per_list, iterations,
+        warmup=10, random_seed=0, log=None, max_age=None):
+    with benchmark_database(), conn_max_age(
+            connection.settings_dict['CONN_MAX_AGE'] if max_age is None else max_age):
+        dataset = seed(users, lists_per_user, items_per_list, random_seed=random_seed)
+        results = {}
+        for name in scenarios:
+            ctx = Context(Client(), dataset, random_seed=random_seed)
+            results[name] = run_scenario(name, ctx, iterations, warmup)
+            if log:
+                log(name, results[name])
+    return {
+        'meta': {
+            'timestamp': time(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'conn_max_age': connection.settings_dict['CONN_MAX_AGE'] if max_age is None else max_age,
+            'users': users,
+            'lists_per_user': lists_per_user,
+            'items_per_list': items_per_list,
+            'iterations': iterations,
+            'warmup': warmup,
+            'random_seed': random_seed,
+        },
+        'results': results,
+    }
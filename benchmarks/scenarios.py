@@ -0,0 +1,138 @@
+"""Benchmark scenarios.
+
+Each scenario makes one iteration's worth of requests through a Django test
+client and returns the responses, so the runner can read their query
+counts. Register new ones with @scenario.
+
+Every list is owned, so scenarios that open one log in and pick from the
+logged-in user's own lists.
+"""
+import random
+
+from django.contrib.auth import get_user_model
+
+from accounts.models import Token
+
+User = get_user_model()
+
+SCENARIOS = {}
+
+
+def scenario(name):
+    def register(func):
+        SCENARIOS[name] = func
+        return func
+    return register
+
+
+class Context(object):
+
+    def __init__(self, client, dataset, random_seed=0):
+        self.client = client
+        self.dataset = dataset
+        self.random = random.Random(random_seed)
+        self.counter = 0
+        self.user_email = None
+
+    def list_id(self):
+        return self.random.choice(self.dataset['list_ids'])
+
+    def email(self):
+        return self.random.choice(self.dataset['emails'])
+
+    def word(self):
+        return self.random.choice(self.dataset['words'])
+
+    def own_list_id(self):
+        self.log_in()
+        return self.random.choice(self.dataset['lists_by_owner'][self.user_email])
+
+    def log_in(self):
+        # once per context; the same user for the rest of the run
+        if self.user_email is None:
+            self.user_email = self.email()
+            self.client.force_login(User.objects.get(email=self.user_email))
+
+    def unique(self, prefix):
+        self.counter += 1
+        return '%s %d' % (prefix, self.counter)
+
+
+@scenario('home_page')
+def home_page(ctx):
+    return [ctx.client.get('/')]
+
+
+@scenario('new_list')
+def new_list(ctx):
+    return [ctx.client.post('/lists/new', data={'text': ctx.unique('new list')})]
+
+
+@scenario('view_list')
+def view_list(ctx):
+    return [ctx.client.get('/lists/%d/' % (ctx.own_list_id(),))]
+
+
+@scenario('add_item')
+def add_item(ctx):
+    return [ctx.client.post(
+        '/lists/%d/' % (ctx.own_list_id(),), data={'text': ctx.unique('new item')})]
+
+
+@scenario('my_lists')
+def my_lists(ctx):
+    ctx.log_in()
+    return [ctx.client.get('/lists/users/%s/' % (ctx.user_email,))]
+
+
+@scenario('share_list')
+def share_list(ctx):
+    return [ctx.client.post(
+        '/lists/%d/share' % (ctx.own_list_id(),), data={'share_with': ctx.email()})]
+
+
+@scenario('login')
+def login(ctx):
+    email = ctx.email()
+    sent = ctx.client.post('/accounts/send_login_email', data={'email': email})
+    uid = Token.objects.filter(email=email).order_by('-id').values_list('uid', flat=True)[0]
+    logged_in = ctx.client.get('/accounts/login?token=%s' % (uid,))
+    return [sent, logged_in]
+
+
+@scenario('search')
+def search(ctx):
+    ctx.log_in()
+    return [ctx.client.get('/lists/search', {'q': ctx.word()})]
+
+
+# JSON API counterparts of the HTML scenarios above, to compare against them
+
+@scenario('api_view_list')
+def api_view_list(ctx):
+    list_id = ctx.own_list_id()
+    return [
+        ctx.client.get('/api/lists/%d/' % (list_id,)),
+        ctx.client.get('/api/lists/%d/items/' % (list_id,)),
+    ]
+
+
+@scenario('api_batch_lists')
+def api_batch_lists(ctx):
+    # lists the user may not view are left out, so ask for some they can
+    # and some they can't
+    ids = ctx.random.sample(ctx.dataset['list_ids'], min(20, len(ctx.dataset['list_ids'])))
+    ids[0] = ctx.own_list_id()
+    return [ctx.client.get('/api/lists/?ids=%s' % (','.join(str(id_) for id_ in ids),))]
+
+
+@scenario('api_add_item')
+def api_add_item(ctx):
+    return [ctx.client.post(
+        '/api/lists/%d/items/' % (ctx.own_list_id(),), data={'text': ctx.unique('new api item')})]
+
+
+@scenario('api_search')
+def api_search(ctx):
+    ctx.log_in()
+    return [ctx.client.get('/api/search/', {'q': ctx.word()})]
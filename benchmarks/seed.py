@@ -0,0 +1,92 @@
+import random
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from lists import fts
+from lists.management.commands.rebuild_search_index import rebuild_item_terms
+from lists.models import Item, List, normalize_item_text
+
+User = get_user_model()
+
+BATCH_SIZE = 400
+
+# item texts are a couple of these plus a number, so searches have
+# something realistic to match
+WORDS = (
+    'buy', 'milk', 'eggs', 'bread', 'butter', 'cheese', 'apples', 'coffee',
+    'tea', 'rice', 'pasta', 'call', 'email', 'book', 'dentist', 'doctor',
+    'mum', 'dad', 'plumber', 'bank', 'pay', 'rent', 'bills', 'tax', 'fix',
+    'bike', 'car', 'tyres', 'wash', 'clean', 'kitchen', 'garden', 'mow',
+    'lawn', 'water', 'plants', 'walk', 'dog', 'feed', 'cat', 'read', 'write',
+    'report', 'slides', 'meeting', 'review', 'code', 'deploy', 'server',
+    'backup', 'photos', 'plan', 'trip', 'tickets', 'hotel', 'pack', 'bags',
+    'birthday', 'present', 'card', 'party', 'gym', 'run', 'swim', 'yoga',
+)
+
+
+def user_email(index):
+    return 'bench-user-%d@example.com' % (index,)
+
+
+def item_text(rng, number):
+    return '%s %s %d' % (rng.choice(WORDS), rng.choice(WORDS), number)
+
+
+def seed(users, lists_per_user, items_per_list, share_ratio=0.2, random_seed=0):
+    """Create users, their lists and items in bulk; returns counts.
+
+    Names are written straight onto List, and revisions/caches aren't
+    touched, so a big dataset can be loaded in a few seconds.
+    """
+    rng = random.Random(random_seed)
+    with transaction.atomic():
+        emails = [user_email(i) for i in range(users)]
+        User.objects.bulk_create(
+            [User(email=email) for email in emails], batch_size=BATCH_SIZE)
+
+        first_id = (List.objects.order_by('-id').values_list('id', flat=True).first() or 0) + 1
+        lists = [
+            List(id=first_id + n, owner_id=email, name=item_text(rng, 0))
+            for n, email in enumerate(
+                email for email in emails for _ in range(lists_per_user))
+        ]
+        List.objects.bulk_create(lists, batch_size=BATCH_SIZE)
+
+        items = []
+        for list_ in lists:
+            texts = [list_.name] + [item_text(rng, i) for i in range(1, items_per_list)]
+            items.extend(
+                Item(list_id=list_.id, text=text, normalized_text=normalize_item_text(text))
+                for text in texts)
+            if len(items) >= BATCH_SIZE * 10:
+                Item.objects.bulk_create(items, batch_size=BATCH_SIZE)
+                items = []
+        Item.objects.bulk_create(items, batch_size=BATCH_SIZE)
+
+        Share = List.shared_with.through
+        shares = []
+        if users > 1:
+            for list_ in lists:
+                if rng.random() < share_ratio:
+                    sharee = rng.choice(emails)
+                    if sharee != list_.owner_id:
+                        shares.append(Share(list_id=list_.id, user_id=sharee))
+        Share.objects.bulk_create(shares, batch_size=BATCH_SIZE)
+
+        if not fts.uses_fts():
+            # bulk_create skips Item.save, which keeps ItemTerm up to date
+            rebuild_item_terms(BATCH_SIZE * 10)
+
+    return {
+        'users': users,
+        'lists': len(lists),
+        'items': len(lists) * items_per_list,
+        'shares': len(shares),
+        'list_ids': [list_.id for list_ in lists],
+        'lists_by_owner': dict(
+            (email, [list_.id for list_ in lists if list_.owner_id == email])
+            for email in emails),
+        'emails': emails,
+        'words': WORDS,
+    }
@@ -0,0 +1,46 @@
+import math
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, int(math.ceil(fraction * len(sorted_values))))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies, queries, elapsed):
+    latencies = sorted(latencies)
+    count = len(latencies)
+    return {
+        'requests': count,
+        'requests_per_second': count / elapsed if elapsed else None,
+        'mean_ms': 1000 * sum(latencies) / count if count else None,
+        'p50_ms': _ms(percentile(latencies, 0.50)),
+        'p95_ms': _ms(percentile(latencies, 0.95)),
+        'p99_ms': _ms(percentile(latencies, 0.99)),
+        'max_ms': _ms(latencies[-1] if latencies else None),
+        'queries_per_request': sum(queries) / len(queries) if queries else None,
+    }
+
+
+def _ms(seconds):
+    return None if seconds is None else 1000 * seconds
+
+
+def compare(baseline, current, tolerance):
+    """Return a list of regressions between two result files' scenarios."""
+    regressions = []
+    for name, result in sorted(current['results'].items()):
+        before = baseline['results'].get(name)
+        if before is None:
+            continue
+        if before['p95_ms'] and result['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+            regressions.append('%s: p95 %.2fms -> %.2fms' % (
+                name, before['p95_ms'], result['p95_ms']))
+        if (before['queries_per_request'] is not None and
+                result['queries_per_request'] is not None and
+                result['queries_per_request'] > before['queries_per_request']):
+            regressions.append('%s: queries/request %.1f -> %.1f' % (
+                name, before['queries_per_request'], result['queries_per_request']))
+    return regressions
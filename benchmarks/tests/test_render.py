@@ -0,0 +1,19 @@
+from django.test import TestCase
+from benchmarks import render
+
+
+class RenderBenchmarkTest(TestCase):
+
+    def test_times_each_configuration_for_each_size(self):
+        results = render.run(sizes=(1, 5), iterations=2)
+        self.assertEqual(sorted(results), [1, 5])
+        for runs in results.values():
+            self.assertEqual(sorted(runs), ['fast', 'plain'])
+            self.assertEqual(runs['fast']['requests'], 2)
+
+    def test_renders_every_item(self):
+        list_ = render.make_list(150)
+        html = render.render_list(list_, None)
+        self.assertIn('item 149', html)
+        self.assertNotIn('id_next_page', html)
+
@@ -0,0 +1,54 @@
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from unittest.mock import patch
+from benchmarks.runner import ScenarioError, run_scenario
+from benchmarks.scenarios import SCENARIOS, Context
+from benchmarks.seed import seed
+from lists.models import Item, List
+
+User = get_user_model()
+
+
+class SeedTest(TestCase):
+
+    def test_creates_requested_amounts(self):
+        counts = seed(users=3, lists_per_user=2, items_per_list=4)
+        self.assertEqual(User.objects.count(), 3)
+        self.assertEqual(List.objects.count(), 6)
+        self.assertEqual(Item.objects.count(), 24)
+        self.assertEqual(len(counts['list_ids']), 6)
+
+    def test_lists_have_names_and_owners(self):
+        seed(users=1, lists_per_user=1, items_per_list=2)
+        list_ = List.objects.get()
+        self.assertEqual(list_.name, list_.item_set.first().text)
+        self.assertIsNotNone(list_.owner)
+
+    def test_management_command(self):
+        out = StringIO()
+        call_command('seed_data', users=2, lists=1, items=1, stdout=out)
+        self.assertIn('Created 2 users, 2 lists, 2 items', out.getvalue())
+
+
+class ScenarioTest(TestCase):
+
+    def test_every_scenario_runs_and_counts_queries(self):
+        dataset = seed(users=2, lists_per_user=2, items_per_list=3)
+        for name in SCENARIOS:
+            result = run_scenario(name, Context(Client(), dataset), iterations=2, warmup=0)
+            self.assertEqual(result['requests'], 2, name)
+            self.assertIsNotNone(result['queries_per_request'], name)
+
+    def test_error_responses_fail_the_run(self):
+        dataset = seed(users=2, lists_per_user=1, items_per_list=1)
+
+        def view_someone_elses_list(ctx):
+            ctx.log_in()
+            other = next(email for email in dataset['emails'] if email != ctx.user_email)
+            return [ctx.client.get('/lists/%d/' % (dataset['lists_by_owner'][other][0],))]
+
+        with patch.dict(SCENARIOS, {'forbidden': view_someone_elses_list}):
+            with self.assertRaisesRegex(ScenarioError, 'answered 403'):
+                run_scenario('forbidden', Context(Client(), dataset), iterations=1, warmup=0)
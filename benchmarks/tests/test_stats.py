@@ -0,0 +1,43 @@
+from django.test import SimpleTestCase
+from benchmarks.stats import compare, percentile, summarize
+
+
+class PercentileTest(SimpleTestCase):
+
+    def test_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 0.5), 50)
+        self.assertEqual(percentile(values, 0.95), 95)
+        self.assertEqual(percentile(values, 0.99), 99)
+
+    def test_empty(self):
+        self.assertIsNone(percentile([], 0.5))
+
+
+class SummarizeTest(SimpleTestCase):
+
+    def test_reports_milliseconds_and_throughput(self):
+        result = summarize([0.002, 0.001, 0.003, 0.004], [2, 2, 3, 3], elapsed=0.5)
+        self.assertEqual(result['requests'], 4)
+        self.assertEqual(result['requests_per_second'], 8)
+        self.assertAlmostEqual(result['p50_ms'], 2)
+        self.assertAlmostEqual(result['p99_ms'], 4)
+        self.assertEqual(result['queries_per_request'], 2.5)
+
+
+class CompareTest(SimpleTestCase):
+
+    def result(self, p95, queries):
+        return {'results': {'view_list': {'p95_ms': p95, 'queries_per_request': queries}}}
+
+    def test_flags_latency_regression_beyond_tolerance(self):
+        regressions = compare(self.result(10, 3), self.result(13, 3), tolerance=0.2)
+        self.assertEqual(len(regressions), 1)
+        self.assertIn('p95', regressions[0])
+
+    def test_ignores_latency_within_tolerance(self):
+        self.assertEqual(compare(self.result(10, 3), self.result(11, 3), tolerance=0.2), [])
+
+    def test_flags_extra_queries(self):
+        regressions = compare(self.result(10, 3), self.result(10, 4), tolerance=0.2)
+        self.assertIn('queries/request', regressions[0])
@@ -43,6 +43,19 @@ def _update_settings(source_folder, site_name):
         key = ''.join(random.SystemRandom().choice(chars) for _ in range(50))
         append(secret_key_file, "SECRET_KEY = '%s'" % (key,))
     append(settings_path, '\nfrom .secret_key import SECRET_KEY')
+    # memcached evicts least recently used entries as it fills up, where
+    # the file cache would cull a third of everything at 300 entries and
+    # list its whole directory on every write
+    append(settings_path, (
+        "\nCACHES = {'default': {"
+        "'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache', "
+        "'LOCATION': '127.0.0.1:11211', 'KEY_PREFIX': '%s'}}" % (site_name,)
+    ))
+    append(settings_path, "\nLIVE_BROKER = 'lists.live.CacheBroker'")
+    append(settings_path, (
+        "\nSTATICFILES_STORAGE = "
+        "'superlists.storage.CompressedManifestStaticFilesStorage'"
+    ))
 
 
 def _update_virtualenv(source_folder):
@@ -3,6 +3,7 @@ from django.core import mail
 import os
 import poplib
 import time
+from accounts.outbox import send_queued_mail
 from .base import FunctionalTest
 import logging
 SUBJECT = 'Your login link for Superlists'
@@ -56,6 +57,7 @@ class LoginTest(FunctionalTest):
 
     def wait_for_email(self, test_email, subject):
         if not self.against_staging:
+            send_queued_mail()
             email = mail.outbox[0]
             self.assertIn(test_email, email.to)
             self.assertEqual(email.subject, subject)
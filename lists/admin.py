@@ -1,3 +1,9 @@
 from django.contrib import admin
 
-# Register your models here.
+from lists.models import List
+
+
+@admin.register(List)
+class ListAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'owner')
+    search_fields = ('name', 'owner__email')
@@ -0,0 +1,377 @@
+"""JSON API for lists, items and shares.
+
+Reads serialize straight from values() rows rather than model instances,
+and take an optional `fields=a,b` parameter to return only those fields.
+Writes accept a JSON object or form-encoded data and are validated by the
+same forms as the HTML views.
+"""
+import json
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_http_methods
+
+from lists import live
+from lists.permissions import can_share, can_view, viewable
+from lists.search import search_items
+from lists.forms import BatchShareForm, ExistingListItemForm, NewListForm, ShareListForm
+from lists.models import (
+    CHANGE_ITEM_ADDED, CHANGE_ITEM_CHANGED, CHANGE_ITEM_REMOVED, SHARE_ADDED, Item, List)
+
+# API field name -> values() lookup
+LIST_FIELDS = {
+    'id': 'id',
+    'name': 'name',
+    'owner': 'owner_id',
+    'revision': 'revision',
+    'modified': 'modified',
+}
+# needs its own query, so only fetched when asked for
+SHARED_WITH_FIELD = 'shared_with'
+DEFAULT_LIST_FIELDS = ('id', 'name', 'owner', 'revision', 'modified', SHARED_WITH_FIELD)
+
+ITEM_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'list': 'list_id',
+}
+DEFAULT_ITEM_FIELDS = ('id', 'text', 'list')
+
+# the fields each kind of change carries, besides revision and op
+CHANGE_FIELDS = {
+    CHANGE_ITEM_ADDED: ('item', 'text'),
+    CHANGE_ITEM_CHANGED: ('item', 'text'),
+    CHANGE_ITEM_REMOVED: ('item',),
+}
+SHARE_CHANGE_FIELDS = ('email',)
+
+
+class BadRequest(Exception):
+    pass
+
+
+def _error(message, status=400, **extra):
+    return JsonResponse(dict(error=message, **extra), status=status)
+
+
+def _fields(request, allowed, default):
+    requested = request.GET.get('fields')
+    if not requested:
+        return list(default)
+    fields = [f.strip() for f in requested.split(',') if f.strip()]
+    unknown = [f for f in fields if f not in allowed]
+    if unknown:
+        raise BadRequest('Unknown fields: %s' % (', '.join(unknown),))
+    return fields
+
+
+def _positive_int(value, name, minimum=1):
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        value = None
+    if value is None or value < minimum:
+        raise BadRequest('%s must be an integer of at least %d' % (name, minimum))
+    return value
+
+
+def _request_data(request):
+    if request.content_type != 'application/json':
+        return request.POST
+    try:
+        data = json.loads(request.body.decode('utf-8'))
+    except ValueError:
+        raise BadRequest('Request body is not valid JSON')
+    if not isinstance(data, dict):
+        raise BadRequest('Expected a JSON object')
+    return data
+
+
+def _rows(queryset, fields, lookups, limit=None):
+    # (id, row) pairs, with values() lookups renamed to the API's field
+    # names; the id is always fetched for cursors and joins
+    columns = [(field, lookups[field]) for field in fields if field in lookups]
+    rows = queryset.values('id', *set(lookup for _, lookup in columns) - {'id'})
+    if limit is not None:
+        rows = rows[:limit]
+    return [(row['id'], {field: row[lookup] for field, lookup in columns}) for row in rows]
+
+
+def _shared_with(list_ids):
+    # one query for the whole batch: {list id: [emails]}
+    shared = {list_id: [] for list_id in list_ids}
+    # sorted here rather than in SQL, so the (list_id, user_id) index
+    # answers the query on its own
+    shares = List.shared_with.through.objects.filter(
+        list_id__in=list_ids).values_list('list_id', 'user_id')
+    for list_id, email in shares:
+        shared[list_id].append(email)
+    for emails in shared.values():
+        emails.sort()
+    return shared
+
+
+def serialize_lists(queryset, fields):
+    rows = _rows(queryset.order_by('id'), fields, LIST_FIELDS)
+    if SHARED_WITH_FIELD in fields:
+        shared = _shared_with([list_id for list_id, _ in rows])
+        for list_id, row in rows:
+            row[SHARED_WITH_FIELD] = shared[list_id]
+    return [row for _, row in rows]
+
+
+def _get_list_or_404(list_id, queryset=List.objects):
+    # lists archive_lists moved out are brought back the same way
+    # view_list does
+    try:
+        return queryset.get_or_restore(list_id)
+    except List.DoesNotExist:
+        raise Http404('No such list')
+
+
+def _forbidden():
+    return _error('You may not use this list', status=403)
+
+
+def _list_json(list_id, fields):
+    return serialize_lists(List.objects.filter(id=list_id), fields)[0]
+
+
+def api_view(methods):
+    """Restricts the methods a view accepts and turns BadRequest into a
+    400 response."""
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            try:
+                return view(request, *args, **kwargs)
+            except BadRequest as e:
+                return _error(str(e))
+        return require_http_methods(methods)(wrapped)
+    return decorator
+
+
+@api_view(['GET', 'POST'])
+def lists(request):
+    if request.method == 'POST':
+        form = NewListForm(data=_request_data(request))
+        if not form.is_valid():
+            return _error('Invalid list', errors=form.errors)
+        list_ = form.save(owner=request.user)
+        return JsonResponse(_list_json(list_.id, DEFAULT_LIST_FIELDS), status=201)
+
+    fields = _fields(request, set(LIST_FIELDS) | {SHARED_WITH_FIELD}, DEFAULT_LIST_FIELDS)
+    if request.GET.get('ids'):
+        ids = [_positive_int(id_, 'ids') for id_ in request.GET['ids'].split(',')]
+        if len(ids) > settings.LIST_API_MAX_BATCH:
+            raise BadRequest('At most %d ids per request' % (settings.LIST_API_MAX_BATCH,))
+        # lists the user may not view are left out, like missing ones
+        queryset = viewable(request.user, List.objects.filter(id__in=ids))
+    elif request.user.is_authenticated:
+        queryset = List.objects.visible_to(request.user)
+    else:
+        raise BadRequest('Pass ids, or log in to list your own lists')
+    return JsonResponse({'lists': serialize_lists(queryset, fields)})
+
+
+@api_view(['GET'])
+def list_detail(request, list_id):
+    fields = _fields(request, set(LIST_FIELDS) | {SHARED_WITH_FIELD}, DEFAULT_LIST_FIELDS)
+    list_ = _get_list_or_404(list_id, List.objects.only('id', 'owner'))
+    if not can_view(request.user, list_):
+        return _forbidden()
+    return JsonResponse(serialize_lists(List.objects.filter(id=list_.id), fields)[0])
+
+
+@api_view(['GET', 'POST'])
+def list_items(request, list_id):
+    list_ = _get_list_or_404(list_id)
+    if not can_view(request.user, list_):
+        return _forbidden()
+    if request.method == 'POST':
+        form = ExistingListItemForm(for_list=list_, data=_request_data(request))
+        item = form.save() if form.is_valid() else None
+        if item is None:
+            return _error('Invalid item', errors=form.errors)
+        return JsonResponse({'id': item.id, 'text': item.text, 'list': list_.id}, status=201)
+
+    fields = _fields(request, ITEM_FIELDS, DEFAULT_ITEM_FIELDS)
+    page_size = min(
+        _positive_int(request.GET.get('page_size', settings.LIST_ITEMS_PAGE_SIZE), 'page_size'),
+        settings.LIST_ITEMS_MAX_PAGE_SIZE)
+    items = Item.objects.filter(list=list_).order_by('id')
+    if request.GET.get('after'):
+        items = items.filter(id__gt=_positive_int(request.GET['after'], 'after'))
+    rows = _rows(items, fields, ITEM_FIELDS, limit=page_size + 1)
+    next_cursor = rows[page_size - 1][0] if len(rows) > page_size else None
+    return JsonResponse({
+        'items': [row for _, row in rows[:page_size]],
+        'next': next_cursor,
+    })
+
+
+@api_view(['GET', 'POST'])
+def list_shares(request, list_id):
+    list_ = _get_list_or_404(list_id)
+    if not can_view(request.user, list_):
+        return _forbidden()
+    if request.method == 'POST':
+        if not can_share(request.user, list_):
+            return _error('Only the owner may share this list', status=403)
+        data = _request_data(request)
+        form = ShareListForm(list_, data={'share_with': data.get('email', '')})
+        if not form.is_valid():
+            return _error('Invalid share', errors={'email': form.errors.get('share_with', [])})
+        form.save()
+        status = 201
+    else:
+        status = 200
+    return JsonResponse({'shared_with': _shared_with([list_.id])[list_.id]}, status=status)
+
+
+@api_view(['POST'])
+def shares(request):
+    """Shares the logged-in user's lists {"lists": [ids]} with
+    {"emails": [...]}, reporting what happened for each pair."""
+    if not request.user.is_authenticated:
+        return _error('Log in to share your lists', status=403)
+    form = BatchShareForm(request.user, data=_request_data(request))
+    if not form.is_valid():
+        return _error('Invalid share', errors=form.errors)
+    results = form.save()
+    return JsonResponse({
+        'shared': sum(1 for result in results if result['status'] == SHARE_ADDED),
+        'results': results,
+    })
+
+
+def _serialize_change(row):
+    change = {'revision': row['revision'], 'op': row['op']}
+    for field in CHANGE_FIELDS.get(row['op'], SHARE_CHANGE_FIELDS):
+        change[field] = row['item_id' if field == 'item' else field]
+    return change
+
+
+@api_view(['GET'])
+def search(request):
+    """Items in the logged-in user's lists matching ?q=, best first."""
+    if not request.user.is_authenticated:
+        return _error('Log in to search your lists', status=403)
+    query = request.GET.get('q', '').strip()
+    if not query:
+        raise BadRequest('Pass something to search for as q')
+    limit = min(
+        _positive_int(request.GET.get('limit', settings.SEARCH_RESULTS_LIMIT), 'limit'),
+        settings.SEARCH_RESULTS_LIMIT)
+    return JsonResponse({'results': search_items(request.user, query, limit)})
+
+
+def _changes_list(list_id):
+    return List.objects.only('id', 'owner', 'revision', 'log_floor').get(id=list_id)
+
+
+def _changes_payload(list_, since):
+    # the changes after `since` if the log still has them, else a snapshot
+    changes = None
+    if since is not None and since <= list_.revision:
+        changes = list_.changes_since(since)
+    if changes is not None:
+        return {
+            'revision': list_.revision,
+            'changes': [_serialize_change(row) for row in changes.values(
+                'revision', 'op', 'item_id', 'text', 'email')],
+        }
+    snapshot = serialize_lists(List.objects.filter(id=list_.id), DEFAULT_LIST_FIELDS)[0]
+    snapshot['items'] = [
+        {'id': id_, 'text': text}
+        for id_, text in Item.objects.filter(list=list_).order_by('id').values_list('id', 'text')]
+    return {'revision': snapshot['revision'], 'snapshot': snapshot}
+
+
+def _release_connections():
+    # waiting clients can number in the thousands; none of them should be
+    # holding a database connection while they wait
+    connections.close_all()
+
+
+@api_view(['GET'])
+def list_changes(request, list_id):
+    """What changed in a list after revision ?since=N, or a full snapshot
+    to start again from if the log no longer goes back that far (or no
+    revision was given).
+
+    With ?wait=S, a client that is already up to date is held for up to S
+    seconds until something changes, for long polling.
+    """
+    list_ = _get_list_or_404(
+        list_id, List.objects.only('id', 'owner', 'revision', 'log_floor'))
+    if not can_view(request.user, list_):
+        return _forbidden()
+    since = request.GET.get('since')
+    if since is not None:
+        since = _positive_int(since, 'since', minimum=0)
+    timeout = request.GET.get('wait')
+    if timeout is not None:
+        timeout = min(_positive_int(timeout, 'wait'), settings.LIVE_MAX_WAIT)
+        if since == list_.revision:
+            _release_connections()
+            if live.wait(list_.id, since, timeout) is not None:
+                list_ = _changes_list(list_.id)
+    return JsonResponse(_changes_payload(list_, since))
+
+
+def _sse_event(payload):
+    return 'id: %d\nevent: %s\ndata: %s\n\n' % (
+        payload['revision'],
+        'changes' if 'changes' in payload else 'snapshot',
+        json.dumps(payload, cls=DjangoJSONEncoder))
+
+
+def _event_stream(user, list_id, since):
+    deadline = time.monotonic() + settings.LIVE_STREAM_DURATION
+    yield 'retry: %d\n\n' % (settings.LIVE_RETRY_MS,)
+    while True:
+        try:
+            list_ = _changes_list(list_id)
+        except List.DoesNotExist:
+            return
+        if not can_view(user, list_):
+            # unshared while streaming
+            return
+        if list_.revision != since:
+            payload = _changes_payload(list_, since)
+            since = payload['revision']
+            yield _sse_event(payload)
+        _release_connections()
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        if live.wait(list_id, since, min(settings.LIVE_HEARTBEAT, remaining)) is None:
+            yield ': keep-alive\n\n'
+
+
+@api_view(['GET'])
+def list_events(request, list_id):
+    """Server-sent events for a list: the changes since ?since=N (or the
+    Last-Event-ID a reconnecting browser sends), then every later change as
+    it happens. Without a revision it starts with a snapshot.
+
+    Streams end after LIVE_STREAM_DURATION seconds and the client
+    reconnects where it left off.
+    """
+    list_ = _get_list_or_404(list_id, List.objects.only('id', 'owner'))
+    if not can_view(request.user, list_):
+        return _forbidden()
+    since = request.META.get('HTTP_LAST_EVENT_ID') or request.GET.get('since')
+    if since is not None:
+        since = _positive_int(since, 'since', minimum=0)
+    response = StreamingHttpResponse(
+        _event_stream(request.user, list_.id, since), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # stop nginx buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,13 @@
+from django.conf.urls import url
+from lists import api
+
+urlpatterns = [
+    url(r'^lists/$', api.lists, name='api_lists'),
+    url(r'^lists/(\d+)/$', api.list_detail, name='api_list'),
+    url(r'^lists/(\d+)/items/$', api.list_items, name='api_list_items'),
+    url(r'^lists/(\d+)/shares/$', api.list_shares, name='api_list_shares'),
+    url(r'^lists/(\d+)/changes/$', api.list_changes, name='api_list_changes'),
+    url(r'^lists/(\d+)/events/$', api.list_events, name='api_list_events'),
+    url(r'^shares/$', api.shares, name='api_shares'),
+    url(r'^search/$', api.search, name='api_search'),
+]
@@ -0,0 +1,94 @@
+import hashlib
+import time
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+def _version_key(list_id):
+    return 'list-version:%s' % (list_id,)
+
+
+def _fresh_version():
+    # seeded from the clock rather than 1, so a counter that was evicted, or
+    # a list id that gets reused, can't land back on a version that still
+    # has stale fragments cached against it
+    return int(time.time() * 1000000)
+
+
+def _get_version(key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _fresh_version(), None)
+        version = cache.get(key)
+    return version
+
+
+def _bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _fresh_version(), None)
+
+
+def get_list_version(list_id):
+    return _get_version(_version_key(list_id))
+
+
+def bump_list_version(list_id):
+    # now, so the writer's own request sees the change, and again on
+    # commit: a reader between the two still sees the old rows, and would
+    # otherwise cache them under the new version
+    key = _version_key(list_id)
+    _bump_version(key)
+    transaction.on_commit(partial(_bump_version, key))
+
+
+def _texts_key(list_id, version):
+    return 'list-texts:%s:%s' % (list_id, version)
+
+
+def text_digest(text):
+    # 8 bytes is plenty to tell a list's texts apart; a collision only
+    # costs a lookup, as matches are always checked against the table
+    return hashlib.md5(text.encode('utf-8')).digest()[:8]
+
+
+def get_item_text_digests(list_id):
+    """The cached set of text_digest()s of a list's items as of its current
+    version, or None."""
+    return cache.get(_texts_key(list_id, get_list_version(list_id)))
+
+
+def set_item_text_digests(list_id, digests):
+    cache.set(_texts_key(list_id, get_list_version(list_id)), digests, settings.LIST_CACHE_TIMEOUT)
+
+
+# The ids of the lists shared with a user, for lists.permissions. Like the
+# list fragments, they're cached against a per-user version that any
+# change to the user's shares moves on, so a set built from the database
+# just before a change can't be cached as if it were current.
+
+def _access_version_key(email):
+    return 'list-access-version:%s' % (email,)
+
+
+def _shared_ids_key(email, version):
+    return 'list-access:%s:%s' % (email, version)
+
+
+def get_shared_list_ids(email):
+    """(version, the cached ids or None)."""
+    version = _get_version(_access_version_key(email))
+    return version, cache.get(_shared_ids_key(email, version))
+
+
+def set_shared_list_ids(email, version, list_ids):
+    cache.set(_shared_ids_key(email, version), list_ids, settings.LIST_ACCESS_CACHE_TIMEOUT)
+
+
+def forget_shared_list_ids(emails):
+    for email in emails:
+        _bump_version(_access_version_key(email))
@@ -1,6 +1,10 @@
 from django import forms
 from django.core.exceptions import ValidationError, ObjectDoesNotExist
+from django.db import IntegrityError, transaction
+from django.conf import settings
+from django.core.validators import validate_email
 import logging
+import re
 from lists.models import Item, List
 from django.contrib.auth import get_user_model
 
@@ -9,6 +13,9 @@ EMPTY_ITEM_ERROR = "You can't have an empty list item"
 DUPLICATE_ITEM_ERROR = "You've already got this in your list"
 NONEXISTENT_USER_EMAIL_ERROR = "The email provided is not a valid user's email"
 SAME_EMAIL_ERROR = "You can't share a list with yourself"
+INVALID_EMAILS_ERROR = "These aren't valid emails: %(emails)s"
+TOO_MANY_ERROR = "You can share at most %(limit)d at once"
+EMAILS_TYPE_ERROR = "Give the emails as text or as a list of strings"
 
 
 class ItemForm(forms.models.ModelForm):
@@ -31,11 +38,20 @@ class ExistingListItemForm(ItemForm):
 
 
     def validate_unique(self):
+        # left to the (list, normalized_text) unique index when saving:
+        # checking first costs a query per add and still races another
+        # sharee's add
+        pass
+
+    def save(self):
+        """Saves the item, or returns None and records DUPLICATE_ITEM_ERROR
+        if the list already has one like it."""
         try:
-            self.instance.validate_unique()
-        except ValidationError as e:
-            e.error_dict = {'text': [DUPLICATE_ITEM_ERROR]}
-            self._update_errors(e)
+            with transaction.atomic():
+                return super().save()
+        except IntegrityError:
+            self.add_error('text', DUPLICATE_ITEM_ERROR)
+            return None
 
 
 class NewListForm(ItemForm):
@@ -62,10 +78,66 @@ class ShareListForm(forms.Form):
             user = User.objects.get(email=email)
         except ObjectDoesNotExist as e:
             raise ValidationError(NONEXISTENT_USER_EMAIL_ERROR)
-        if self.list.owner:
-            if email == self.list.owner.email:
-                raise ValidationError(SAME_EMAIL_ERROR)
+        # owner_id is the owner's email, so no need to fetch the owner
+        if email == self.list.owner_id:
+            raise ValidationError(SAME_EMAIL_ERROR)
         return email
 
     def save(self):
         self.list.shared_with.add(self.cleaned_data['share_with'])
+
+
+class EmailListField(forms.Field):
+    """Any number of emails, as a list or as text separated by commas,
+    semicolons or whitespace. Cleans to a sorted list without repeats."""
+
+    widget = forms.Textarea(attrs={
+        'placeholder': 'friend@example.com, colleague@example.com',
+        'class': 'form-control', 'rows': 3})
+
+    def to_python(self, value):
+        if not value:
+            return []
+        if isinstance(value, str):
+            value = re.split(r'[\s,;]+', value)
+        elif not isinstance(value, (list, tuple)) or not all(isinstance(v, str) for v in value):
+            # anything else can only have come from JSON
+            raise ValidationError(EMAILS_TYPE_ERROR)
+        return sorted(set(email.strip() for email in value if email and email.strip()))
+
+    def validate(self, value):
+        super().validate(value)
+        invalid = []
+        for email in value:
+            try:
+                validate_email(email)
+            except ValidationError:
+                invalid.append(email)
+        if invalid:
+            raise ValidationError(INVALID_EMAILS_ERROR, params={'emails': ', '.join(invalid)})
+        if len(value) > settings.BATCH_SHARE_MAX:
+            raise ValidationError(TOO_MANY_ERROR, params={'limit': settings.BATCH_SHARE_MAX})
+
+
+class BatchShareForm(forms.Form):
+    """Shares some of a user's lists with a set of other users at once."""
+
+    def __init__(self, owner, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['lists'].queryset = List.objects.owned_by(owner)
+        self.fields['lists'].label_from_instance = lambda list_: list_.name
+
+    lists = forms.ModelMultipleChoiceField(
+        queryset=List.objects.none(), widget=forms.CheckboxSelectMultiple)
+    emails = EmailListField()
+
+    def clean_lists(self):
+        lists = self.cleaned_data['lists']
+        if len(lists) > settings.BATCH_SHARE_MAX:
+            raise ValidationError(TOO_MANY_ERROR, params={'limit': settings.BATCH_SHARE_MAX})
+        return lists
+
+    def save(self):
+        """A result for each (list, email) pair; see List.share_many."""
+        return List.share_many(
+            [list_.id for list_ in self.cleaned_data['lists']], self.cleaned_data['emails'])
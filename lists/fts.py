@@ -0,0 +1,106 @@
+"""Full-text indexing of item text.
+
+Where SQLite has FTS5 compiled in, lists_item_fts indexes lists_item as an
+external-content table, kept up to date by triggers, so item writes don't
+do any extra work in Python. Anywhere else, ItemTerm rows make a plain
+inverted index that the models maintain as items are written, using
+tokenize() below, which splits text the way FTS5's unicode61 tokenizer
+does.
+
+settings.ITEM_SEARCH_BACKEND is 'auto', or 'fts5' / 'terms' to force one.
+"""
+import re
+import unicodedata
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+FTS_TABLE = 'lists_item_fts'
+FTS_SOURCE = 'lists_item_fts_source'
+
+# Besides the text, each item's list id is indexed as a token ("l42") in
+# list_tag, so a search can be narrowed to a user's lists inside the FTS
+# query itself instead of joining every match to check it afterwards.
+CREATE_SQL = [
+    "CREATE VIEW {source} AS "
+    "SELECT id, text, 'l' || list_id AS list_tag FROM lists_item",
+    "CREATE VIRTUAL TABLE {fts} USING fts5("
+    "text, list_tag, content='{source}', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER {fts}_insert AFTER INSERT ON lists_item BEGIN "
+    "INSERT INTO {fts}(rowid, text, list_tag) "
+    "VALUES (new.id, new.text, 'l' || new.list_id); END",
+    "CREATE TRIGGER {fts}_delete AFTER DELETE ON lists_item BEGIN "
+    "INSERT INTO {fts}({fts}, rowid, text, list_tag) "
+    "VALUES ('delete', old.id, old.text, 'l' || old.list_id); END",
+    "CREATE TRIGGER {fts}_update AFTER UPDATE OF text, list_id ON lists_item BEGIN "
+    "INSERT INTO {fts}({fts}, rowid, text, list_tag) "
+    "VALUES ('delete', old.id, old.text, 'l' || old.list_id); "
+    "INSERT INTO {fts}(rowid, text, list_tag) "
+    "VALUES (new.id, new.text, 'l' || new.list_id); END",
+]
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS {fts}_insert',
+    'DROP TRIGGER IF EXISTS {fts}_delete',
+    'DROP TRIGGER IF EXISTS {fts}_update',
+    'DROP TABLE IF EXISTS {fts}',
+    'DROP VIEW IF EXISTS {source}',
+]
+
+# ItemTerm.term's max_length
+MAX_TERM_LENGTH = 100
+
+_TOKEN_RE = re.compile(r'[^\W_]+')
+
+
+def tokenize(text):
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return [token[:MAX_TERM_LENGTH] for token in _TOKEN_RE.findall(text)]
+
+
+# remove_diacritics 2 in CREATE_SQL arrived in SQLite 3.27; older builds
+# with FTS5 compiled in can't parse the tokenizer, so they use ItemTerm
+MIN_SQLITE_VERSION = (3, 27, 0)
+
+
+@lru_cache()
+def _sqlite_has_fts5():
+    # asked of a throwaway connection to the same library, so it never
+    # shows up among a request's queries
+    from django.db.backends.sqlite3.base import Database
+    if Database.sqlite_version_info < MIN_SQLITE_VERSION:
+        return False
+    connection = Database.connect(':memory:')
+    try:
+        options = set(row[0] for row in connection.execute('PRAGMA compile_options'))
+    finally:
+        connection.close()
+    return 'ENABLE_FTS5' in options
+
+
+def fts5_available(connection):
+    return connection.vendor == 'sqlite' and _sqlite_has_fts5()
+
+
+def uses_fts(using=DEFAULT_DB_ALIAS):
+    backend = settings.ITEM_SEARCH_BACKEND
+    if backend != 'auto':
+        return backend == 'fts5'
+    return fts5_available(connections[using])
+
+
+def create_fts_index(cursor):
+    for sql in CREATE_SQL:
+        cursor.execute(sql.format(fts=FTS_TABLE, source=FTS_SOURCE))
+    rebuild_fts_index(cursor)
+
+
+def rebuild_fts_index(cursor):
+    cursor.execute("INSERT INTO {fts}({fts}) VALUES ('rebuild')".format(fts=FTS_TABLE))
+
+
+def drop_fts_index(cursor):
+    for sql in DROP_SQL:
+        cursor.execute(sql.format(fts=FTS_TABLE, source=FTS_SOURCE))
@@ -0,0 +1,109 @@
+"""Live list updates.
+
+Once a change to a list is committed its new revision is published, and
+subscribers block until the list they watch moves past the revision they
+have. Waiting happens on the broker alone, never on the database.
+
+LocalBroker only reaches subscribers in the same process, which is enough
+for runserver or a single gunicorn worker. CacheBroker goes through the
+shared cache so every worker sees every publish, at the cost of polling it
+every LIVE_POLL_INTERVAL seconds. settings.LIVE_BROKER picks one.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+# how long CacheBroker remembers a list's last published revision
+REVISION_TIMEOUT = 60 * 60
+
+
+class LocalBroker(object):
+    """In-process pub/sub on a condition variable per watched list. Under
+    gunicorn's gevent workers the threading primitives are patched to
+    yield to other greenlets, so thousands of waiters are cheap."""
+
+    # lists whose last revision we remember, for subscribers that start
+    # waiting just after a publish
+    max_lists = 10000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._revisions = OrderedDict()
+        self._conditions = {}
+
+    def publish(self, list_id, revision):
+        with self._lock:
+            if revision > self._revisions.get(list_id, 0):
+                self._revisions[list_id] = revision
+                self._revisions.move_to_end(list_id)
+                if len(self._revisions) > self.max_lists:
+                    self._revisions.popitem(last=False)
+            if list_id in self._conditions:
+                self._conditions[list_id][0].notify_all()
+
+    def wait(self, list_id, revision, timeout):
+        """Blocks until list_id is published past `revision` and returns the
+        newest revision, or None once `timeout` seconds have gone by."""
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            if list_id not in self._conditions:
+                self._conditions[list_id] = [threading.Condition(self._lock), 0]
+            entry = self._conditions[list_id]
+            entry[1] += 1
+            try:
+                while self._revisions.get(list_id, 0) <= revision:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return None
+                    entry[0].wait(remaining)
+                return self._revisions[list_id]
+            finally:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._conditions[list_id]
+
+
+class CacheBroker(object):
+    """Fans out across processes through the shared cache. Concurrent
+    publishers can overwrite a newer revision with an older one; anyone
+    that misses a publish because of it catches up when they next poll."""
+
+    def _key(self, list_id):
+        return 'live-revision:%s' % (list_id,)
+
+    def publish(self, list_id, revision):
+        cache.set(self._key(list_id), revision, REVISION_TIMEOUT)
+
+    def wait(self, list_id, revision, timeout):
+        deadline = time.monotonic() + timeout
+        key = self._key(list_id)
+        while True:
+            latest = cache.get(key)
+            if latest is not None and latest > revision:
+                return latest
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            time.sleep(min(settings.LIVE_POLL_INTERVAL, remaining))
+
+
+_brokers = {}
+
+
+def get_broker():
+    path = settings.LIVE_BROKER
+    if path not in _brokers:
+        _brokers.setdefault(path, import_string(path)())
+    return _brokers[path]
+
+
+def publish(list_id, revision):
+    get_broker().publish(list_id, revision)
+
+
+def wait(list_id, revision, timeout):
+    return get_broker().wait(list_id, revision, timeout)
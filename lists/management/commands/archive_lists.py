@@ -0,0 +1,106 @@
+from datetime import timedelta
+from itertools import groupby
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+
+from lists.models import ArchivedList, Item, List
+
+
+class Command(BaseCommand):
+    help = (
+        'Move lists nobody owns or shares, untouched for a while, and their '
+        'items into the archive; viewing one brings it back'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.ARCHIVE_LISTS_AFTER_DAYS,
+            help='archive lists not changed in DAYS days (default: %(default)s)')
+        parser.add_argument('--batch-size', type=int, default=500,
+            help='lists moved per transaction (default: %(default)s)')
+        parser.add_argument('--vacuum', action='store_true',
+            help='VACUUM the SQLite database afterwards and report the space reclaimed')
+
+    def handle(self, *args, **options):
+        connection = connections[DEFAULT_DB_ALIAS]
+        if options['vacuum'] and connection.vendor != 'sqlite':
+            raise CommandError('--vacuum is only for SQLite')
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        lists, items = archive_lists(cutoff, options['batch_size'])
+        self.stdout.write('Archived %d lists and %d items' % (lists, items))
+        if options['vacuum']:
+            before, after = vacuum(connection)
+            self.stdout.write('Vacuumed: %d bytes reclaimed (%d -> %d)' % (
+                before - after, before, after))
+
+
+def archivable_lists(cutoff):
+    shared = List.shared_with.through.objects.values('list_id')
+    return List.objects.filter(owner=None, modified__lt=cutoff).exclude(id__in=shared)
+
+
+class _BatchChanged(Exception):
+    """A list in the batch changed after it was read."""
+
+
+def archive_lists(cutoff, batch_size):
+    """Archives the lists archivable_lists(cutoff) finds, `batch_size` at a
+    time, and returns how many lists and items it moved."""
+    moved_lists = moved_items = 0
+    last_id = 0
+    while True:
+        try:
+            with transaction.atomic():
+                # read again inside the transaction, so a list changed since
+                # the last batch is left alone; the lock keeps the batch as
+                # read until it's deleted where the database supports it
+                batch = list(
+                    archivable_lists(cutoff).select_for_update()
+                    .filter(id__gt=last_id).order_by('id')
+                    .values_list('id', 'name', 'revision', 'modified')[:batch_size])
+                if not batch:
+                    return moved_lists, moved_items
+                list_ids = [row[0] for row in batch]
+                items = dict(
+                    (list_id, [[id_, text] for _, id_, text in rows])
+                    for list_id, rows in groupby(
+                        Item.objects.filter(list_id__in=list_ids).order_by('list_id', 'id')
+                        .values_list('list_id', 'id', 'text').iterator(),
+                        key=lambda row: row[0]))
+                ArchivedList.objects.bulk_create([
+                    ArchivedList(
+                        id=list_id, name=name, revision=revision, modified=modified,
+                        items=ArchivedList.pack_items(items.get(list_id, [])))
+                    for list_id, name, revision, modified in batch
+                ])
+                # cascades to the items (whose search entries the FTS triggers
+                # or ItemTerm's foreign key take with them) and the change log;
+                # a list changed, owned or shared since the read is kept, and
+                # the batch's archive copies go with the rollback
+                _, deleted = archivable_lists(cutoff).filter(id__in=list_ids).delete()
+                if deleted.get(List._meta.label, 0) != len(batch):
+                    raise _BatchChanged
+        except _BatchChanged:
+            # read the batch again, which now passes over the changed list
+            continue
+        moved_lists += len(batch)
+        moved_items += sum(len(rows) for rows in items.values())
+        last_id = list_ids[-1]
+
+
+def _database_size(cursor):
+    cursor.execute('PRAGMA page_count')
+    page_count = cursor.fetchone()[0]
+    cursor.execute('PRAGMA page_size')
+    return page_count * cursor.fetchone()[0]
+
+
+def vacuum(connection):
+    """(size before, size after) in bytes."""
+    with connection.cursor() as cursor:
+        before = _database_size(cursor)
+        cursor.execute('VACUUM')
+        return before, _database_size(cursor)
@@ -0,0 +1,45 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from lists.models import List, ListChange
+
+
+class Command(BaseCommand):
+    help = 'Delete list change log entries older than the retention period'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.LIST_CHANGES_RETENTION_DAYS,
+            help='keep changes from the last DAYS days (default: %(default)s)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        compacted = compact_list_changes(cutoff, options['batch_size'])
+        self.stdout.write('Compacted %d list changes' % (compacted,))
+
+
+def compact_list_changes(cutoff, batch_size):
+    # each list's log_floor is raised past what we delete, in the same
+    # transaction, so a client never gets an incomplete set of changes
+    compacted = 0
+    while True:
+        batch = list(
+            ListChange.objects.filter(created__lt=cutoff)
+            .order_by('id')
+            .values_list('id', 'list_id', 'revision')[:batch_size])
+        if not batch:
+            return compacted
+        floors = {}
+        for _, list_id, revision in batch:
+            floors[list_id] = max(revision, floors.get(list_id, 0))
+        with transaction.atomic():
+            for list_id, revision in floors.items():
+                List.objects.filter(id=list_id, log_floor__lt=revision).update(
+                    log_floor=revision)
+            ListChange.objects.filter(id__in=[id_ for id_, _, _ in batch]).delete()
+        compacted += len(batch)
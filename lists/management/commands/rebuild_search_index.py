@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from lists import fts
+from lists.models import Item, ItemTerm
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the item search index from scratch'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if fts.uses_fts():
+            with connection.cursor() as cursor:
+                fts.rebuild_fts_index(cursor)
+            self.stdout.write('Rebuilt the FTS5 index')
+        else:
+            indexed = rebuild_item_terms(options['batch_size'])
+            self.stdout.write('Indexed %d items' % (indexed,))
+
+
+def rebuild_item_terms(batch_size):
+    ItemTerm.objects.all().delete()
+    indexed, last_id = 0, 0
+    while True:
+        batch = list(
+            Item.objects.filter(id__gt=last_id).order_by('id')
+            .values_list('id', 'list_id', 'text')[:batch_size])
+        if not batch:
+            return indexed
+        with transaction.atomic():
+            ItemTerm.index(batch)
+        indexed += len(batch)
+        last_id = batch[-1][0]
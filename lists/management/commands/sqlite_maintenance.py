@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from superlists.backends.sqlite3.pragmas import expected_value, read_pragma
+
+
+class Command(BaseCommand):
+    help = (
+        'Report the SQLite pragmas in effect, check them against '
+        'settings.SQLITE_PRAGMAS, and optionally checkpoint the WAL and '
+        'refresh query planner statistics'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--check', action='store_true',
+            help='exit with an error if any pragma differs from the settings')
+        parser.add_argument('--checkpoint', action='store_true',
+            help='run a truncating WAL checkpoint')
+        parser.add_argument('--analyze', action='store_true', help='run ANALYZE')
+        parser.add_argument('--optimize', action='store_true', help='run PRAGMA optimize')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlite':
+            raise CommandError('Database %r is not SQLite' % (options['database'],))
+
+        mismatches = []
+        with connection.cursor() as cursor:
+            for name, value in sorted(getattr(settings, 'SQLITE_PRAGMAS', {}).items()):
+                actual = read_pragma(cursor, name)
+                expected = expected_value(name, value)
+                ok = actual == expected
+                if not ok:
+                    mismatches.append(name)
+                self.stdout.write('%-14s %-12s %s' % (
+                    name, actual, 'ok' if ok else 'EXPECTED %s' % (expected,)))
+
+            if options['checkpoint']:
+                cursor.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+                busy, log_frames, checkpointed = cursor.fetchone()
+                self.stdout.write('checkpoint: busy=%s log=%s checkpointed=%s' % (
+                    busy, log_frames, checkpointed))
+            if options['analyze']:
+                cursor.execute('ANALYZE')
+                self.stdout.write('analyze: done')
+            if options['optimize']:
+                cursor.execute('PRAGMA optimize')
+                self.stdout.write('optimize: done')
+
+        if options['check'] and mismatches:
+            raise CommandError('Pragmas differ from settings: %s' % (', '.join(mismatches),))
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+# every list is named after its first item in one statement, the subquery
+# answered from the item table's list_id index
+BACKFILL_LIST_NAMES_SQL = (
+    "UPDATE lists_list SET name = COALESCE(("
+    "SELECT text FROM lists_item WHERE list_id = lists_list.id ORDER BY id LIMIT 1"
+    "), '')"
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lists', '0010_auto_20170118_1932'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='list',
+            name='name',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.RunSQL([BACKFILL_LIST_NAMES_SQL], migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.4 on 2026-10-18 03:29
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lists', '0011_list_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='list',
+            name='modified',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='list',
+            name='revision',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.4 on 2026-10-18 03:42
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def start_logs_at_current_revision(apps, schema_editor):
+    # nothing before now was logged, so clients on an older revision need
+    # a snapshot
+    List = apps.get_model('lists', 'List')
+    List.objects.using(schema_editor.connection.alias).update(
+        log_floor=models.F('revision'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lists', '0012_list_revision'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListChange',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('revision', models.PositiveIntegerField()),
+                ('op', models.CharField(choices=[('item_added', 'Item added'), ('item_changed', 'Item changed'), ('item_removed', 'Item removed'), ('shared', 'Shared'), ('unshared', 'Unshared')], max_length=16)),
+                ('item_id', models.IntegerField(null=True)),
+                ('text', models.TextField(blank=True)),
+                ('email', models.EmailField(blank=True, max_length=254)),
+                ('created', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ('id',),
+            },
+        ),
+        migrations.AddField(
+            model_name='list',
+            name='log_floor',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='listchange',
+            name='list',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='changes', to='lists.List'),
+        ),
+        migrations.AlterIndexTogether(
+            name='listchange',
+            index_together=set([('list', 'revision')]),
+        ),
+        migrations.RunPython(start_logs_at_current_revision, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.4 on 2026-10-18 03:48
+from __future__ import unicode_literals
+
+from collections import Counter
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from lists import fts
+
+BATCH_SIZE = 1000
+
+
+def build_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if fts.fts5_available(connection):
+        with connection.cursor() as cursor:
+            fts.create_fts_index(cursor)
+        return
+    Item = apps.get_model('lists', 'Item')
+    ItemTerm = apps.get_model('lists', 'ItemTerm')
+    items = Item.objects.using(connection.alias).order_by('id')
+    last_id = 0
+    while True:
+        batch = list(items.filter(id__gt=last_id).values_list('id', 'list_id', 'text')[:BATCH_SIZE])
+        if not batch:
+            break
+        last_id = batch[-1][0]
+        ItemTerm.objects.using(connection.alias).bulk_create([
+            ItemTerm(item_id=item_id, list_id=list_id, term=term, count=min(count, 32767))
+            for item_id, list_id, text in batch
+            for term, count in Counter(fts.tokenize(text)).items()
+        ])
+
+
+def drop_search_index(apps, schema_editor):
+    if fts.fts5_available(schema_editor.connection):
+        with schema_editor.connection.cursor() as cursor:
+            fts.drop_fts_index(cursor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lists', '0013_list_changes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=100)),
+                ('count', models.PositiveSmallIntegerField(default=1)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='terms', to='lists.Item')),
+                ('list', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='lists.List')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='itemterm',
+            unique_together=set([('item', 'term')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='itemterm',
+            index_together=set([('term', 'list')]),
+        ),
+        migrations.RunPython(build_search_index, drop_search_index),
+    ]
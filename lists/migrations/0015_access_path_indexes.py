@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.4 on 2026-10-18 03:56
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+# The foreign key indexes Django made for Item.list and List.owner, which
+# become (fk, id) under the names index_together gives them. Named here
+# rather than looked up, and created by hand rather than by AlterField or
+# AlterIndexTogether, which on SQLite copy the whole table into a new one,
+# dropping the search triggers on lists_item along the way.
+COMPOSITE_INDEXES = (
+    ('lists_item', 'list_id', 'lists_item_4da3e820', 'lists_item_list_id_61475329_idx'),
+    ('lists_list', 'owner_id', 'lists_list_5e7b1936', 'lists_list_owner_id_b6b223ff_idx'),
+)
+
+SHARED_WITH_USER_INDEX = 'lists_list_shared_with_user_id_list_id'
+# the many-to-many table's own user_id index, which the one above covers
+OLD_SHARED_WITH_USER_INDEX = 'lists_list_shared_with_e8701ad4'
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('lists', '0014_item_search'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='item',
+                    name='list',
+                    field=models.ForeignKey(db_index=False, default=None, on_delete=django.db.models.deletion.CASCADE, to='lists.List'),
+                ),
+                migrations.AlterField(
+                    model_name='list',
+                    name='owner',
+                    field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+                ),
+                migrations.AlterIndexTogether(
+                    name='item',
+                    index_together=set([('list', 'id')]),
+                ),
+                migrations.AlterIndexTogether(
+                    name='list',
+                    index_together=set([('owner', 'id')]),
+                ),
+            ],
+            database_operations=[
+                migrations.RunSQL(
+                    [sql
+                     for table, column, old_name, new_name in COMPOSITE_INDEXES
+                     for sql in ('DROP INDEX %s' % (old_name,),
+                                 'CREATE INDEX %s ON %s (%s, id)' % (new_name, table, column))],
+                    [sql
+                     for table, column, old_name, new_name in COMPOSITE_INDEXES
+                     for sql in ('DROP INDEX %s' % (new_name,),
+                                 'CREATE INDEX %s ON %s (%s)' % (old_name, table, column))],
+                ),
+            ],
+        ),
+        # lists shared with a user, answered from the index alone
+        migrations.RunSQL(
+            ['CREATE INDEX %s ON lists_list_shared_with (user_id, list_id)' % (SHARED_WITH_USER_INDEX,),
+             'DROP INDEX %s' % (OLD_SHARED_WITH_USER_INDEX,)],
+            ['CREATE INDEX %s ON lists_list_shared_with (user_id)' % (OLD_SHARED_WITH_USER_INDEX,),
+             'DROP INDEX %s' % (SHARED_WITH_USER_INDEX,)],
+        ),
+    ]
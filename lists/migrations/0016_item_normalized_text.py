@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models, transaction
+
+from lists import fts
+
+# lists whose items are normalized per transaction, so the backfill never
+# holds the write lock for long
+BACKFILL_LISTS_PER_BATCH = 200
+
+
+def normalize(text):
+    # lists.models.normalize_item_text as of this migration
+    return ' '.join(text.casefold().split())
+
+
+def _normalize_lists(cursor, list_ids):
+    cursor.execute(
+        'SELECT list_id, id, text FROM lists_item WHERE list_id IN (%s) ORDER BY list_id, id' % (
+            ', '.join(['%s'] * len(list_ids)),),
+        list_ids)
+    updates, seen = [], set()
+    for list_id, item_id, text in cursor.fetchall():
+        key = normalize(text)
+        if (list_id, key) in seen:
+            # a near-duplicate the old (list, text) constraint let in: the
+            # earliest item keeps the key and later ones get one that no
+            # text can normalize to, as normalize() never leaves a newline
+            key = '%s\n%d' % (key, item_id)
+        seen.add((list_id, key))
+        updates.append((key, item_id))
+    cursor.executemany('UPDATE lists_item SET normalized_text = %s WHERE id = %s', updates)
+
+
+def backfill_normalized_text(apps, schema_editor):
+    connection = schema_editor.connection
+    last_list_id = 0
+    while True:
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT id FROM lists_list WHERE id > %s ORDER BY id LIMIT %s',
+                [last_list_id, BACKFILL_LISTS_PER_BATCH])
+            list_ids = [row[0] for row in cursor.fetchall()]
+            if not list_ids:
+                break
+            _normalize_lists(cursor, list_ids)
+        last_list_id = list_ids[-1]
+    # items the old code added to lists after we had been through them
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        cursor.execute("SELECT DISTINCT list_id FROM lists_item WHERE normalized_text = ''")
+        list_ids = [row[0] for row in cursor.fetchall()]
+        for start in range(0, len(list_ids), BACKFILL_LISTS_PER_BATCH):
+            _normalize_lists(cursor, list_ids[start:start + BACKFILL_LISTS_PER_BATCH])
+
+
+def drop_normalized_text(apps, schema_editor):
+    # ALTER TABLE ... DROP COLUMN needs SQLite 3.35, so the schema editor
+    # copies lists_item into a new table instead; the search triggers and
+    # the view the FTS index reads go with the old one, so they're rebuilt
+    connection = schema_editor.connection
+    search = fts.fts5_available(connection)
+    if search:
+        with connection.cursor() as cursor:
+            fts.drop_fts_index(cursor)
+    Item = apps.get_model('lists', 'Item')
+    schema_editor.remove_field(Item, Item._meta.get_field('normalized_text'))
+    if search:
+        with connection.cursor() as cursor:
+            fts.create_fts_index(cursor)
+
+
+def _swap_unique(apps, schema_editor, old_columns, new_columns):
+    # by hand, as AlterUniqueTogether would rebuild lists_item on SQLite and
+    # lose the search triggers (see 0015)
+    Item = apps.get_model('lists', 'Item')
+    for name in schema_editor._constraint_names(Item, old_columns, unique=True):
+        # a constraint declared in SQLite's CREATE TABLE can't be dropped
+        # without rebuilding the table, so it's left to be made redundant
+        if not name.startswith('sqlite_autoindex'):
+            schema_editor.execute(
+                schema_editor._delete_constraint_sql(schema_editor.sql_delete_unique, Item, name))
+    schema_editor.execute(schema_editor._create_unique_sql(Item, new_columns))
+
+
+def unique_on_normalized_text(apps, schema_editor):
+    _swap_unique(apps, schema_editor, ['list_id', 'text'], ['list_id', 'normalized_text'])
+
+
+def unique_on_text(apps, schema_editor):
+    _swap_unique(apps, schema_editor, ['list_id', 'normalized_text'], ['list_id', 'text'])
+
+
+class Migration(migrations.Migration):
+
+    # each backfill batch commits on its own
+    atomic = False
+
+    dependencies = [
+        ('lists', '0015_access_path_indexes'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddField(
+                    model_name='item',
+                    name='normalized_text',
+                    field=models.TextField(blank=True, default='', editable=False),
+                ),
+            ],
+            database_operations=[
+                # a plain ALTER TABLE, which SQLite does without copying the
+                # table; the default fills existing rows until the backfill
+                # the backfill's reverse drops it again
+                migrations.RunSQL(
+                    ["ALTER TABLE lists_item ADD COLUMN normalized_text text NOT NULL DEFAULT ''"],
+                    migrations.RunSQL.noop,
+                ),
+            ],
+        ),
+        migrations.RunPython(backfill_normalized_text, drop_normalized_text),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterUniqueTogether(
+                    name='item',
+                    unique_together=set([('list', 'normalized_text')]),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(unique_on_normalized_text, unique_on_text),
+            ],
+        ),
+    ]
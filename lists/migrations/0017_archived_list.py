@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.4 on 2026-10-18 04:13
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lists', '0016_item_normalized_text'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedList',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('name', models.TextField(blank=True, default='')),
+                ('revision', models.PositiveIntegerField(default=0)),
+                ('modified', models.DateTimeField()),
+                ('archived', models.DateTimeField(default=django.utils.timezone.now)),
+                ('items', models.BinaryField()),
+            ],
+        ),
+    ]
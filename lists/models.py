@@ -1,35 +1,516 @@
-from django.db import models
+from collections import Counter
+from functools import partial
+import json
+import zlib
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Q
 from django.core.urlresolvers import reverse
 from django.conf import settings
+from django.db.models.signals import m2m_changed
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from lists import fts, live
+from lists.cache import (
+    bump_list_version, forget_shared_list_ids, get_item_text_digests,
+    set_item_text_digests, text_digest)
+
+ITEM_ADDED = 'added'
+ITEM_DUPLICATE = 'duplicate'
+ITEM_EMPTY = 'empty'
+
+SHARE_ADDED = 'shared'
+SHARE_EXISTING = 'already_shared'
+SHARE_OWNER = 'owner'
+SHARE_NO_SUCH_USER = 'no_such_user'
+SHARE_NO_SUCH_LIST = 'no_such_list'
+
+CHANGE_ITEM_ADDED = 'item_added'
+CHANGE_ITEM_CHANGED = 'item_changed'
+CHANGE_ITEM_REMOVED = 'item_removed'
+CHANGE_SHARED = 'shared'
+CHANGE_UNSHARED = 'unshared'
+
+
+def normalize_item_text(text):
+    """The key two items in a list can't share: texts that differ only in
+    case or whitespace are the same item."""
+    return ' '.join(text.casefold().split())
+
+
+def chunked(sequence, size):
+    for start in range(0, len(sequence), size):
+        yield sequence[start:start + size]
+
+
+class ItemPage(object):
+
+    def __init__(self, list_, after=None, page_size=None):
+        self.list = list_
+        self.after = after
+        self.page_size = page_size or settings.LIST_ITEMS_PAGE_SIZE
+
+    @cached_property
+    def _rows(self):
+        items = self.list.item_set.order_by('id')
+        if self.after is not None:
+            items = items.filter(id__gt=self.after)
+        return list(items[:self.page_size + 1])
+
+    @property
+    def items(self):
+        return self._rows[:self.page_size]
+
+    @property
+    def next_cursor(self):
+        if len(self._rows) > self.page_size:
+            return self._rows[self.page_size - 1].id
+        return None
+
+    @cached_property
+    def offset(self):
+        if self.after is None:
+            return 0
+        return self.list.item_set.filter(id__lte=self.after).count()
+
+
+class ListQuerySet(models.QuerySet):
+
+    def owned_by(self, user):
+        return self.filter(owner=user).order_by('id')
+
+    def shared_with_user(self, user):
+        return self.filter(shared_with=user).order_by('id')
+
+    def visible_to(self, user):
+        """Lists `user` owns or has had shared with them. Written as an IN
+        rather than an OR across the sharing join, which SQLite can only
+        answer by scanning every list."""
+        shared = List.shared_with.through.objects.filter(user_id=user.pk).values('list_id')
+        return self.filter(Q(owner_id=user.pk) | Q(id__in=shared))
+
+    def get_or_restore(self, id):
+        """The list with this id, first bringing it back from the archive
+        if `manage.py archive_lists` moved it there."""
+        try:
+            return self.get(id=id)
+        except List.DoesNotExist:
+            ArchivedList.restore(id)
+            return self.get(id=id)
+
 
 class List(models.Model):
 
-    owner = models.ForeignKey(settings.AUTH_USER_MODEL, blank=True, null=True)
+    # indexed together with id below, for owned_by()'s ordering
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, blank=True, null=True, db_index=False)
     shared_with = models.ManyToManyField(settings.AUTH_USER_MODEL, blank=False, related_name="shared_with")
+    # denormalized copy of the first item's text, so anything listing lists
+    # never has to touch the items table
+    name = models.TextField(default='', blank=True)
+    # bumped on every item or sharing change; drives ETag / Last-Modified
+    revision = models.PositiveIntegerField(default=0)
+    # changes up to and including this revision may have been compacted out
+    # of the change log, so clients behind it need a full snapshot
+    log_floor = models.PositiveIntegerField(default=0)
+    modified = models.DateTimeField(auto_now=True)
+
+    objects = ListQuerySet.as_manager()
+
+    class Meta:
+        index_together = ('owner', 'id')
+
     def get_absolute_url(self):
         return reverse('view_list', args=[self.id])
 
     def __str__(self):
         return str(self.id)
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        bump_list_version(self.pk)
+
     @staticmethod
     def create_new(first_item_text, owner=None):
-        list_ = List.objects.create(owner=owner)
+        list_ = List.objects.create(owner=owner, name=first_item_text)
         Item.objects.create(text=first_item_text, list=list_)
         return list_
 
-    @property
-    def name(self):
-        return self.item_set.first().text
+    def add_items(self, texts):
+        texts = [text.strip() for text in texts]
+        try:
+            with transaction.atomic():
+                return self._add_items(texts, settings.CACHE_LIST_ITEM_TEXTS)
+        except IntegrityError:
+            # another writer added some of the same texts between our check
+            # and our insert (or the cached digests were stale): check again
+            # against the table itself
+            with transaction.atomic():
+                return self._add_items(texts, use_digests=False)
+
+    def _item_text_digests(self):
+        digests = get_item_text_digests(self.pk)
+        if digests is None:
+            digests = set(
+                text_digest(key)
+                for key in self.item_set.values_list('normalized_text', flat=True).iterator())
+            set_item_text_digests(self.pk, digests)
+        return digests
+
+    def _existing_texts(self, candidates, digests=None):
+        # takes and returns normalized texts
+        if digests is not None:
+            # a text whose digest isn't there can't be in the list already
+            candidates = [text for text in candidates if text_digest(text) in digests]
+        existing = set()
+        for chunk in chunked(candidates, settings.BULK_ITEMS_BATCH_SIZE):
+            existing.update(
+                self.item_set.filter(normalized_text__in=chunk)
+                .values_list('normalized_text', flat=True))
+        return existing
+
+    def _add_items(self, texts, use_digests):
+        keys = [normalize_item_text(text) for text in texts]
+        candidates = list(set(key for key in keys if key))
+        digests = self._item_text_digests() if use_digests else None
+        existing = self._existing_texts(candidates, digests)
+
+        results, new_items, seen = [], [], set(existing)
+        for text, key in zip(texts, keys):
+            if not key:
+                status = ITEM_EMPTY
+            elif key in seen:
+                status = ITEM_DUPLICATE
+            else:
+                status = ITEM_ADDED
+                seen.add(key)
+                new_items.append(Item(list=self, text=text, normalized_text=key))
+            results.append({'text': text, 'status': status})
+
+        if new_items:
+            Item.objects.bulk_create(
+                new_items, batch_size=settings.BULK_ITEMS_BATCH_SIZE)
+            if not self.name:
+                List.objects.filter(pk=self.pk, name='').update(
+                    name=new_items[0].text)
+                self.name = new_items[0].text
+            # bulk_create doesn't set ids on sqlite, so read them back
+            # for the change log
+            added = []
+            for chunk in chunked([item.normalized_text for item in new_items],
+                                 settings.BULK_ITEMS_BATCH_SIZE):
+                added.extend(
+                    self.item_set.filter(normalized_text__in=chunk).values_list('id', 'text'))
+            added.sort()
+            ItemTerm.index((id_, self.pk, text) for id_, text in added)
+            self.touch(changes=[
+                ListChange(list_id=self.pk, op=CHANGE_ITEM_ADDED, item_id=id_, text=text)
+                for id_, text in added])
+            if digests is not None:
+                # under the version the commit moves the list to, as
+                # touch()'s bump is superseded then
+                digests.update(text_digest(item.normalized_text) for item in new_items)
+                transaction.on_commit(partial(set_item_text_digests, self.pk, digests))
+        return results
+
+    @staticmethod
+    def share_many(list_ids, emails):
+        """Shares every one of the lists with every one of the users, in a
+        fixed number of queries however many there are. Returns a result
+        for each (list, email) pair, lists in id order and emails sorted."""
+        list_ids, emails = sorted(set(list_ids)), sorted(set(emails))
+        try:
+            with transaction.atomic():
+                return List._share_many(list_ids, emails)
+        except IntegrityError:
+            # someone else shared one of the pairs since we looked
+            with transaction.atomic():
+                return List._share_many(list_ids, emails)
+
+    @staticmethod
+    def _share_many(list_ids, emails):
+        Share = List.shared_with.through
+        owners = dict(List.objects.filter(id__in=list_ids).values_list('id', 'owner_id'))
+        users = set(
+            List.shared_with.field.related_model.objects
+            .filter(pk__in=emails).values_list('pk', flat=True))
+        existing = set(
+            Share.objects.filter(list_id__in=list(owners), user_id__in=list(users))
+            .values_list('list_id', 'user_id'))
+
+        results, new_shares = [], []
+        for list_id in list_ids:
+            for email in emails:
+                if list_id not in owners:
+                    status = SHARE_NO_SUCH_LIST
+                elif email not in users:
+                    status = SHARE_NO_SUCH_USER
+                elif email == owners[list_id]:
+                    status = SHARE_OWNER
+                elif (list_id, email) in existing:
+                    status = SHARE_EXISTING
+                else:
+                    status = SHARE_ADDED
+                    new_shares.append(Share(list_id=list_id, user_id=email))
+                results.append({'list': list_id, 'email': email, 'status': status})
+
+        if new_shares:
+            # bulk_create doesn't send m2m_changed, so log the changes that
+            # sharing_changed would have
+            Share.objects.bulk_create(new_shares)
+            List.touch_by_ids(
+                sorted(set(share.list_id for share in new_shares)),
+                [ListChange(list_id=share.list_id, op=CHANGE_SHARED, email=share.user_id)
+                 for share in new_shares])
+            _forget_access(set(share.user_id for share in new_shares))
+        return results
+
+    def items_page(self, after=None, page_size=None):
+        return ItemPage(self, after=after, page_size=page_size)
+
+    def items_page_holding(self, item, page_size=None):
+        """The page `item` is on, counting pages from the first the way the
+        pager's links do."""
+        page_size = page_size or settings.LIST_ITEMS_PAGE_SIZE
+        before = self.item_set.filter(id__lt=item.id).count()
+        start = before - before % page_size
+        after = None
+        if start:
+            after = self.item_set.order_by('id').values_list('id', flat=True)[start - 1]
+        return self.items_page(after=after, page_size=page_size)
+
+    def iter_item_texts(self, batch_size=None):
+        # keyset batches rather than .iterator(): the sqlite backend can't
+        # do chunked reads, so iterator() would still load every row at once
+        batch_size = batch_size or settings.LIST_ITEMS_STREAM_BATCH_SIZE
+        last_id = 0
+        while True:
+            batch = list(
+                self.item_set.filter(id__gt=last_id)
+                .order_by('id')
+                .values_list('id', 'text')[:batch_size])
+            for _, text in batch:
+                yield text
+            if len(batch) < batch_size:
+                return
+            last_id = batch[-1][0]
+
+    def touch(self, changes=()):
+        List.touch_by_ids([self.pk], changes)
+
+    @staticmethod
+    def touch_by_ids(list_ids, changes=()):
+        # each touch is one new revision, and the changes it made are logged
+        # against that revision; the row locks taken by the UPDATE keep
+        # anyone else from bumping it before we read it back
+        with transaction.atomic(savepoint=False):
+            List.objects.filter(pk__in=list_ids).update(
+                revision=F('revision') + 1, modified=timezone.now())
+            revisions = dict(
+                List.objects.filter(pk__in=list_ids).values_list('id', 'revision'))
+            if changes:
+                for change in changes:
+                    change.revision = revisions[change.list_id]
+                # left to Django to batch: it keeps sqlite under its bound
+                # parameter limit for however many columns a row has
+                ListChange.objects.bulk_create(changes)
+            # subscribers fetch the changes as soon as they hear, so don't
+            # tell them before they can see them
+            for list_id, revision in revisions.items():
+                transaction.on_commit(partial(live.publish, list_id, revision))
+        for list_id in list_ids:
+            bump_list_version(list_id)
+
+    def changes_since(self, revision):
+        """The logged changes after `revision`, oldest first, or None if some
+        of them have been compacted away."""
+        if revision < self.log_floor:
+            return None
+        return self.changes.filter(revision__gt=revision, revision__lte=self.revision)
+
+    def refresh_name(self):
+        self.name = self.item_set.values_list('text', flat=True).first() or ''
+        List.objects.filter(pk=self.pk).update(name=self.name)
+
 
 class Item(models.Model):
 
     text = models.TextField(default='')
-    list = models.ForeignKey(List, default=None)
+    # normalize_item_text(text), kept up to date by save() and set by
+    # anything that bulk-creates items
+    normalized_text = models.TextField(default='', blank=True, editable=False)
+    # indexed together with id below: items are always read a list at a
+    # time in id order
+    list = models.ForeignKey(List, default=None, db_index=False)
 
     class Meta:
         ordering = ('id',)
-        unique_together = ('list', 'text')
+        unique_together = ('list', 'normalized_text')
+        index_together = ('list', 'id')
 
     def __str__(self):
         return self.text
+
+    def clean(self):
+        self.normalized_text = normalize_item_text(self.text)
+
+    def save(self, *args, **kwargs):
+        adding = self.pk is None
+        self.normalized_text = normalize_item_text(self.text)
+        super().save(*args, **kwargs)
+        if adding:
+            # names only ever go from blank to set on insert, so a list we
+            # already know has a name can skip the UPDATE entirely
+            if not self.list.name:
+                List.objects.filter(pk=self.list_id, name='').update(name=self.text)
+                self.list.name = self.text
+        elif not Item.objects.filter(list_id=self.list_id, id__lt=self.id).exists():
+            List.objects.filter(pk=self.list_id).update(name=self.text)
+            self.list.name = self.text
+        ItemTerm.index([(self.id, self.list_id, self.text)], replace=not adding)
+        List.touch_by_ids([self.list_id], [ListChange(
+            list_id=self.list_id, op=CHANGE_ITEM_ADDED if adding else CHANGE_ITEM_CHANGED,
+            item_id=self.id, text=self.text)])
+
+    def delete(self, *args, **kwargs):
+        list_, item_id = self.list, self.id
+        result = super().delete(*args, **kwargs)
+        if list_.name == self.text:
+            list_.refresh_name()
+        list_.touch([ListChange(list_id=list_.id, op=CHANGE_ITEM_REMOVED, item_id=item_id)])
+        return result
+
+
+class ItemTerm(models.Model):
+    """The portable inverted index behind item search where FTS5 isn't
+    available (see lists.fts): a row per distinct word in each item."""
+    term = models.CharField(max_length=fts.MAX_TERM_LENGTH)
+    item = models.ForeignKey(Item, related_name='terms')
+    # copied from the item, so searches can narrow to a user's lists
+    # without joining items
+    list = models.ForeignKey(List, related_name='+')
+    count = models.PositiveSmallIntegerField(default=1)
+
+    class Meta:
+        unique_together = ('item', 'term')
+        index_together = ('term', 'list')
+
+    @staticmethod
+    def index(rows, replace=False):
+        """Indexes (item id, list id, text) rows, first dropping their old
+        terms if `replace`. Does nothing when FTS5 is in use."""
+        if fts.uses_fts():
+            return
+        rows = list(rows)
+        if replace:
+            for chunk in chunked([item_id for item_id, _, _ in rows],
+                                 settings.BULK_ITEMS_BATCH_SIZE):
+                ItemTerm.objects.filter(item_id__in=chunk).delete()
+        ItemTerm.objects.bulk_create([
+            ItemTerm(item_id=item_id, list_id=list_id, term=term, count=min(count, 32767))
+            for item_id, list_id, text in rows
+            for term, count in Counter(fts.tokenize(text)).items()
+        ])
+
+
+class ListChange(models.Model):
+    """One entry in a list's change log: what happened to an item or a
+    share at a given revision of the list."""
+    OPS = (
+        (CHANGE_ITEM_ADDED, 'Item added'),
+        (CHANGE_ITEM_CHANGED, 'Item changed'),
+        (CHANGE_ITEM_REMOVED, 'Item removed'),
+        (CHANGE_SHARED, 'Shared'),
+        (CHANGE_UNSHARED, 'Unshared'),
+    )
+
+    list = models.ForeignKey(List, related_name='changes')
+    revision = models.PositiveIntegerField()
+    op = models.CharField(max_length=16, choices=OPS)
+    # not a foreign key: removed items are still referred to
+    item_id = models.IntegerField(null=True)
+    text = models.TextField(blank=True)
+    email = models.EmailField(blank=True)
+    created = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        ordering = ('id',)
+        index_together = ('list', 'revision')
+
+
+class ArchivedList(models.Model):
+    """A list nobody had touched in a while, with its items packed into
+    one compressed blob, moved out of the hot tables by `manage.py
+    archive_lists`. Only lists nobody owns or shares are archived, as
+    they can only be reached by their URL, which restores them."""
+    # the list's own id, which it gets back when restored
+    id = models.IntegerField(primary_key=True)
+    name = models.TextField(default='', blank=True)
+    revision = models.PositiveIntegerField(default=0)
+    modified = models.DateTimeField()
+    archived = models.DateTimeField(default=timezone.now)
+    # zlib-compressed JSON [[item id, text], ...] in id order
+    items = models.BinaryField()
+
+    @staticmethod
+    def pack_items(items):
+        return zlib.compress(json.dumps(items, separators=(',', ':')).encode('utf-8'))
+
+    def unpack_items(self):
+        return json.loads(zlib.decompress(bytes(self.items)).decode('utf-8'))
+
+    @staticmethod
+    def restore(list_id):
+        """Moves the list back into lists_list, items and ids as they were.
+        Raises List.DoesNotExist if it isn't archived."""
+        try:
+            with transaction.atomic():
+                try:
+                    archived = ArchivedList.objects.get(id=list_id)
+                except ArchivedList.DoesNotExist:
+                    raise List.DoesNotExist('List %s does not exist' % (list_id,))
+                # the change log went with the archive, so clients that
+                # knew the list before have to start from a snapshot
+                List.objects.create(
+                    id=archived.id, name=archived.name,
+                    revision=archived.revision, log_floor=archived.revision)
+                items = archived.unpack_items()
+                Item.objects.bulk_create([
+                    Item(id=id_, list_id=archived.id, text=text,
+                         normalized_text=normalize_item_text(text))
+                    for id_, text in items
+                ], batch_size=settings.BULK_ITEMS_BATCH_SIZE)
+                ItemTerm.index((id_, archived.id, text) for id_, text in items)
+                archived.delete()
+        except IntegrityError:
+            # another request restored it first
+            pass
+
+
+def sharing_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        # once cleared we can't tell what it touched, so note it down first
+        if reverse:
+            instance._cleared_pks = list(instance.shared_with.values_list('id', flat=True))
+        else:
+            instance._cleared_pks = list(instance.shared_with.values_list('pk', flat=True))
+    if not action.startswith('post_'):
+        return
+    if action == 'post_clear':
+        pk_set = instance.__dict__.pop('_cleared_pks', [])
+    op = CHANGE_SHARED if action == 'post_add' else CHANGE_UNSHARED
+    if reverse:
+        changes = [ListChange(list_id=list_id, op=op, email=instance.pk) for list_id in pk_set]
+    else:
+        changes = [ListChange(list_id=instance.pk, op=op, email=email) for email in pk_set]
+    if changes:
+        List.touch_by_ids(sorted(set(change.list_id for change in changes)), changes)
+        _forget_access(set(change.email for change in changes))
+
+def _forget_access(emails):
+    # now, so this request sees the change, and again on commit, in case
+    # another request cached the old shares in between
+    forget_shared_list_ids(emails)
+    transaction.on_commit(partial(forget_shared_list_ids, emails))
+
+m2m_changed.connect(sharing_changed, sender=List.shared_with.through)
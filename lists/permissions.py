@@ -0,0 +1,49 @@
+"""Who may use a list.
+
+A list nobody owns (one started while logged out) is open to anyone with
+its URL. An owned list is open to its owner and the users it has been
+shared with, and only its owner may share it further.
+
+Ownership is on the list row, which every caller has already fetched.
+The lists shared with a user are cached as a set of ids, so once that is
+warm a check costs no queries. sharing_changed and List.share_many forget
+a user's set as soon as their shares change.
+"""
+from django.db.models import Q
+
+from lists.cache import get_shared_list_ids, set_shared_list_ids
+from lists.models import List
+
+
+def shared_list_ids(user):
+    """The ids of the lists shared with `user`, as a frozenset."""
+    version, list_ids = get_shared_list_ids(user.pk)
+    if list_ids is None:
+        list_ids = frozenset(
+            List.shared_with.through.objects.filter(user_id=user.pk)
+            .values_list('list_id', flat=True))
+        set_shared_list_ids(user.pk, version, list_ids)
+    return list_ids
+
+
+def can_view(user, list_):
+    """Whether `user` may see the list and add items to it."""
+    if list_.owner_id is None:
+        return True
+    if not user.is_authenticated:
+        return False
+    return list_.owner_id == user.pk or list_.id in shared_list_ids(user)
+
+
+def can_share(user, list_):
+    if list_.owner_id is None:
+        return True
+    return user.is_authenticated and list_.owner_id == user.pk
+
+
+def viewable(user, queryset):
+    """`queryset` narrowed to the lists `user` may view, in the same query."""
+    if not user.is_authenticated:
+        return queryset.filter(owner=None)
+    return queryset.filter(
+        Q(owner=None) | Q(owner_id=user.pk) | Q(id__in=list(shared_list_ids(user))))
@@ -0,0 +1,71 @@
+"""Searching the items in a user's lists (see lists.fts for the indexes)."""
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, Sum
+
+from lists import fts
+from lists.models import Item, ItemTerm, List
+
+# words beyond this are ignored
+MAX_QUERY_TERMS = 10
+
+# The user's list ids are turned into an OR of list_tag tokens in SQL, so
+# the whole search is a single query; 'l0' matches nothing for a user with
+# no lists.
+FTS_SEARCH_SQL = '''
+    SELECT item.id, item.text, list.id, list.name
+    FROM {fts}
+    JOIN {item} item ON item.id = {fts}.rowid
+    JOIN {list} list ON list.id = item.list_id
+    WHERE {fts} MATCH %s || ' AND list_tag : (' || coalesce((
+        SELECT group_concat('l' || id, ' OR ') FROM (
+            SELECT id FROM {list} WHERE owner_id = %s
+            UNION SELECT list_id FROM {shared} WHERE user_id = %s)
+        ), 'l0') || ')'
+    ORDER BY bm25({fts}, 1.0, 0.0), item.id
+    LIMIT %s
+'''.format(
+    fts=fts.FTS_TABLE,
+    item=Item._meta.db_table,
+    list=List._meta.db_table,
+    shared=List.shared_with.through._meta.db_table)
+
+
+def search_items(user, query, limit=None):
+    """The items in lists `user` owns or has had shared with them that
+    contain every word of `query`, best match first, as dicts of the item's
+    id and text and its list's id and name."""
+    terms = list(dict.fromkeys(fts.tokenize(query)))[:MAX_QUERY_TERMS]
+    if not terms:
+        return []
+    limit = limit or settings.SEARCH_RESULTS_LIMIT
+    if fts.uses_fts():
+        rows = _search_fts(user, terms, limit)
+    else:
+        rows = _search_terms(user, terms, limit)
+    return [
+        {'id': item_id, 'text': text, 'list': list_id, 'list_name': list_name}
+        for item_id, text, list_id, list_name in rows]
+
+
+def _search_fts(user, terms, limit):
+    # every term quoted, so nothing the user types is taken as FTS syntax
+    match = ' AND '.join('text : "%s"' % (term,) for term in terms)
+    with connection.cursor() as cursor:
+        cursor.execute(FTS_SEARCH_SQL, [match, user.pk, user.pk, limit])
+        return cursor.fetchall()
+
+
+def _search_terms(user, terms, limit):
+    user_lists = List.objects.visible_to(user).values('id')
+    matches = list(
+        ItemTerm.objects.filter(term__in=terms, list__in=user_lists)
+        .values('item_id')
+        .annotate(matched=Count('term'), weight=Sum('count'))
+        .filter(matched=len(terms))
+        .order_by('-weight', 'item_id')
+        .values_list('item_id', flat=True)[:limit])
+    items = {
+        row[0]: row for row in
+        Item.objects.filter(id__in=matches).values_list('id', 'text', 'list_id', 'list__name')}
+    return [items[item_id] for item_id in matches if item_id in items]
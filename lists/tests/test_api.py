@@ -0,0 +1,305 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from lists.forms import (
+    DUPLICATE_ITEM_ERROR, EMAILS_TYPE_ERROR, EMPTY_ITEM_ERROR, NONEXISTENT_USER_EMAIL_ERROR)
+from lists.models import Item, List
+import json
+
+User = get_user_model()
+
+
+class ApiTestCase(TestCase):
+
+    def post_json(self, url, data):
+        return self.client.post(url, json.dumps(data), content_type='application/json')
+
+
+class ListsApiTest(ApiTestCase):
+
+    def test_batch_get_returns_requested_lists(self):
+        first = List.create_new('first')
+        List.create_new('not asked for')
+        third = List.create_new('third')
+        response = self.client.get('/api/lists/?ids=%d,%d' % (third.id, first.id))
+        self.assertEqual(
+            [l['name'] for l in response.json()['lists']], ['first', 'third'])
+
+    def test_batch_get_takes_constant_queries(self):
+        owner = User.objects.create(email='a@b.com')
+        User.objects.create(email='c@d.com')
+        ids = []
+        for i in range(5):
+            list_ = List.create_new('list %d' % (i,), owner=owner)
+            list_.shared_with.add('c@d.com')
+            ids.append(str(list_.id))
+        self.client.force_login(owner)
+        url = '/api/lists/?ids=%s' % (','.join(ids),)
+        # the first request caches the user and the lists shared with them
+        self.client.get(url)
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.json()['lists'][0]['shared_with'], ['c@d.com'])
+
+    def test_fields_selects_what_is_returned(self):
+        list_ = List.create_new('first')
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/lists/?ids=%d&fields=name' % (list_.id,))
+        self.assertEqual(response.json(), {'lists': [{'name': 'first'}]})
+
+    def test_unknown_field_is_bad_request(self):
+        response = self.client.get('/api/lists/?ids=1&fields=name,password')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['error'])
+
+    def test_bad_ids_are_bad_request(self):
+        self.assertEqual(self.client.get('/api/lists/?ids=1,x').status_code, 400)
+
+    @override_settings(LIST_API_MAX_BATCH=2)
+    def test_batch_size_is_limited(self):
+        self.assertEqual(self.client.get('/api/lists/?ids=1,2,3').status_code, 400)
+
+    def test_logged_in_user_gets_own_and_shared_lists(self):
+        user = User.objects.create(email='a@b.com')
+        owned = List.create_new('mine', owner=user)
+        shared = List.create_new('theirs')
+        shared.shared_with.add(user)
+        List.create_new('someone else')
+        self.client.force_login(user)
+        response = self.client.get('/api/lists/?fields=id')
+        self.assertEqual(response.json()['lists'], [{'id': owned.id}, {'id': shared.id}])
+
+    def test_anonymous_user_must_pass_ids(self):
+        self.assertEqual(self.client.get('/api/lists/').status_code, 400)
+
+    def test_POST_creates_list(self):
+        response = self.post_json('/api/lists/', {'text': 'first item'})
+        self.assertEqual(response.status_code, 201)
+        list_ = List.objects.get()
+        self.assertEqual(response.json()['id'], list_.id)
+        self.assertEqual(list_.item_set.get().text, 'first item')
+
+    def test_POST_accepts_form_data(self):
+        response = self.client.post('/api/lists/', {'text': 'first item'})
+        self.assertEqual(response.status_code, 201)
+
+    def test_POST_validates_with_form(self):
+        response = self.post_json('/api/lists/', {'text': ''})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'], {'text': [EMPTY_ITEM_ERROR]})
+        self.assertEqual(List.objects.count(), 0)
+
+    def test_POST_invalid_json_is_bad_request(self):
+        response = self.client.post('/api/lists/', '{', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class ListDetailApiTest(ApiTestCase):
+
+    def test_returns_list(self):
+        owner = User.objects.create(email='a@b.com')
+        list_ = List.create_new('first', owner=owner)
+        self.client.force_login(owner)
+        data = self.client.get('/api/lists/%d/' % (list_.id,)).json()
+        self.assertEqual(data['name'], 'first')
+        self.assertEqual(data['owner'], 'a@b.com')
+        self.assertEqual(data['shared_with'], [])
+
+    def test_missing_list_is_404(self):
+        self.assertEqual(self.client.get('/api/lists/99/').status_code, 404)
+
+    def test_only_GET_allowed(self):
+        list_ = List.create_new('first')
+        self.assertEqual(self.client.delete('/api/lists/%d/' % (list_.id,)).status_code, 405)
+
+
+class ListAccessApiTest(ApiTestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create(email='owner@example.com')
+        self.sharee = User.objects.create(email='sharee@example.com')
+        self.stranger = User.objects.create(email='stranger@example.com')
+        self.list_ = List.create_new('secret', owner=self.owner)
+        self.list_.shared_with.add(self.sharee)
+
+    def test_batch_get_leaves_out_lists_user_may_not_view(self):
+        open_list = List.create_new('open')
+        url = '/api/lists/?ids=%d,%d&fields=id' % (self.list_.id, open_list.id)
+        self.assertEqual(self.client.get(url).json()['lists'], [{'id': open_list.id}])
+        self.client.force_login(self.stranger)
+        self.assertEqual(self.client.get(url).json()['lists'], [{'id': open_list.id}])
+        self.client.force_login(self.sharee)
+        self.assertEqual(
+            self.client.get(url).json()['lists'], [{'id': self.list_.id}, {'id': open_list.id}])
+
+    def test_stranger_is_forbidden_from_each_list_endpoint(self):
+        self.client.force_login(self.stranger)
+        for path in ('', 'items/', 'shares/', 'changes/', 'changes/?since=0', 'events/'):
+            response = self.client.get('/api/lists/%d/%s' % (self.list_.id, path))
+            self.assertEqual(response.status_code, 403, path)
+            self.assertNotIn('secret', response.content.decode())
+
+    def test_anonymous_user_is_forbidden(self):
+        response = self.client.get('/api/lists/%d/' % (self.list_.id,))
+        self.assertEqual(response.status_code, 403)
+
+    def test_sharee_may_read(self):
+        self.client.force_login(self.sharee)
+        for path in ('', 'changes/?since=0'):
+            response = self.client.get('/api/lists/%d/%s' % (self.list_.id, path))
+            self.assertEqual(response.status_code, 200, path)
+
+
+class ListItemsApiTest(ApiTestCase):
+
+    def test_returns_items_in_pages(self):
+        list_ = List.create_new('a')
+        list_.add_items(['b', 'c'])
+        url = '/api/lists/%d/items/?fields=text&page_size=2' % (list_.id,)
+        first = self.client.get(url).json()
+        self.assertEqual(first['items'], [{'text': 'a'}, {'text': 'b'}])
+        second = self.client.get(url + '&after=%d' % (first['next'],)).json()
+        self.assertEqual(second, {'items': [{'text': 'c'}], 'next': None})
+
+    def test_missing_list_is_404(self):
+        self.assertEqual(self.client.get('/api/lists/99/items/').status_code, 404)
+
+    def test_POST_adds_item(self):
+        list_ = List.create_new('a')
+        response = self.post_json('/api/lists/%d/items/' % (list_.id,), {'text': 'b'})
+        self.assertEqual(response.status_code, 201)
+        item = Item.objects.get(text='b')
+        self.assertEqual(response.json(), {'id': item.id, 'text': 'b', 'list': list_.id})
+
+    def test_POST_rejects_duplicate(self):
+        list_ = List.create_new('a')
+        response = self.post_json('/api/lists/%d/items/' % (list_.id,), {'text': 'a'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'], {'text': [DUPLICATE_ITEM_ERROR]})
+
+    def test_someone_elses_list_is_403(self):
+        list_ = List.create_new('a', owner=User.objects.create(email='a@b.com'))
+        self.assertEqual(self.client.get('/api/lists/%d/items/' % (list_.id,)).status_code, 403)
+
+
+class ListSharesApiTest(ApiTestCase):
+
+    def test_POST_shares_list(self):
+        User.objects.create(email='c@d.com')
+        list_ = List.create_new('a')
+        response = self.post_json('/api/lists/%d/shares/' % (list_.id,), {'email': 'c@d.com'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json(), {'shared_with': ['c@d.com']})
+        self.assertEqual(list(list_.shared_with.all()), [User.objects.get()])
+
+    def test_POST_rejects_unknown_user(self):
+        list_ = List.create_new('a')
+        response = self.post_json('/api/lists/%d/shares/' % (list_.id,), {'email': 'c@d.com'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'], {'email': [NONEXISTENT_USER_EMAIL_ERROR]})
+
+    def test_GET_returns_sharees(self):
+        User.objects.create(email='c@d.com')
+        list_ = List.create_new('a')
+        list_.shared_with.add('c@d.com')
+        response = self.client.get('/api/lists/%d/shares/' % (list_.id,))
+        self.assertEqual(response.json(), {'shared_with': ['c@d.com']})
+
+    def test_POST_by_sharee_is_403(self):
+        owner = User.objects.create(email='a@b.com')
+        sharee = User.objects.create(email='c@d.com')
+        User.objects.create(email='e@f.com')
+        list_ = List.create_new('a', owner=owner)
+        list_.shared_with.add(sharee)
+        self.client.force_login(sharee)
+        response = self.post_json('/api/lists/%d/shares/' % (list_.id,), {'email': 'e@f.com'})
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(list(list_.shared_with.all()), [sharee])
+
+
+class SharesApiTest(ApiTestCase):
+
+    def test_requires_login(self):
+        response = self.post_json('/api/shares/', {'lists': [], 'emails': []})
+        self.assertEqual(response.status_code, 403)
+
+    def test_POST_shares_lists_with_users(self):
+        owner = User.objects.create(email='a@b.com')
+        User.objects.create(email='c@d.com')
+        User.objects.create(email='e@f.com')
+        lists = [List.create_new('list %d' % (i,), owner=owner) for i in range(2)]
+        lists[0].shared_with.add('c@d.com')
+        self.client.force_login(owner)
+        response = self.post_json('/api/shares/', {
+            'lists': [list_.id for list_ in lists], 'emails': ['c@d.com', 'e@f.com']})
+        body = response.json()
+        self.assertEqual(body['shared'], 3)
+        self.assertEqual(body['results'][0], {'list': lists[0].id, 'email': 'c@d.com', 'status': 'already_shared'})
+
+    def test_POST_rejects_lists_the_user_does_not_own(self):
+        owner = User.objects.create(email='a@b.com')
+        other = List.create_new('not mine')
+        self.client.force_login(owner)
+        response = self.post_json('/api/shares/', {'lists': [other.id], 'emails': ['c@d.com']})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('lists', response.json()['errors'])
+
+    def test_POST_rejects_emails_that_are_not_strings(self):
+        self.client.force_login(User.objects.create(email='a@b.com'))
+        for emails in ([1], 5, {'a': 'c@d.com'}):
+            response = self.post_json('/api/shares/', {'lists': [], 'emails': emails})
+            self.assertEqual(response.status_code, 400, emails)
+            self.assertEqual(response.json()['errors']['emails'], [EMAILS_TYPE_ERROR])
+
+
+class ListChangesApiTest(ApiTestCase):
+
+    def test_returns_changes_since_revision(self):
+        User.objects.create(email='c@d.com')
+        list_ = List.create_new('a')
+        list_.add_items(['b'])
+        list_.shared_with.add('c@d.com')
+        item_b = Item.objects.get(text='b')
+        response = self.client.get('/api/lists/%d/changes/?since=1' % (list_.id,))
+        self.assertEqual(response.json(), {'revision': 3, 'changes': [
+            {'revision': 2, 'op': 'item_added', 'item': item_b.id, 'text': 'b'},
+            {'revision': 3, 'op': 'shared', 'email': 'c@d.com'},
+        ]})
+
+    def test_up_to_date_client_gets_no_changes(self):
+        list_ = List.create_new('a')
+        response = self.client.get('/api/lists/%d/changes/?since=1' % (list_.id,))
+        self.assertEqual(response.json(), {'revision': 1, 'changes': []})
+
+    def test_polling_does_not_depend_on_list_size(self):
+        list_ = List.create_new('a')
+        list_.add_items(['item %d' % (i,) for i in range(500)])
+        list_.add_items(['new'])
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/lists/%d/changes/?since=2' % (list_.id,))
+        self.assertEqual(len(response.json()['changes']), 1)
+
+    def test_snapshot_without_since(self):
+        list_ = List.create_new('a')
+        list_.add_items(['b'])
+        data = self.client.get('/api/lists/%d/changes/' % (list_.id,)).json()
+        self.assertEqual(data['revision'], 2)
+        self.assertEqual(data['snapshot']['name'], 'a')
+        self.assertEqual([item['text'] for item in data['snapshot']['items']], ['a', 'b'])
+
+    def test_snapshot_when_log_compacted(self):
+        list_ = List.create_new('a')
+        list_.add_items(['b'])
+        List.objects.filter(id=list_.id).update(log_floor=2)
+        data = self.client.get('/api/lists/%d/changes/?since=1' % (list_.id,)).json()
+        self.assertNotIn('changes', data)
+        self.assertEqual(len(data['snapshot']['items']), 2)
+
+    def test_snapshot_when_client_is_ahead(self):
+        list_ = List.create_new('a')
+        data = self.client.get('/api/lists/%d/changes/?since=5' % (list_.id,)).json()
+        self.assertIn('snapshot', data)
+
+    def test_bad_since_is_bad_request(self):
+        list_ = List.create_new('a')
+        response = self.client.get('/api/lists/%d/changes/?since=-1' % (list_.id,))
+        self.assertEqual(response.status_code, 400)
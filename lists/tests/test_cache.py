@@ -0,0 +1,93 @@
+from django.test import TestCase, TransactionTestCase
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from lists.cache import bump_list_version, get_list_version
+from lists.models import Item, List
+
+User = get_user_model()
+
+
+class ListVersionTest(TestCase):
+
+    def test_version_is_stable_between_reads(self):
+        list_ = List.objects.create()
+        self.assertEqual(get_list_version(list_.id), get_list_version(list_.id))
+
+    def test_bump_changes_version(self):
+        list_ = List.objects.create()
+        before = get_list_version(list_.id)
+        bump_list_version(list_.id)
+        self.assertNotEqual(get_list_version(list_.id), before)
+
+    def test_adding_item_bumps_version(self):
+        list_ = List.objects.create()
+        before = get_list_version(list_.id)
+        Item.objects.create(list=list_, text='new')
+        self.assertNotEqual(get_list_version(list_.id), before)
+
+    def test_adding_items_in_bulk_bumps_version(self):
+        list_ = List.objects.create()
+        before = get_list_version(list_.id)
+        list_.add_items(['a', 'b'])
+        self.assertNotEqual(get_list_version(list_.id), before)
+
+    def test_sharing_bumps_version(self):
+        list_ = List.objects.create()
+        user = User.objects.create(email='a@b.com')
+        before = get_list_version(list_.id)
+        list_.shared_with.add(user)
+        self.assertNotEqual(get_list_version(list_.id), before)
+
+    def test_sharing_from_user_side_bumps_version(self):
+        list_ = List.objects.create()
+        user = User.objects.create(email='a@b.com')
+        before = get_list_version(list_.id)
+        user.shared_with.add(list_)
+        after_add = get_list_version(list_.id)
+        self.assertNotEqual(after_add, before)
+        user.shared_with.clear()
+        self.assertNotEqual(get_list_version(list_.id), after_add)
+
+    def test_changing_owner_bumps_version(self):
+        list_ = List.objects.create()
+        before = get_list_version(list_.id)
+        list_.owner = User.objects.create(email='a@b.com')
+        list_.save()
+        self.assertNotEqual(get_list_version(list_.id), before)
+
+
+class ListVersionOnCommitTest(TransactionTestCase):
+
+    def test_version_moves_on_again_when_write_commits(self):
+        # anything cached while the write was still uncommitted was read
+        # from the old rows
+        list_ = List.create_new('a')
+        with transaction.atomic():
+            list_.add_items(['b'])
+            during = get_list_version(list_.id)
+        self.assertNotEqual(get_list_version(list_.id), during)
+
+
+class CachedListPageTest(TestCase):
+
+    def test_repeat_view_does_not_query_items_or_sharees(self):
+        list_ = List.create_new('cached item')
+        self.client.get('/lists/%d/' % (list_.id,))
+        with self.assertNumQueries(1):
+            response = self.client.get('/lists/%d/' % (list_.id,))
+        self.assertContains(response, 'cached item')
+
+    def test_new_item_shows_up_after_page_was_cached(self):
+        list_ = List.create_new('first')
+        self.client.get('/lists/%d/' % (list_.id,))
+        self.client.post('/lists/%d/' % (list_.id,), data={'text': 'second'})
+        response = self.client.get('/lists/%d/' % (list_.id,))
+        self.assertContains(response, 'second')
+
+    def test_new_sharee_shows_up_after_page_was_cached(self):
+        list_ = List.create_new('first')
+        user = User.objects.create(email='sharee@example.com')
+        self.client.get('/lists/%d/' % (list_.id,))
+        list_.shared_with.add(user)
+        response = self.client.get('/lists/%d/' % (list_.id,))
+        self.assertContains(response, 'sharee@example.com')
@@ -0,0 +1,128 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from lists.models import ArchivedList, Item, List, ListChange
+from lists.search import search_items
+
+User = get_user_model()
+
+
+class CompactListChangesTest(TestCase):
+
+    def test_deletes_old_changes_and_raises_log_floor(self):
+        list_ = List.create_new('a')
+        list_.add_items(['b', 'c'])
+        list_.add_items(['d'])
+        ListChange.objects.filter(revision__lte=2).update(
+            created=timezone.now() - timedelta(days=31))
+        out = StringIO()
+        call_command('compact_list_changes', days=30, batch_size=2, stdout=out)
+        list_.refresh_from_db()
+        self.assertEqual(list_.log_floor, 2)
+        self.assertEqual(list(list_.changes.values_list('text', flat=True)), ['d'])
+        self.assertIn('Compacted 3', out.getvalue())
+        self.assertIsNone(list_.changes_since(1))
+        self.assertEqual(list_.changes_since(2).count(), 1)
+
+    def test_keeps_recent_changes(self):
+        list_ = List.create_new('a')
+        call_command('compact_list_changes', stdout=StringIO())
+        list_.refresh_from_db()
+        self.assertEqual(list_.log_floor, 0)
+        self.assertEqual(list_.changes.count(), 1)
+
+
+def _age(list_, days):
+    List.objects.filter(id=list_.id).update(modified=timezone.now() - timedelta(days=days))
+
+
+class ArchiveListsTest(TestCase):
+
+    def test_moves_stale_lists_and_their_items(self):
+        stale = [List.create_new('stale %d' % (i,)) for i in range(3)]
+        stale[0].add_items(['b', 'c'])
+        for list_ in stale:
+            _age(list_, 91)
+        fresh = List.create_new('fresh')
+        out = StringIO()
+        call_command('archive_lists', days=90, batch_size=2, stdout=out)
+        self.assertIn('Archived 3 lists and 5 items', out.getvalue())
+        self.assertEqual(list(List.objects.all()), [fresh])
+        self.assertEqual(list(Item.objects.values_list('text', flat=True)), ['fresh'])
+        self.assertEqual(ListChange.objects.exclude(list=fresh).count(), 0)
+        archived = ArchivedList.objects.get(id=stale[0].id)
+        self.assertEqual(archived.name, 'stale 0')
+        self.assertEqual(
+            [text for _, text in archived.unpack_items()], ['stale 0', 'b', 'c'])
+
+    def test_leaves_owned_and_shared_lists(self):
+        user = User.objects.create(email='a@b.com')
+        owned = List.create_new('owned', owner=user)
+        shared = List.create_new('shared')
+        shared.shared_with.add(user)
+        for list_ in (owned, shared):
+            _age(list_, 91)
+        call_command('archive_lists', days=90, stdout=StringIO())
+        self.assertEqual(List.objects.count(), 2)
+        self.assertEqual(ArchivedList.objects.count(), 0)
+
+    def test_batch_is_rolled_back_and_read_again_if_a_list_changes(self):
+        lists = [List.create_new('stale %d' % (i,)) for i in range(2)]
+        for list_ in lists:
+            _age(list_, 91)
+        user = User.objects.create(email='a@b.com')
+        bulk_create = ArchivedList.objects.bulk_create
+        calls = []
+
+        def share_first(objs):
+            # stands in for another request sharing the list; it can't run
+            # in between here, so the first attempt's rollback undoes it too
+            if not calls:
+                lists[0].shared_with.add(user)
+            calls.append(len(objs))
+            return bulk_create(objs)
+
+        with patch.object(ArchivedList.objects, 'bulk_create', side_effect=share_first):
+            out = StringIO()
+            call_command('archive_lists', days=90, stdout=out)
+        self.assertEqual(calls, [2, 2])
+        self.assertIn('Archived 2 lists and 2 items', out.getvalue())
+        self.assertEqual(ArchivedList.objects.count(), 2)
+
+    def test_restore_puts_list_back_as_it_was(self):
+        list_ = List.create_new('a')
+        list_.add_items(['b'])
+        item_ids = list(list_.item_set.values_list('id', flat=True))
+        _age(list_, 91)
+        call_command('archive_lists', days=90, stdout=StringIO())
+        restored = List.objects.get_or_restore(list_.id)
+        self.assertEqual(restored.name, 'a')
+        self.assertEqual(restored.log_floor, restored.revision)
+        self.assertEqual(
+            list(restored.item_set.values_list('id', 'text')), list(zip(item_ids, 'ab')))
+        self.assertFalse(ArchivedList.objects.exists())
+        # unique and searchable again
+        self.assertEqual(restored.add_items(['B'])[0]['status'], 'duplicate')
+        user = User.objects.create(email='a@b.com')
+        restored.shared_with.add(user)
+        self.assertEqual([result['text'] for result in search_items(user, 'b')], ['b'])
+
+    def test_restoring_missing_list_raises(self):
+        with self.assertRaises(List.DoesNotExist):
+            List.objects.get_or_restore(99)
+
+
+class ArchiveListsVacuumTest(TransactionTestCase):
+
+    def test_reports_space_reclaimed(self):
+        list_ = List.create_new('a')
+        list_.add_items(['item %d' % (i,) for i in range(500)])
+        _age(list_, 91)
+        out = StringIO()
+        call_command('archive_lists', days=90, vacuum=True, stdout=out)
+        self.assertIn('Archived 1 lists and 501 items', out.getvalue())
+        self.assertRegex(out.getvalue(), r'Vacuumed: \d+ bytes reclaimed')
@@ -0,0 +1,104 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from lists.models import Item, List
+
+User = get_user_model()
+
+
+class ListRevisionTest(TestCase):
+
+    def revision(self, list_):
+        return List.objects.get(id=list_.id).revision
+
+    def test_adding_item_bumps_revision_and_modified(self):
+        list_ = List.create_new('first')
+        before = List.objects.get(id=list_.id)
+        Item.objects.create(list=list_, text='second')
+        after = List.objects.get(id=list_.id)
+        self.assertGreater(after.revision, before.revision)
+        self.assertGreater(after.modified, before.modified)
+
+    def test_bulk_add_bumps_revision(self):
+        list_ = List.create_new('first')
+        before = self.revision(list_)
+        list_.add_items(['second', 'third'])
+        self.assertEqual(self.revision(list_), before + 1)
+
+    def test_sharing_bumps_revision(self):
+        list_ = List.create_new('first')
+        before = self.revision(list_)
+        list_.shared_with.add(User.objects.create(email='a@b.com'))
+        self.assertEqual(self.revision(list_), before + 1)
+
+
+class ListPageConditionalGetTest(TestCase):
+
+    def setUp(self):
+        self.list_ = List.create_new('first')
+        self.url = '/lists/%d/' % (self.list_.id,)
+
+    def test_response_carries_etag_and_last_modified(self):
+        response = self.client.get(self.url)
+        self.assertTrue(response.has_header('ETag'))
+        self.assertTrue(response.has_header('Last-Modified'))
+
+    def test_matching_etag_gets_304_without_item_queries(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_changes_when_item_added(self):
+        etag = self.client.get(self.url)['ETag']
+        Item.objects.create(list=self.list_, text='second')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'second')
+
+    def test_etag_changes_when_list_shared(self):
+        etag = self.client.get(self.url)['ETag']
+        self.list_.shared_with.add(User.objects.create(email='a@b.com'))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_differs_per_logged_in_user(self):
+        etag = self.client.get(self.url)['ETag']
+        self.client.force_login(User.objects.create(email='a@b.com'))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_if_modified_since_gets_304_for_anonymous_user(self):
+        last_modified = self.client.get(self.url)['Last-Modified']
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_no_validators_on_POST(self):
+        response = self.client.post(self.url, data={'text': 'second'})
+        self.assertFalse(response.has_header('ETag'))
+
+
+class MyListsConditionalGetTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(email='a@b.com')
+        self.list_ = List.create_new('first', owner=self.user)
+        self.url = '/lists/users/a@b.com/'
+        self.client.force_login(self.user)
+
+    def test_matching_etag_gets_304(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_changes_when_new_list_created(self):
+        etag = self.client.get(self.url)['ETag']
+        List.create_new('second', owner=self.user)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_changes_when_list_shared_with_user(self):
+        etag = self.client.get(self.url)['ETag']
+        List.create_new('shared').shared_with.add(self.user)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'shared')
@@ -1,8 +1,9 @@
 from django.test import TestCase
+from django.test import override_settings
 from lists.forms import (
     DUPLICATE_ITEM_ERROR, EMPTY_ITEM_ERROR,
-    ExistingListItemForm, ItemForm, NewListForm, ShareListForm,
-    NONEXISTENT_USER_EMAIL_ERROR, SAME_EMAIL_ERROR)
+    BatchShareForm, ExistingListItemForm, ItemForm, NewListForm, ShareListForm,
+    NONEXISTENT_USER_EMAIL_ERROR, SAME_EMAIL_ERROR, TOO_MANY_ERROR)
 from lists.models import Item, List
 import unittest
 from unittest.mock import patch, Mock
@@ -76,8 +77,38 @@ class ExistingListItemFormTest(TestCase):
         list_ = List.objects.create()
         Item.objects.create(list=list_, text='no twins!')
         form = ExistingListItemForm(for_list=list_, data={'text': 'no twins!'})
+        self.assertTrue(form.is_valid())
+        self.assertIsNone(form.save())
         self.assertFalse(form.is_valid())
         self.assertEqual(form.errors['text'], [DUPLICATE_ITEM_ERROR])
+        self.assertEqual(list_.item_set.count(), 1)
+
+    def test_near_duplicate_items_are_duplicates(self):
+        list_ = List.objects.create()
+        Item.objects.create(list=list_, text='No twins!')
+        form = ExistingListItemForm(for_list=list_, data={'text': ' no  TWINS! '})
+        self.assertTrue(form.is_valid())
+        self.assertIsNone(form.save())
+        self.assertEqual(form.errors['text'], [DUPLICATE_ITEM_ERROR])
+
+    def test_validation_does_not_query_for_duplicates(self):
+        list_ = List.objects.create()
+        form = ExistingListItemForm(for_list=list_, data={'text': 'hi'})
+        with self.assertNumQueries(0):
+            self.assertTrue(form.is_valid())
+
+    def test_duplicate_added_after_validation_becomes_a_form_error(self):
+        # another sharee adds the same text between validating and saving
+        list_ = List.objects.create()
+        form = ExistingListItemForm(for_list=list_, data={'text': 'race'})
+        self.assertTrue(form.is_valid())
+        Item.objects.create(list=list_, text='race')
+        self.assertIsNone(form.save())
+        self.assertEqual(form.errors['text'], [DUPLICATE_ITEM_ERROR])
+        # the failed insert was rolled back to its savepoint, so the
+        # transaction it ran in can carry on
+        Item.objects.create(list=list_, text='after')
+        self.assertEqual(list_.item_set.count(), 2)
 
     def test_form_save(self):
         list_ = List.objects.create()
@@ -147,3 +178,54 @@ class ShareListFormTest(TestCase):
         form = ShareListForm(data={'share_with': user.email})
         with self.assertRaises(AttributeError):
             form.is_valid()
+
+
+class BatchShareFormTest(TestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create(email='a@b.com')
+        self.list_ = List.create_new('mine', owner=self.owner)
+
+    def test_renders_owners_lists_by_name(self):
+        List.create_new('not mine')
+        html = BatchShareForm(self.owner).as_p()
+        self.assertIn('mine', html)
+        self.assertNotIn('not mine', html)
+
+    def test_splits_and_dedupes_emails(self):
+        form = BatchShareForm(self.owner, data={
+            'lists': [self.list_.id], 'emails': 'c@d.com, e@f.com;\nc@d.com  g@h.com'})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data['emails'], ['c@d.com', 'e@f.com', 'g@h.com'])
+
+    def test_accepts_a_list_of_emails(self):
+        form = BatchShareForm(self.owner, data={'lists': [self.list_.id], 'emails': ['c@d.com']})
+        self.assertTrue(form.is_valid())
+
+    def test_names_invalid_emails(self):
+        form = BatchShareForm(self.owner, data={'lists': [self.list_.id], 'emails': 'c@d.com, nope'})
+        self.assertFalse(form.is_valid())
+        self.assertIn('nope', form.errors['emails'][0])
+
+    def test_only_takes_lists_the_user_owns(self):
+        other = List.create_new('not mine')
+        form = BatchShareForm(self.owner, data={'lists': [other.id], 'emails': 'c@d.com'})
+        self.assertFalse(form.is_valid())
+        self.assertIn('lists', form.errors)
+
+    @override_settings(BATCH_SHARE_MAX=2)
+    def test_limits_emails_per_batch(self):
+        form = BatchShareForm(self.owner, data={
+            'lists': [self.list_.id], 'emails': 'a@a.com b@b.com c@c.com'})
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors['emails'], [TOO_MANY_ERROR % {'limit': 2}])
+
+    def test_save_shares_each_list_with_each_user(self):
+        User.objects.create(email='c@d.com')
+        second = List.create_new('second', owner=self.owner)
+        form = BatchShareForm(self.owner, data={
+            'lists': [self.list_.id, second.id], 'emails': 'c@d.com'})
+        self.assertTrue(form.is_valid())
+        results = form.save()
+        self.assertEqual([result['status'] for result in results], ['shared', 'shared'])
+        self.assertEqual(List.objects.shared_with_user(User.objects.get(email='c@d.com')).count(), 2)
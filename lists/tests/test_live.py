@@ -0,0 +1,212 @@
+import threading
+import time
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from lists import live
+from lists.models import Item, List
+
+User = get_user_model()
+
+SUBSCRIBERS = 200
+
+
+class BrokerTestMixin(object):
+
+    def test_wait_returns_at_once_if_already_past(self):
+        self.broker.publish(1, 3)
+        self.assertEqual(self.broker.wait(1, 2, timeout=5), 3)
+
+    def test_wait_times_out_without_a_publish(self):
+        self.broker.publish(1, 3)
+        self.assertIsNone(self.broker.wait(1, 3, timeout=0.05))
+
+    def test_other_lists_do_not_wake_subscribers(self):
+        self.broker.publish(2, 5)
+        self.assertIsNone(self.broker.wait(1, 0, timeout=0.05))
+
+    def test_publish_wakes_many_concurrent_subscribers(self):
+        results = []
+        waiting = threading.Barrier(SUBSCRIBERS + 1)
+
+        def subscribe():
+            waiting.wait()
+            results.append(self.broker.wait(7, 1, timeout=10))
+
+        threads = [threading.Thread(target=subscribe) for _ in range(SUBSCRIBERS)]
+        for thread in threads:
+            thread.start()
+        waiting.wait()
+        time.sleep(0.05)
+        start = time.monotonic()
+        self.broker.publish(7, 2)
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [2] * SUBSCRIBERS)
+        self.assertLess(time.monotonic() - start, 5)
+
+
+class LocalBrokerTest(BrokerTestMixin, SimpleTestCase):
+
+    def setUp(self):
+        self.broker = live.LocalBroker()
+
+    def test_forgets_waiters_once_done(self):
+        self.broker.wait(1, 0, timeout=0.01)
+        self.assertEqual(self.broker._conditions, {})
+
+    def test_remembers_a_bounded_number_of_lists(self):
+        self.broker.max_lists = 2
+        for list_id in (1, 2, 3):
+            self.broker.publish(list_id, 1)
+        self.assertEqual(list(self.broker._revisions), [2, 3])
+
+
+@override_settings(LIVE_POLL_INTERVAL=0.01)
+class CacheBrokerTest(BrokerTestMixin, SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.broker = live.CacheBroker()
+
+
+def later(func, delay=0.1):
+    thread = threading.Timer(delay, func)
+    thread.start()
+    return thread
+
+
+class LiveUpdatesTest(TransactionTestCase):
+
+    def setUp(self):
+        live._brokers.clear()
+
+    def test_saving_an_item_publishes_the_new_revision(self):
+        list_ = List.create_new('a')
+        self.assertEqual(live.wait(list_.id, 0, timeout=0), 1)
+        Item.objects.create(list=list_, text='b')
+        self.assertEqual(live.wait(list_.id, 1, timeout=0), 2)
+
+    def test_long_poll_returns_change_made_while_waiting(self):
+        list_ = List.create_new('a')
+        adder = later(lambda: list_.add_items(['b']))
+        start = time.monotonic()
+        response = self.client.get('/api/lists/%d/changes/?since=1&wait=10' % (list_.id,))
+        adder.join()
+        self.assertLess(time.monotonic() - start, 5)
+        data = response.json()
+        self.assertEqual(data['revision'], 2)
+        self.assertEqual([c['text'] for c in data['changes']], ['b'])
+
+    def test_long_poll_times_out_with_no_changes(self):
+        list_ = List.create_new('a')
+        response = self.client.get('/api/lists/%d/changes/?since=1&wait=1' % (list_.id,))
+        self.assertEqual(response.json(), {'revision': 1, 'changes': []})
+
+    @override_settings(LIVE_MAX_WAIT=1)
+    def test_wait_is_capped(self):
+        list_ = List.create_new('a')
+        start = time.monotonic()
+        self.client.get('/api/lists/%d/changes/?since=1&wait=60' % (list_.id,))
+        self.assertLess(time.monotonic() - start, 5)
+
+    def test_long_poll_releases_db_connections_while_waiting(self):
+        list_ = List.create_new('a')
+        with patch.object(connections, 'close_all') as close_all, \
+                patch('lists.api.live.wait', side_effect=lambda *args: close_all.called):
+            self.client.get('/api/lists/%d/changes/?since=1&wait=1' % (list_.id,))
+        self.assertTrue(close_all.called)
+
+    def test_behind_client_does_not_wait(self):
+        list_ = List.create_new('a')
+        list_.add_items(['b'])
+        with patch('lists.api.live.wait') as wait:
+            response = self.client.get('/api/lists/%d/changes/?since=1&wait=10' % (list_.id,))
+        self.assertFalse(wait.called)
+        self.assertEqual(len(response.json()['changes']), 1)
+
+    def test_many_concurrent_long_polls(self):
+        list_ = List.create_new('a')
+        responses = []
+
+        def poll():
+            responses.append(self.client_class().get(
+                '/api/lists/%d/changes/?since=1&wait=10' % (list_.id,)).json())
+            connections.close_all()
+
+        threads = [threading.Thread(target=poll) for _ in range(50)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.5)
+        list_.add_items(['b'])
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(responses), 50)
+        for data in responses:
+            self.assertEqual([c['text'] for c in data['changes']], ['b'])
+
+
+@override_settings(LIVE_HEARTBEAT=0.05)
+class EventStreamTest(TransactionTestCase):
+
+    def setUp(self):
+        live._brokers.clear()
+
+    def events(self, response):
+        self.addCleanup(response.close)
+        return (chunk.decode() for chunk in response.streaming_content)
+
+    def test_streams_snapshot_then_changes(self):
+        list_ = List.create_new('a')
+        response = self.client.get('/api/lists/%d/events/' % (list_.id,))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = self.events(response)
+        self.assertTrue(next(events).startswith('retry:'))
+        self.assertIn('event: snapshot', next(events))
+        # made from this thread: the in-memory test database can't take a
+        # write from one thread while another reads
+        list_.add_items(['b'])
+        event = next(e for e in events if not e.startswith(':'))
+        self.assertTrue(event.startswith('id: 2\nevent: changes\n'))
+        self.assertIn('"text": "b"', event)
+
+    def test_stream_ends_when_list_is_unshared(self):
+        owner = User.objects.create(email='owner@example.com')
+        sharee = User.objects.create(email='sharee@example.com')
+        list_ = List.create_new('a', owner=owner)
+        list_.shared_with.add(sharee)
+        self.client.force_login(sharee)
+        events = self.events(self.client.get('/api/lists/%d/events/' % (list_.id,)))
+        self.assertTrue(next(events).startswith('retry:'))
+        self.assertIn('event: snapshot', next(events))
+        list_.shared_with.remove(sharee)
+        self.assertEqual([e for e in events if not e.startswith(':')], [])
+
+    def test_resumes_from_last_event_id(self):
+        list_ = List.create_new('a')
+        list_.add_items(['b'])
+        response = self.client.get(
+            '/api/lists/%d/events/' % (list_.id,), HTTP_LAST_EVENT_ID='1')
+        events = self.events(response)
+        next(events)
+        event = next(events)
+        self.assertIn('event: changes', event)
+        self.assertIn('"text": "b"', event)
+
+    def test_sends_heartbeats_while_idle(self):
+        list_ = List.create_new('a')
+        response = self.client.get('/api/lists/%d/events/?since=1' % (list_.id,))
+        events = self.events(response)
+        next(events)
+        self.assertEqual(next(events), ': keep-alive\n\n')
+
+    @override_settings(LIVE_STREAM_DURATION=0)
+    def test_stream_ends(self):
+        list_ = List.create_new('a')
+        response = self.client.get('/api/lists/%d/events/?since=1' % (list_.id,))
+        self.assertEqual(len(list(self.events(response))), 1)
+
+    def test_missing_list_is_404(self):
+        self.assertEqual(self.client.get('/api/lists/99/events/').status_code, 404)
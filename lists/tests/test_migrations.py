@@ -0,0 +1,31 @@
+from importlib import import_module
+from unittest.mock import Mock, patch
+from django.db import connection
+from django.test import TestCase
+from lists.models import Item, List
+
+normalized_text_migration = import_module('lists.migrations.0016_item_normalized_text')
+
+
+class BackfillNormalizedTextTest(TestCase):
+
+    def test_fills_in_every_list_in_batches(self):
+        lists = [List.create_new(text) for text in ('Buy  Milk', 'EGGS', 'bread')]
+        Item.objects.update(normalized_text='')
+        with patch.object(normalized_text_migration, 'BACKFILL_LISTS_PER_BATCH', 2):
+            normalized_text_migration.backfill_normalized_text(None, Mock(connection=connection))
+        self.assertEqual(
+            [list_.item_set.get().normalized_text for list_ in lists],
+            ['buy milk', 'eggs', 'bread'])
+
+    def test_near_duplicates_get_keys_of_their_own(self):
+        list_ = List.create_new('Milk')
+        Item.objects.create(list=list_, text='eggs')
+        # as the old (list, text) constraint would have allowed
+        second = list_.item_set.get(text='eggs')
+        Item.objects.filter(id=second.id).update(text='MILK ', normalized_text='x')
+        with connection.cursor() as cursor:
+            normalized_text_migration._normalize_lists(cursor, [list_.id])
+        self.assertEqual(
+            list(list_.item_set.values_list('normalized_text', flat=True)),
+            ['milk', 'milk\n%d' % (second.id,)])
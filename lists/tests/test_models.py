@@ -1,5 +1,15 @@
-from django.test import TestCase
-from lists.models import Item, List
+from django.test import TestCase, TransactionTestCase
+from django.test import override_settings
+from django.conf import settings
+from django.test.utils import CaptureQueriesContext
+from django.core.cache import cache
+from django.db import IntegrityError, connection
+from unittest.mock import patch
+from lists.models import (
+    CHANGE_ITEM_ADDED, CHANGE_ITEM_CHANGED, CHANGE_ITEM_REMOVED, CHANGE_SHARED,
+    CHANGE_UNSHARED, ITEM_ADDED, ITEM_DUPLICATE, ITEM_EMPTY, SHARE_ADDED,
+    SHARE_EXISTING, SHARE_NO_SUCH_LIST, SHARE_NO_SUCH_USER, SHARE_OWNER, Item,
+    List, normalize_item_text)
 from django.core.exceptions import ValidationError
 from django.contrib.auth import get_user_model
 
@@ -32,6 +42,24 @@ class ItemModelTest(TestCase):
             item = Item(list=list_, text='bla')
             item.full_clean()
 
+    def test_items_differing_only_in_case_or_spacing_are_duplicates(self):
+        list_ = List.objects.create()
+        Item.objects.create(list=list_, text='Buy  milk')
+        with self.assertRaises(ValidationError):
+            Item(list=list_, text=' buy MILK').full_clean()
+        with self.assertRaises(IntegrityError):
+            Item.objects.create(list=list_, text='BUY milk')
+
+    def test_save_keeps_normalized_text_up_to_date(self):
+        item = Item.objects.create(list=List.objects.create(), text='Buy Milk')
+        self.assertEqual(item.normalized_text, 'buy milk')
+        item.text = 'Buy\tEGGS '
+        item.save()
+        self.assertEqual(Item.objects.get(id=item.id).normalized_text, 'buy eggs')
+
+    def test_normalize_item_text(self):
+        self.assertEqual(normalize_item_text('  Straße\n  TWO  '), 'strasse two')
+
     def test_CAN_save_same_item_to_different_lists(self):
         list1 = List.objects.create()
         list2 = List.objects.create()
@@ -89,6 +117,64 @@ class ListModelTest(TestCase):
         Item.objects.create(list=list_, text='second item')
         self.assertEqual(list_.name, 'first item')
 
+    def test_create_new_stores_list_name(self):
+        list_ = List.create_new(first_item_text='first item')
+        self.assertEqual(List.objects.get(id=list_.id).name, 'first item')
+
+    def test_list_name_is_set_by_first_item_added(self):
+        list_ = List.objects.create()
+        Item.objects.create(list=list_, text='first item')
+        Item.objects.create(list=list_, text='second item')
+        self.assertEqual(List.objects.get(id=list_.id).name, 'first item')
+
+    def test_reading_list_name_does_not_query_items(self):
+        List.create_new(first_item_text='first item')
+        list_ = List.objects.first()
+        with self.assertNumQueries(0):
+            self.assertEqual(list_.name, 'first item')
+
+    def test_editing_first_item_updates_list_name(self):
+        list_ = List.create_new(first_item_text='first item')
+        item = list_.item_set.first()
+        item.text = 'edited'
+        item.save()
+        self.assertEqual(List.objects.get(id=list_.id).name, 'edited')
+
+    def test_editing_later_item_leaves_list_name_alone(self):
+        list_ = List.create_new(first_item_text='first item')
+        item = Item.objects.create(list=list_, text='second item')
+        item.text = 'edited'
+        item.save()
+        self.assertEqual(List.objects.get(id=list_.id).name, 'first item')
+
+    def test_deleting_first_item_moves_name_to_next_item(self):
+        list_ = List.create_new(first_item_text='first item')
+        Item.objects.create(list=list_, text='second item')
+        list_.item_set.first().delete()
+        self.assertEqual(List.objects.get(id=list_.id).name, 'second item')
+
+    def test_deleting_only_item_blanks_list_name(self):
+        list_ = List.create_new(first_item_text='first item')
+        list_.item_set.first().delete()
+        self.assertEqual(List.objects.get(id=list_.id).name, '')
+
+    def test_owned_by_returns_only_that_users_lists(self):
+        user = User.objects.create(email='a@b.com')
+        other = User.objects.create(email='c@d.com')
+        list1 = List.create_new('one', owner=user)
+        List.create_new('other', owner=other)
+        list2 = List.create_new('two', owner=user)
+        self.assertEqual(list(List.objects.owned_by(user)), [list1, list2])
+
+    def test_shared_with_user_returns_lists_shared_with_that_user(self):
+        user = User.objects.create(email='a@b.com')
+        shared = List.create_new('shared')
+        List.create_new('not shared')
+        shared.shared_with.add(user)
+        lists = list(List.objects.shared_with_user(user))
+        self.assertEqual(lists, [shared])
+        self.assertEqual(lists[0].name, 'shared')
+
     # sharedwith TestCase
     def test_list_has_shared_with_add_accepts_user_object(self):
         list_ = List.objects.create()
@@ -138,3 +224,243 @@ class ListModelTest(TestCase):
         list_.shared_with.add(user)
         list_.shared_with.add(user)
         self.assertEqual(list_.shared_with.all().count(), 1)
+
+
+class ListAddItemsTest(TestCase):
+
+    def test_adds_all_new_items_in_order(self):
+        list_ = List.objects.create()
+        list_.add_items(['one', 'two', 'three'])
+        self.assertEqual(
+            [item.text for item in list_.item_set.all()],
+            ['one', 'two', 'three'])
+
+    def test_reports_status_for_each_text(self):
+        list_ = List.create_new('existing')
+        results = list_.add_items(['new', 'existing', '', 'new', '   '])
+        self.assertEqual(
+            [result['status'] for result in results],
+            [ITEM_ADDED, ITEM_DUPLICATE, ITEM_EMPTY, ITEM_DUPLICATE, ITEM_EMPTY])
+        self.assertEqual(list_.item_set.count(), 2)
+
+    def test_texts_differing_only_in_case_or_spacing_are_duplicates(self):
+        list_ = List.create_new('Milk')
+        results = list_.add_items(['milk ', 'Eggs', 'EGGS', 'bread  rolls', 'Bread rolls'])
+        self.assertEqual(
+            [result['status'] for result in results],
+            [ITEM_DUPLICATE, ITEM_ADDED, ITEM_DUPLICATE, ITEM_ADDED, ITEM_DUPLICATE])
+        self.assertEqual(
+            [item.text for item in list_.item_set.all()], ['Milk', 'Eggs', 'bread  rolls'])
+
+    def test_strips_whitespace_like_the_item_form(self):
+        list_ = List.objects.create()
+        list_.add_items(['  padded  '])
+        self.assertEqual(list_.item_set.get().text, 'padded')
+
+    def test_same_text_in_another_list_is_not_a_duplicate(self):
+        List.create_new('shared text')
+        list_ = List.objects.create()
+        results = list_.add_items(['shared text'])
+        self.assertEqual(results[0]['status'], ITEM_ADDED)
+
+    def test_sets_name_of_empty_list(self):
+        list_ = List.objects.create()
+        list_.add_items(['first', 'second'])
+        self.assertEqual(List.objects.get(id=list_.id).name, 'first')
+
+    def test_keeps_existing_name(self):
+        list_ = List.create_new('first')
+        list_.add_items(['second'])
+        self.assertEqual(List.objects.get(id=list_.id).name, 'first')
+
+    @override_settings(BULK_ITEMS_BATCH_SIZE=50)
+    def test_query_count_grows_by_batch_not_by_item(self):
+        list_ = List.create_new('first')
+        texts = ['item %d' % (i,) for i in range(200)]
+        # 4 duplicate lookups + 4 inserts + 4 id lookups + savepoint and
+        # release, then touch: an update, a revision read and the change log
+        # inserts, which Django batches by sqlite's parameter limit
+        with self.assertNumQueries(18):
+            list_.add_items(texts)
+        self.assertEqual(list_.item_set.count(), 201)
+
+    def test_logs_a_full_batch_of_items(self):
+        # a batch's change log rows have more columns than its items
+        list_ = List.create_new('first')
+        list_.add_items(['item %d' % (i,) for i in range(settings.BULK_ITEMS_BATCH_SIZE)])
+        self.assertEqual(list_.changes.count(), settings.BULK_ITEMS_BATCH_SIZE + 1)
+
+    def test_texts_added_by_someone_else_meanwhile_are_duplicates(self):
+        list_ = List.create_new('first')
+        list_.add_items(['second'])
+        real_existing_texts = List._existing_texts
+        calls = []
+
+        def missed_by_first_check(self, candidates, digests=None):
+            # as if 'second' were added just after we looked
+            calls.append(candidates)
+            if len(calls) == 1:
+                return set()
+            return real_existing_texts(self, candidates, digests)
+
+        with patch.object(List, '_existing_texts', missed_by_first_check):
+            results = list_.add_items(['second', 'third'])
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(
+            [result['status'] for result in results], [ITEM_DUPLICATE, ITEM_ADDED])
+        self.assertEqual(list_.item_set.count(), 3)
+
+
+@override_settings(CACHE_LIST_ITEM_TEXTS=True)
+class ListAddItemsWithCachedTextsTest(TransactionTestCase):
+    # the digests are cached as the adds commit
+
+    def setUp(self):
+        cache.clear()
+
+    def test_only_looks_up_texts_the_list_may_have(self):
+        list_ = List.create_new('first')
+        list_.add_items(['second'])
+        with CaptureQueriesContext(connection) as queries:
+            list_.add_items(['third', 'fourth'])
+        self.assertFalse([q for q in queries if q['sql'].startswith('SELECT "lists_item"."normalized_text"')])
+        with CaptureQueriesContext(connection) as queries:
+            results = list_.add_items(['second', 'fifth'])
+        self.assertEqual(
+            [result['status'] for result in results], [ITEM_DUPLICATE, ITEM_ADDED])
+        self.assertEqual(
+            len([q for q in queries if q['sql'].startswith('SELECT "lists_item"."normalized_text"')]), 1)
+
+    def test_items_added_one_at_a_time_are_still_duplicates(self):
+        list_ = List.create_new('first')
+        list_.add_items(['second'])
+        Item.objects.create(list=list_, text='third')
+        results = list_.add_items(['third', 'fourth'])
+        self.assertEqual(
+            [result['status'] for result in results], [ITEM_DUPLICATE, ITEM_ADDED])
+
+
+class ListShareManyTest(TestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create(email='owner@example.com')
+        self.users = [User.objects.create(email='user%d@example.com' % (i,)) for i in range(3)]
+
+    def test_reports_status_for_each_pair(self):
+        list_ = List.create_new('a', owner=self.owner)
+        list_.shared_with.add(self.users[0])
+        results = List.share_many(
+            [list_.id, 999], ['user0@example.com', 'user1@example.com',
+                              'owner@example.com', 'nobody@example.com'])
+        self.assertEqual([(r['list'], r['email'], r['status']) for r in results], [
+            (list_.id, 'nobody@example.com', SHARE_NO_SUCH_USER),
+            (list_.id, 'owner@example.com', SHARE_OWNER),
+            (list_.id, 'user0@example.com', SHARE_EXISTING),
+            (list_.id, 'user1@example.com', SHARE_ADDED),
+            (999, 'nobody@example.com', SHARE_NO_SUCH_LIST),
+            (999, 'owner@example.com', SHARE_NO_SUCH_LIST),
+            (999, 'user0@example.com', SHARE_NO_SUCH_LIST),
+            (999, 'user1@example.com', SHARE_NO_SUCH_LIST),
+        ])
+        self.assertEqual(
+            sorted(list_.shared_with.values_list('email', flat=True)),
+            ['user0@example.com', 'user1@example.com'])
+
+    def test_query_count_does_not_grow_with_pairs(self):
+        def count_queries(lists):
+            emails = [user.email for user in self.users]
+            with CaptureQueriesContext(connection) as queries:
+                List.share_many([list_.id for list_ in lists], emails)
+            return len(queries)
+
+        few = count_queries([List.create_new('one', owner=self.owner)])
+        many = count_queries([List.create_new('l%d' % (i,), owner=self.owner) for i in range(20)])
+        self.assertEqual(many, few)
+        self.assertEqual(List.shared_with.through.objects.count(), 63)
+
+    def test_logs_a_change_for_each_new_share(self):
+        list_ = List.create_new('a', owner=self.owner)
+        List.share_many([list_.id], ['user0@example.com', 'user1@example.com'])
+        list_.refresh_from_db()
+        self.assertEqual(list_.revision, 2)
+        self.assertEqual(
+            list(list_.changes_since(1).values_list('revision', 'op', 'email')),
+            [(2, CHANGE_SHARED, 'user0@example.com'), (2, CHANGE_SHARED, 'user1@example.com')])
+
+    def test_pairs_shared_meanwhile_are_reported_as_existing(self):
+        list_ = List.create_new('a', owner=self.owner)
+        list_.shared_with.add(self.users[0])
+        Share = List.shared_with.through
+        real_filter = Share.objects.filter
+        calls = []
+
+        def filter_missing_first_time(*args, **kwargs):
+            # as if user0 were shared with just after we looked
+            calls.append(1)
+            if len(calls) == 1:
+                return Share.objects.none()
+            return real_filter(*args, **kwargs)
+
+        with patch.object(Share.objects, 'filter', filter_missing_first_time):
+            results = List.share_many([list_.id], ['user0@example.com', 'user1@example.com'])
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(
+            [result['status'] for result in results], [SHARE_EXISTING, SHARE_ADDED])
+
+
+class ListChangeLogTest(TestCase):
+
+    def ops(self, list_, since=0):
+        return list(list_.changes_since(since).values_list('revision', 'op', 'item_id', 'text', 'email'))
+
+    def test_logs_added_changed_and_removed_items(self):
+        list_ = List.create_new('first')
+        item = list_.item_set.get()
+        item.text = 'edited'
+        item.save()
+        item_id = item.id
+        item.delete()
+        self.assertEqual(self.ops(List.objects.get(id=list_.id)), [
+            (1, CHANGE_ITEM_ADDED, item_id, 'first', ''),
+            (2, CHANGE_ITEM_CHANGED, item_id, 'edited', ''),
+            (3, CHANGE_ITEM_REMOVED, item_id, '', ''),
+        ])
+
+    def test_bulk_add_logs_every_item_at_one_revision(self):
+        list_ = List.create_new('first')
+        list_.add_items(['second', 'third', 'first'])
+        list_.refresh_from_db()
+        self.assertEqual(list_.revision, 2)
+        self.assertEqual(
+            [(rev, op, text) for rev, op, _, text, _ in self.ops(list_, since=1)],
+            [(2, CHANGE_ITEM_ADDED, 'second'), (2, CHANGE_ITEM_ADDED, 'third')])
+        self.assertEqual(
+            [item_id for _, _, item_id, _, _ in self.ops(list_, since=1)],
+            list(list_.item_set.exclude(text='first').values_list('id', flat=True)))
+
+    def test_logs_sharing_from_either_side(self):
+        user = User.objects.create(email='a@b.com')
+        list_ = List.create_new('first')
+        list_.shared_with.add(user)
+        user.shared_with.remove(list_)
+        list_.shared_with.add(user)
+        list_.shared_with.clear()
+        list_.refresh_from_db()
+        self.assertEqual([(rev, op, email) for rev, op, _, _, email in self.ops(list_, since=1)], [
+            (2, CHANGE_SHARED, 'a@b.com'),
+            (3, CHANGE_UNSHARED, 'a@b.com'),
+            (4, CHANGE_SHARED, 'a@b.com'),
+            (5, CHANGE_UNSHARED, 'a@b.com'),
+        ])
+
+    def test_changes_since_returns_only_later_changes(self):
+        list_ = List.create_new('first')
+        list_.add_items(['second'])
+        list_.refresh_from_db()
+        self.assertEqual([text for _, _, _, text, _ in self.ops(list_, since=1)], ['second'])
+
+    def test_changes_since_is_None_below_log_floor(self):
+        list_ = List.create_new('first')
+        list_.log_floor = 1
+        self.assertIsNone(list_.changes_since(0))
+        self.assertIsNotNone(list_.changes_since(1))
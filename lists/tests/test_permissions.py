@@ -0,0 +1,63 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import TestCase
+
+from lists.models import List
+from lists.permissions import can_share, can_view, shared_list_ids
+
+User = get_user_model()
+
+
+class PermissionsTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create(email='owner@example.com')
+        self.sharee = User.objects.create(email='sharee@example.com')
+        self.stranger = User.objects.create(email='stranger@example.com')
+        self.list_ = List.create_new('mine', owner=self.owner)
+        self.list_.shared_with.add(self.sharee)
+
+    def test_anyone_may_use_an_unowned_list(self):
+        list_ = List.create_new('open')
+        for user in (AnonymousUser(), self.stranger):
+            self.assertTrue(can_view(user, list_))
+            self.assertTrue(can_share(user, list_))
+
+    def test_owner_may_view_and_share(self):
+        self.assertTrue(can_view(self.owner, self.list_))
+        self.assertTrue(can_share(self.owner, self.list_))
+
+    def test_sharee_may_view_but_not_share(self):
+        self.assertTrue(can_view(self.sharee, self.list_))
+        self.assertFalse(can_share(self.sharee, self.list_))
+
+    def test_others_may_do_neither(self):
+        for user in (AnonymousUser(), self.stranger):
+            self.assertFalse(can_view(user, self.list_))
+            self.assertFalse(can_share(user, self.list_))
+
+    def test_owner_check_needs_no_queries(self):
+        with self.assertNumQueries(0):
+            self.assertTrue(can_view(self.owner, self.list_))
+
+    def test_shared_ids_are_cached(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(shared_list_ids(self.sharee), frozenset([self.list_.id]))
+        with self.assertNumQueries(0):
+            self.assertTrue(can_view(self.sharee, self.list_))
+
+    def test_sharing_and_unsharing_invalidate_the_cache(self):
+        other = List.create_new('other', owner=self.owner)
+        self.assertFalse(can_view(self.sharee, other))
+        other.shared_with.add(self.sharee)
+        self.assertTrue(can_view(self.sharee, other))
+        self.list_.shared_with.remove(self.sharee)
+        self.assertFalse(can_view(self.sharee, self.list_))
+        self.assertTrue(can_view(self.sharee, other))
+
+    def test_share_many_invalidates_the_cache(self):
+        self.assertFalse(can_view(self.stranger, self.list_))
+        List.share_many([self.list_.id], [self.stranger.email])
+        self.assertTrue(can_view(self.stranger, self.list_))
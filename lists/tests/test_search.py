@@ -0,0 +1,151 @@
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from unittest.mock import patch
+from lists import fts
+from lists.models import Item, ItemTerm, List
+from lists.search import search_items
+
+User = get_user_model()
+
+
+class TokenizeTest(TestCase):
+
+    def test_splits_on_punctuation_and_folds_case_and_accents(self):
+        self.assertEqual(fts.tokenize('Buy CRÈME-brûlée, x2_each!'),
+                         ['buy', 'creme', 'brulee', 'x2', 'each'])
+
+
+class Fts5AvailableTest(TestCase):
+
+    def setUp(self):
+        fts._sqlite_has_fts5.cache_clear()
+        self.addCleanup(fts._sqlite_has_fts5.cache_clear)
+
+    def test_needs_sqlite_that_knows_remove_diacritics_2(self):
+        with patch('django.db.backends.sqlite3.base.Database.sqlite_version_info', (3, 22, 0)):
+            self.assertFalse(fts.fts5_available(connection))
+
+
+class SearchTestMixin(object):
+
+    def setUp(self):
+        self.user = User.objects.create(email='a@b.com')
+        self.other = User.objects.create(email='c@d.com')
+
+    def texts(self, query, user=None):
+        return [result['text'] for result in search_items(user or self.user, query)]
+
+    def test_finds_items_in_owned_and_shared_lists(self):
+        List.create_new('buy milk', owner=self.user)
+        shared = List.create_new('milk the cow', owner=self.other)
+        shared.shared_with.add(self.user)
+        List.create_new('spilt milk', owner=self.other)
+        List.create_new('milk for anyone')
+        self.assertEqual(sorted(self.texts('milk')), ['buy milk', 'milk the cow'])
+
+    def test_returns_list_names(self):
+        list_ = List.create_new('groceries', owner=self.user)
+        list_.add_items(['fresh eggs'])
+        self.assertEqual(search_items(self.user, 'eggs'), [{
+            'id': Item.objects.get(text='fresh eggs').id, 'text': 'fresh eggs',
+            'list': list_.id, 'list_name': 'groceries'}])
+
+    def test_needs_every_word(self):
+        list_ = List.create_new('buy milk', owner=self.user)
+        list_.add_items(['buy eggs'])
+        self.assertEqual(self.texts('buy  MILK'), ['buy milk'])
+
+    def test_ranks_better_matches_first(self):
+        list_ = List.create_new('milk', owner=self.user)
+        list_.add_items(['milk milk milk'])
+        self.assertEqual(self.texts('milk')[0], 'milk milk milk')
+
+    def test_follows_edits_and_deletes(self):
+        list_ = List.create_new('buy milk', owner=self.user)
+        item = list_.item_set.get()
+        item.text = 'buy bread'
+        item.save()
+        self.assertEqual(self.texts('milk'), [])
+        self.assertEqual(self.texts('bread'), ['buy bread'])
+        item.delete()
+        self.assertEqual(self.texts('bread'), [])
+
+    def test_query_syntax_is_not_interpreted(self):
+        List.create_new('say "hi" OR bye*', owner=self.user)
+        self.assertEqual(self.texts('"hi" OR'), ['say "hi" OR bye*'])
+        self.assertEqual(self.texts('***'), [])
+
+    def test_respects_limit(self):
+        List.create_new('milk 1', owner=self.user).add_items(['milk 2', 'milk 3'])
+        self.assertEqual(len(search_items(self.user, 'milk', limit=2)), 2)
+
+
+class FtsSearchTest(SearchTestMixin, TestCase):
+
+    def test_uses_fts(self):
+        self.assertTrue(fts.uses_fts())
+        List.create_new('buy milk', owner=self.user)
+        self.assertEqual(ItemTerm.objects.count(), 0)
+
+
+@override_settings(ITEM_SEARCH_BACKEND='terms')
+class ItemTermSearchTest(SearchTestMixin, TestCase):
+
+    def test_indexes_terms(self):
+        List.create_new('Milk, milk!', owner=self.user)
+        self.assertEqual(
+            list(ItemTerm.objects.values_list('term', 'count')), [('milk', 2)])
+
+
+class RebuildSearchIndexTest(TestCase):
+
+    def test_rebuilds_item_terms(self):
+        user = User.objects.create(email='a@b.com')
+        List.create_new('buy milk', owner=user)
+        out = StringIO()
+        with override_settings(ITEM_SEARCH_BACKEND='terms'):
+            call_command('rebuild_search_index', batch_size=1, stdout=out)
+            self.assertEqual([r['text'] for r in search_items(user, 'milk')], ['buy milk'])
+        self.assertIn('Indexed 1 items', out.getvalue())
+
+    def test_rebuilds_fts_index(self):
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('FTS5', out.getvalue())
+
+
+class SearchViewTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(email='a@b.com')
+        self.list_ = List.create_new('buy milk', owner=self.user)
+
+    def test_shows_results_with_links_to_lists(self):
+        self.client.force_login(self.user)
+        response = self.client.get('/lists/search?q=milk')
+        self.assertTemplateUsed(response, 'search.html')
+        self.assertContains(response, 'buy milk')
+        self.assertContains(response, self.list_.get_absolute_url())
+
+    def test_says_when_nothing_matches(self):
+        self.client.force_login(self.user)
+        response = self.client.get('/lists/search?q=bread')
+        self.assertContains(response, 'Nothing in your lists matches')
+
+    def test_anonymous_users_asked_to_log_in(self):
+        response = self.client.get('/lists/search?q=milk')
+        self.assertContains(response, 'Log in to search')
+        self.assertNotContains(response, 'id_search_results')
+
+    def test_api_returns_results(self):
+        self.client.force_login(self.user)
+        response = self.client.get('/api/search/?q=milk')
+        self.assertEqual(response.json()['results'][0]['list_name'], 'buy milk')
+
+    def test_api_needs_login_and_query(self):
+        self.assertEqual(self.client.get('/api/search/?q=milk').status_code, 403)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get('/api/search/').status_code, 400)
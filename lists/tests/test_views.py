@@ -1,7 +1,13 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
+from django.test import TestCase, override_settings
+from django.core.management import call_command
 from django.http import HttpRequest
+from django.utils import timezone
 from django.utils.html import escape
 from django.core.urlresolvers import resolve
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 import logging
 from unittest.mock import patch, Mock
@@ -11,6 +17,7 @@ from lists.forms import (
     DUPLICATE_ITEM_ERROR, EMPTY_ITEM_ERROR,
     NONEXISTENT_USER_EMAIL_ERROR, SAME_EMAIL_ERROR,
     ExistingListItemForm, ItemForm)
+import json
 import unittest
 
 from django.http import HttpRequest
@@ -209,11 +216,136 @@ class ListViewTest(TestCase):
         response = self.client.post('/lists/%d/share/' % (list_.id,), data={'email':'junk@junk.com'})
         self.assertTemplateUsed(response, 'list.html')
 
+@override_settings(LIST_ITEMS_PAGE_SIZE=2)
+class ListViewPaginationTest(TestCase):
+
+    def setUp(self):
+        self.list_ = List.create_new('item 1')
+        for i in range(2, 6):
+            Item.objects.create(list=self.list_, text='item %d' % (i,))
+
+    def test_first_page_shows_page_size_items(self):
+        response = self.client.get('/lists/%d/' % (self.list_.id,))
+        self.assertEqual(
+            [item.text for item in response.context['page'].items],
+            ['item 1', 'item 2'])
+        self.assertNotContains(response, 'item 3')
+
+    def test_next_page_continues_after_cursor(self):
+        response = self.client.get('/lists/%d/' % (self.list_.id,))
+        cursor = response.context['page'].next_cursor
+        response = self.client.get('/lists/%d/?after=%d' % (self.list_.id, cursor))
+        self.assertEqual(
+            [item.text for item in response.context['page'].items],
+            ['item 3', 'item 4'])
+        self.assertContains(response, '3:')
+
+    def test_last_page_has_no_next_cursor(self):
+        last_but_one = Item.objects.get(text='item 4')
+        response = self.client.get(
+            '/lists/%d/?after=%d' % (self.list_.id, last_but_one.id))
+        self.assertEqual(
+            [item.text for item in response.context['page'].items], ['item 5'])
+        self.assertIsNone(response.context['page'].next_cursor)
+
+    def test_page_size_can_be_chosen_by_client(self):
+        response = self.client.get('/lists/%d/?page_size=4' % (self.list_.id,))
+        self.assertEqual(len(response.context['page'].items), 4)
+
+    @override_settings(LIST_ITEMS_MAX_PAGE_SIZE=3)
+    def test_page_size_is_capped(self):
+        response = self.client.get('/lists/%d/?page_size=1000' % (self.list_.id,))
+        self.assertEqual(len(response.context['page'].items), 3)
+
+    def test_junk_cursor_shows_first_page(self):
+        response = self.client.get('/lists/%d/?after=junk' % (self.list_.id,))
+        self.assertEqual(response.context['page'].items[0].text, 'item 1')
+
+    def test_POST_redirects_to_page_with_new_item(self):
+        response = self.client.post('/lists/%d/' % (self.list_.id,), data={'text': 'item 6'})
+        # the same page the pager's "Next page" links reach
+        last_on_page_two = Item.objects.get(text='item 4')
+        self.assertRedirects(
+            response, '/lists/%d/?after=%d' % (self.list_.id, last_on_page_two.id))
+        response = self.client.get(response.url)
+        self.assertEqual(
+            [item.text for item in response.context['page'].items], ['item 5', 'item 6'])
+
+    def test_POST_keeps_chosen_page_size(self):
+        response = self.client.post(
+            '/lists/%d/?page_size=4' % (self.list_.id,), data={'text': 'item 6'})
+        last_on_page_one = Item.objects.get(text='item 4')
+        self.assertRedirects(
+            response, '/lists/%d/?after=%d&page_size=4' % (self.list_.id, last_on_page_one.id))
+
+
+@override_settings(LIST_ITEMS_STREAM_BATCH_SIZE=2)
+class ListViewShowAllTest(TestCase):
+
+    def test_streams_every_item_in_order(self):
+        list_ = List.create_new('item 1')
+        for i in range(2, 6):
+            Item.objects.create(list=list_, text='item %d' % (i,))
+        response = self.client.get('/lists/%d/all' % (list_.id,))
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode()
+        for i in range(1, 6):
+            self.assertIn('%d: item %d' % (i, i), content)
+        self.assertLess(content.index('item 4'), content.index('item 5'))
+        self.assertIn('id_list_table', content)
+
+    def test_streamed_items_are_escaped(self):
+        list_ = List.create_new('<b>bold</b>')
+        response = self.client.get('/lists/%d/all' % (list_.id,))
+        content = b''.join(response.streaming_content).decode()
+        self.assertIn(escape('<b>bold</b>'), content)
+
+
+class BulkAddItemsViewTest(TestCase):
+
+    def test_adds_items_from_form_post(self):
+        list_ = List.create_new('first')
+        response = self.client.post(
+            '/lists/%d/items/bulk' % (list_.id,),
+            data={'items': ['second', 'first', '']})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [item.text for item in list_.item_set.all()], ['first', 'second'])
+        body = json.loads(response.content.decode())
+        self.assertEqual(
+            (body['added'], body['duplicates'], body['empty']), (1, 1, 1))
+        self.assertEqual(body['results'][1], {'text': 'first', 'status': 'duplicate'})
+
+    def test_adds_items_from_json_post(self):
+        list_ = List.objects.create()
+        response = self.client.post(
+            '/lists/%d/items/bulk' % (list_.id,),
+            data=json.dumps({'items': ['a', 'b']}),
+            content_type='application/json')
+        self.assertEqual(json.loads(response.content.decode())['added'], 2)
+        self.assertEqual(list_.item_set.count(), 2)
+
+    def test_rejects_malformed_json(self):
+        list_ = List.objects.create()
+        response = self.client.post(
+            '/lists/%d/items/bulk' % (list_.id,),
+            data=json.dumps({'items': 'not a list'}),
+            content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Item.objects.count(), 0)
+
+    def test_GET_not_allowed(self):
+        list_ = List.objects.create()
+        response = self.client.get('/lists/%d/items/bulk' % (list_.id,))
+        self.assertEqual(response.status_code, 405)
+
+
 class ListViewOwnerTest(TestCase):
 
     def test_shows_owner_when_list_has_owner(self):
         user = User.objects.create(email="user@gmail.com")
         list_ = List.create_new("test", owner=user)
+        self.client.force_login(user)
         response = self.client.post('/lists/%d/' % (list_.id,))
         self.assertContains(response, "List owner:")
         self.assertContains(response, user.email)
@@ -223,6 +355,60 @@ class ListViewOwnerTest(TestCase):
         response = self.client.post('/lists/%d/' % (list_.id,))
         self.assertNotContains(response, "List owner:")
 
+class ListViewAccessTest(TestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create(email='owner@example.com')
+        self.sharee = User.objects.create(email='sharee@example.com')
+        self.stranger = User.objects.create(email='stranger@example.com')
+        self.list_ = List.create_new('mine', owner=self.owner)
+        self.list_.shared_with.add(self.sharee)
+
+    def test_owner_and_sharee_can_view_owned_list(self):
+        for user in (self.owner, self.sharee):
+            self.client.force_login(user)
+            response = self.client.get(self.list_.get_absolute_url())
+            self.assertEqual(response.status_code, 200)
+
+    def test_stranger_and_anonymous_user_are_forbidden(self):
+        self.assertEqual(self.client.get(self.list_.get_absolute_url()).status_code, 403)
+        self.client.force_login(self.stranger)
+        for url in ('/lists/%d/', '/lists/%d/all'):
+            self.assertEqual(self.client.get(url % (self.list_.id,)).status_code, 403)
+        response = self.client.post(
+            '/lists/%d/items/bulk' % (self.list_.id,), data={'items': ['sneaky']})
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.list_.item_set.count(), 1)
+
+    def test_unsharing_takes_effect_at_once(self):
+        self.client.force_login(self.sharee)
+        url = self.list_.get_absolute_url()
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.list_.shared_with.remove(self.sharee)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+    def test_only_owner_may_share(self):
+        User.objects.create(email='friend@example.com')
+        self.client.force_login(self.sharee)
+        response = self.client.post(
+            '/lists/%d/share' % (self.list_.id,), data={'share_with': 'friend@example.com'})
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(list(self.list_.shared_with.all()), [self.sharee])
+
+class ArchivedListViewTest(TestCase):
+
+    def test_archived_list_is_restored_when_viewed(self):
+        list_ = List.create_new('first')
+        list_.add_items(['second'])
+        List.objects.filter(id=list_.id).update(
+            modified=timezone.now() - timedelta(days=365))
+        call_command('archive_lists', stdout=StringIO())
+        self.assertFalse(List.objects.filter(id=list_.id).exists())
+        response = self.client.get('/lists/%d/' % (list_.id,))
+        self.assertContains(response, 'first')
+        self.assertContains(response, 'second')
+        self.assertTrue(List.objects.filter(id=list_.id).exists())
+
 class ListViewShareListFormTest(TestCase):
 
     def test_shared_with_adds_user_to_list(self):
@@ -278,7 +464,7 @@ class ListViewShareListFormTest(TestCase):
 class MyListsTest(TestCase):
 
     def test_my_lists_url_renders_my_lists_template(self):
-        User.objects.create(email='a@b.com')
+        self.client.force_login(User.objects.create(email='a@b.com'))
         response = self.client.get('/lists/users/a@b.com/')
         self.assertTemplateUsed(response, 'my_lists.html')
 
@@ -286,6 +472,7 @@ class MyListsTest(TestCase):
     def test_passes_correct_owner_to_template(self):
         User.objects.create(email='wrong@owner.com')
         correct_user = User.objects.create(email='a@b.com')
+        self.client.force_login(correct_user)
         response = self.client.get('/lists/users/a@b.com/')
         self.assertEqual(response.context['owner'], correct_user)
 
@@ -295,5 +482,88 @@ class MyListsTest(TestCase):
         list_ = List.create_new("item", owner=user)
         self.client.post("/lists/%d/share/" % (list_.id),\
             data={'share_with': share_with.email})
+        self.client.force_login(share_with)
         response = self.client.get('/lists/users/%s/' % (share_with.email,))
         self.assertContains(response, share_with.email)
+
+    def test_my_lists_shows_owned_and_shared_list_names(self):
+        user = User.objects.create(email='a@b.com')
+        List.create_new('owned list', owner=user)
+        shared = List.create_new('shared list')
+        shared.shared_with.add(user)
+        self.client.force_login(user)
+        response = self.client.get('/lists/users/a@b.com/')
+        self.assertContains(response, 'owned list')
+        self.assertContains(response, 'shared list')
+
+    def test_my_lists_query_count_does_not_grow_with_number_of_lists(self):
+        user = User.objects.create(email='a@b.com')
+        self.client.force_login(user)
+
+        def count_queries():
+            # the second of two requests, with the user's lists' caches warm
+            # but the page's changed, so both runs fetch the lists
+            self.client.get('/lists/users/a@b.com/')
+            List.create_new('new %d' % (List.objects.count(),), owner=user)
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get('/lists/users/a@b.com/')
+            return len(queries)
+
+        for i in range(2):
+            List.create_new('owned %d' % (i,), owner=user)
+            List.create_new('shared %d' % (i,)).shared_with.add(user)
+        few_lists_queries = count_queries()
+        for i in range(2, 30):
+            List.create_new('owned %d' % (i,), owner=user)
+            List.create_new('shared %d' % (i,)).shared_with.add(user)
+        self.assertEqual(count_queries(), few_lists_queries)
+
+    def test_my_lists_fragment_is_cached_until_lists_change(self):
+        user = User.objects.create(email='a@b.com')
+        List.create_new('first list', owner=user)
+        self.client.force_login(user)
+        self.client.get('/lists/users/a@b.com/')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/lists/users/a@b.com/')
+        self.assertContains(response, 'first list')
+        self.assertFalse([q for q in queries if 'lists_list"."name' in q['sql']])
+
+        List.create_new('shared list').shared_with.add(user)
+        self.assertContains(self.client.get('/lists/users/a@b.com/'), 'shared list')
+        Item.objects.get(text='first list').delete()
+        self.assertNotContains(self.client.get('/lists/users/a@b.com/'), 'first list')
+
+    def test_only_the_user_may_see_their_lists(self):
+        user = User.objects.create(email='a@b.com')
+        List.create_new('private list', owner=user)
+        response = self.client.get('/lists/users/a@b.com/')
+        self.assertEqual(response.status_code, 403)
+        self.client.force_login(User.objects.create(email='c@d.com'))
+        response = self.client.get('/lists/users/a@b.com/')
+        self.assertEqual(response.status_code, 403)
+        self.assertNotContains(response, 'private list', status_code=403)
+
+
+class ShareListsViewTest(TestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create(email='a@b.com')
+        User.objects.create(email='c@d.com')
+        self.list_ = List.create_new('mine', owner=self.owner)
+
+    def test_redirects_anonymous_users_home(self):
+        self.assertRedirects(self.client.get('/lists/share'), '/')
+
+    def test_GET_renders_form(self):
+        self.client.force_login(self.owner)
+        response = self.client.get('/lists/share')
+        self.assertTemplateUsed(response, 'share_lists.html')
+        self.assertContains(response, 'mine')
+
+    def test_POST_shares_and_reports_results(self):
+        self.client.force_login(self.owner)
+        response = self.client.post('/lists/share', data={
+            'lists': [self.list_.id], 'emails': 'c@d.com x@y.com'})
+        self.assertContains(response, 'class="share-shared"')
+        self.assertContains(response, 'class="share-no_such_user"')
+        self.assertEqual(list(self.list_.shared_with.values_list('email', flat=True)), ['c@d.com'])
@@ -20,6 +20,10 @@ from lists import views
 urlpatterns = [
     url(r'^new$', views.new_list, name='new_list'),
     url(r'^(\d+)/$', views.view_list, name='view_list'),
+    url(r'^(\d+)/all$', views.view_list_all, name='view_list_all'),
+    url(r'^(\d+)/items/bulk$', views.add_items_in_bulk, name='add_items_in_bulk'),
     url(r'^(\d+)/share$', views.share_list, name="share_list"),
+    url(r'^share$', views.share_lists, name='share_lists'),
     url(r'^users/(.+)/$', views.my_lists, name='my_lists'),
+    url(r'^search$', views.search, name='search'),
 ]
@@ -1,13 +1,28 @@
+from django.conf import settings
+from django.contrib import messages
+from django.db.models import Count, Max
 from django.shortcuts import render, redirect
-from django.http import HttpResponse
-from django.core.exceptions import ValidationError
+from django.http import HttpResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.template.loader import render_to_string
+from django.utils.html import format_html
+from django.views.decorators.http import condition, require_POST
+from django.core.exceptions import PermissionDenied, ValidationError
 from django.contrib.auth import get_user_model
 
-from lists.forms import ExistingListItemForm, ItemForm, NewListForm, ShareListForm
-from lists.models import Item, List
+from lists.cache import get_list_version
+from lists.forms import (
+    BatchShareForm, ExistingListItemForm, ItemForm, NewListForm, ShareListForm)
+from lists.models import ITEM_ADDED, ITEM_DUPLICATE, ITEM_EMPTY, Item, List
+from lists.permissions import can_share, can_view
+from lists.search import search_items
+import hashlib
+import json
 import logging
 User = get_user_model()
 
+ITEM_ROWS_PLACEHOLDER = '<!-- item rows -->'
+ITEM_ROW_HTML = '<tr><td>{}: {}</td></tr>\n'
+
 # Create your views here.
 def home_page(request):
     return render(request, 'home.html', {'form': ItemForm()})
@@ -19,26 +34,186 @@ def new_list(request):
         return redirect(list_)
     return render(request, 'home.html', {'form': form})
 
+def _positive_int(value):
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return None
+    return value if value > 0 else None
+
+def _page_size(request):
+    return min(
+        _positive_int(request.GET.get('page_size')) or settings.LIST_ITEMS_PAGE_SIZE,
+        settings.LIST_ITEMS_MAX_PAGE_SIZE)
+
+def _list_page_context(request, list_):
+    after = _positive_int(request.GET.get('after'))
+    return {
+        'list': list_,
+        'page': list_.items_page(after=after, page_size=_page_size(request)),
+        'list_version': get_list_version(list_.id),
+        'list_cache_timeout': settings.LIST_CACHE_TIMEOUT,
+    }
+
+def _get_list(request, list_id, allowed=can_view):
+    # shared by the conditional-GET callables and the view itself, so a full
+    # render doesn't fetch the list twice
+    if getattr(request, '_list', None) is None:
+        list_ = List.objects.get_or_restore(list_id)
+        if not allowed(request.user, list_):
+            raise PermissionDenied
+        request._list = list_
+    return request._list
+
+def _can_revalidate(request):
+    # pages that carry a flash message must always be rendered in full
+    return request.method in ('GET', 'HEAD') and not len(messages.get_messages(request))
+
+def _etag(*parts):
+    return hashlib.md5('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+def _viewer(request):
+    return request.user.pk if request.user.is_authenticated else ''
+
+def list_etag(request, list_id):
+    if not _can_revalidate(request):
+        return None
+    list_ = _get_list(request, list_id)
+    return _etag(list_.id, list_.revision, list_.modified.isoformat(),
+                 _viewer(request))
+
+def list_last_modified(request, list_id):
+    # the rendered page also depends on who is logged in, which only the
+    # ETag can express, so logged-in users revalidate by ETag alone
+    if not _can_revalidate(request) or request.user.is_authenticated:
+        return None
+    return _get_list(request, list_id).modified
+
+@condition(etag_func=list_etag, last_modified_func=list_last_modified)
 def view_list(request, list_id):
-    list_ = List.objects.get(id=list_id)
+    list_ = _get_list(request, list_id)
     form = ExistingListItemForm(for_list=list_)
     if request.method == 'POST':
         form = ExistingListItemForm(for_list=list_, data=request.POST)
-        if form.is_valid():
-            form.save()
-            return redirect(list_)
-    return render(request, 'list.html', {'list': list_, "form": form, 'share_form': ShareListForm()})
+        item = form.save() if form.is_valid() else None
+        if item is not None:
+            # back to the page with the new item on, not the first one
+            page_size = _page_size(request)
+            page = list_.items_page_holding(item, page_size=page_size)
+            if page.after is None:
+                return redirect(list_)
+            query = '?after=%d' % (page.after,)
+            if page_size != settings.LIST_ITEMS_PAGE_SIZE:
+                query += '&page_size=%d' % (page_size,)
+            return redirect(list_.get_absolute_url() + query)
+    context = _list_page_context(request, list_)
+    context.update({"form": form, 'share_form': ShareListForm()})
+    return render(request, 'list.html', context)
+
+def view_list_all(request, list_id):
+    list_ = _get_list(request, list_id)
+    page = render_to_string('list.html', {
+        'list': list_,
+        'streaming': True,
+        'list_version': get_list_version(list_.id),
+        'list_cache_timeout': settings.LIST_CACHE_TIMEOUT,
+        'form': ExistingListItemForm(for_list=list_),
+        'share_form': ShareListForm()}, request=request)
+    head, tail = page.split(ITEM_ROWS_PLACEHOLDER, 1)
+    return StreamingHttpResponse(_stream_list_page(head, list_, tail))
+
+def _stream_list_page(head, list_, tail):
+    yield head
+    for number, text in enumerate(list_.iter_item_texts(), start=1):
+        yield format_html(ITEM_ROW_HTML, number, text)
+    yield tail
+
+@require_POST
+def add_items_in_bulk(request, list_id):
+    list_ = _get_list(request, list_id)
+    if request.content_type == 'application/json':
+        try:
+            texts = json.loads(request.body.decode('utf-8'))['items']
+        except (ValueError, KeyError, TypeError):
+            return HttpResponseBadRequest('Expected a JSON object with an "items" list')
+        if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+            return HttpResponseBadRequest('"items" must be a list of strings')
+    else:
+        texts = request.POST.getlist('items')
+    results = list_.add_items(texts)
+    return JsonResponse({
+        'added': sum(1 for r in results if r['status'] == ITEM_ADDED),
+        'duplicates': sum(1 for r in results if r['status'] == ITEM_DUPLICATE),
+        'empty': sum(1 for r in results if r['status'] == ITEM_EMPTY),
+        'results': results,
+    })
+
+def _my_lists_state(request, email):
+    if getattr(request, '_my_lists_state', None) is None:
+        # the page names every list, and names are item text, so it's only
+        # for the user themselves; checked here, ahead of the ETag too
+        if not request.user.is_authenticated or request.user.email != email:
+            raise PermissionDenied
+        # an unsaved User is enough to stand for the email here
+        request._my_lists_state = List.objects.visible_to(User(email=email)).aggregate(
+            modified=Max('modified'), count=Count('id'))
+    return request._my_lists_state
+
+def my_lists_etag(request, email):
+    if not _can_revalidate(request):
+        return None
+    state = _my_lists_state(request, email)
+    modified = state['modified'].isoformat() if state['modified'] else ''
+    return _etag(email, modified, state['count'], _viewer(request))
 
+def my_lists_last_modified(request, email):
+    if not _can_revalidate(request) or request.user.is_authenticated:
+        return None
+    return _my_lists_state(request, email)['modified']
+
+@condition(etag_func=my_lists_etag, last_modified_func=my_lists_last_modified)
 def my_lists(request, email):
+    # the lists are only fetched if the fragment cache misses; any change
+    # to one of them moves their latest modified time on
+    state = _my_lists_state(request, email)
     owner = User.objects.get(email=email)
-    return render(request, 'my_lists.html', {'owner': owner})
+    return render(request, 'my_lists.html', {
+        'owner': owner,
+        'owned_lists': List.objects.owned_by(owner),
+        'shared_lists': List.objects.shared_with_user(owner),
+        'lists_modified': state['modified'],
+        'lists_count': state['count'],
+        'list_cache_timeout': settings.LIST_CACHE_TIMEOUT})
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    results = None
+    if query and request.user.is_authenticated:
+        results = search_items(request.user, query)
+    return render(request, 'search.html', {'query': query, 'results': results})
+
+def share_lists(request):
+    if not request.user.is_authenticated:
+        return redirect('/')
+    results = None
+    form = BatchShareForm(request.user)
+    if request.method == 'POST':
+        form = BatchShareForm(request.user, data=request.POST)
+        if form.is_valid():
+            results = form.save()
+            names = dict((list_.id, list_.name) for list_ in form.cleaned_data['lists'])
+            for result in results:
+                result['name'] = names[result['list']]
+    return render(request, 'share_lists.html', {'share_form': form, 'results': results})
 
 def share_list(request, list_id):
-    list_ = List.objects.get(id=list_id)
+    list_ = _get_list(request, list_id, allowed=can_share)
     if request.method == "POST":
         share_form = ShareListForm(list_, data=request.POST)
         if share_form.is_valid():
             share_form.save()
             return redirect(list_)
-        return render(request, 'list.html', {'list': list_, "form": ExistingListItemForm(for_list=list_), 'share_form':share_form})
+        context = _list_page_context(request, list_)
+        context.update({"form": ExistingListItemForm(for_list=list_), 'share_form': share_form})
+        return render(request, 'list.html', context)
     return redirect(list_)
@@ -0,0 +1,55 @@
+from superlists.backends.pool import get_pool
+
+
+class HealthCheckMixin(object):
+    """Checks a persistent connection still works the first time it's used
+    in each request, and reconnects if not, so a connection the server
+    dropped while we held it doesn't fail the request.
+
+    Turned on by CONN_HEALTH_CHECKS in the database's settings.
+    """
+    health_check_done = False
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        self.health_check_done = False
+
+    def ensure_connection(self):
+        if (self.connection is not None and not self.health_check_done and
+                self.settings_dict.get('CONN_HEALTH_CHECKS')):
+            self.health_check_done = True
+            if not self.in_atomic_block and not self.is_usable():
+                self.close()
+        super().ensure_connection()
+
+    def connect(self):
+        super().connect()
+        self.health_check_done = True
+
+
+class PooledConnectionMixin(object):
+    """Takes connections from, and closes them back into, a per-process pool
+    configured by the database's POOL settings.
+
+    Backends provide validate_raw_connection() to vet an idle connection
+    before it's handed out again.
+    """
+
+    @property
+    def pool(self):
+        return get_pool(self.alias, self.settings_dict.get('POOL') or {})
+
+    def validate_raw_connection(self, connection):
+        return True
+
+    def get_new_connection(self, conn_params):
+        return self.pool.acquire(
+            create=lambda: super(PooledConnectionMixin, self).get_new_connection(conn_params),
+            validate=self.validate_raw_connection)
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                # don't hand a half-finished transaction to the next user
+                self.connection.rollback()
+                self.pool.release(self.connection)
@@ -0,0 +1,71 @@
+import threading
+from time import time
+
+from django.utils.module_loading import import_string
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ConnectionPool(object):
+    """A per-process pool of raw DB-API connections.
+
+    Idle connections are handed out most-recently-used first, validated
+    before reuse, and dropped once they've sat idle for more than max_idle
+    seconds. At most max_size idle connections are kept.
+    """
+
+    def __init__(self, max_size=10, max_idle=300):
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def acquire(self, create, validate=None):
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                connection, released_at = self._idle.pop()
+            if time() - released_at > self.max_idle:
+                self._discard(connection)
+            elif validate is not None and not validate(connection):
+                self._discard(connection)
+            else:
+                return connection
+        return create()
+
+    def release(self, connection):
+        with self._lock:
+            if len(self._idle) < self.max_size:
+                self._idle.append((connection, time()))
+                return
+        self._discard(connection)
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection, _ in idle:
+            self._discard(connection)
+
+    def _discard(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def __len__(self):
+        return len(self._idle)
+
+
+def get_pool(alias, options):
+    """The pool for a database alias, built from its POOL settings:
+    CLASS (dotted path, defaults to ConnectionPool), MAX_SIZE, MAX_IDLE."""
+    with _pools_lock:
+        if alias not in _pools:
+            pool_class = import_string(
+                options.get('CLASS', 'superlists.backends.pool.ConnectionPool'))
+            _pools[alias] = pool_class(
+                max_size=options.get('MAX_SIZE', 10),
+                max_idle=options.get('MAX_IDLE', 300))
+        return _pools[alias]
@@ -0,0 +1,36 @@
+"""The stock PostgreSQL backend with connection health checks and a
+per-process connection pool (see superlists.backends.pool).
+
+    DATABASES = {'default': {
+        'ENGINE': 'superlists.backends.postgresql',
+        ...
+        'CONN_MAX_AGE': 0,
+        'CONN_HEALTH_CHECKS': True,
+        'POOL': {'MAX_SIZE': 10, 'MAX_IDLE': 300},
+    }}
+
+With a pool, CONN_MAX_AGE can stay at 0: closing a connection at the end of
+a request just returns it to the pool.
+"""
+from django.db.backends.postgresql import base
+
+from superlists.backends.mixins import HealthCheckMixin, PooledConnectionMixin
+
+
+class DatabaseWrapper(HealthCheckMixin, PooledConnectionMixin, base.DatabaseWrapper):
+
+    def validate_raw_connection(self, connection):
+        if connection.closed:
+            return False
+        try:
+            connection.cursor().execute('SELECT 1')
+        except base.Database.Error:
+            return False
+        return True
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        # a pooled connection skips the stock setup of isolation_level
+        self.isolation_level = self.settings_dict['OPTIONS'].get(
+            'isolation_level', connection.isolation_level)
+        return connection
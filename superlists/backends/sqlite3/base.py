@@ -0,0 +1,16 @@
+"""The stock sqlite3 backend, plus the performance pragmas in
+settings.SQLITE_PRAGMAS applied to every new connection, and connection
+health checks (see superlists.backends.mixins)."""
+from django.conf import settings
+from django.db.backends.sqlite3 import base
+
+from superlists.backends.mixins import HealthCheckMixin
+from superlists.backends.sqlite3.pragmas import apply_pragmas
+
+
+class DatabaseWrapper(HealthCheckMixin, base.DatabaseWrapper):
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        apply_pragmas(connection, getattr(settings, 'SQLITE_PRAGMAS', {}))
+        return connection
@@ -0,0 +1,47 @@
+import re
+
+# PRAGMA reads give these back as numbers
+NAMED_VALUES = {
+    'synchronous': {'OFF': 0, 'NORMAL': 1, 'FULL': 2, 'EXTRA': 3},
+    'temp_store': {'DEFAULT': 0, 'FILE': 1, 'MEMORY': 2},
+}
+PRAGMA_NAME = re.compile(r'^[a-z_]+$')
+PRAGMA_VALUE = re.compile(r'^-?\w+$')
+
+
+def _check(name, value):
+    if not PRAGMA_NAME.match(name) or not PRAGMA_VALUE.match(str(value)):
+        raise ValueError('Invalid SQLite pragma %s=%r' % (name, value))
+
+
+def apply_pragmas(connection, pragmas):
+    """Run PRAGMA name=value on a raw sqlite3 connection."""
+    cursor = connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            _check(name, value)
+            cursor.execute('PRAGMA %s = %s' % (name, value))
+    finally:
+        cursor.close()
+
+
+def read_pragma(cursor, name):
+    _check(name, 0)
+    cursor.execute('PRAGMA %s' % (name,))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def expected_value(name, value):
+    """The configured value in the form PRAGMA reads return it."""
+    if isinstance(value, str):
+        named = NAMED_VALUES.get(name, {})
+        if value.upper() in named:
+            return named[value.upper()]
+        if name == 'journal_mode':
+            return value.lower()
+        try:
+            return int(value)
+        except ValueError:
+            return value
+    return value
@@ -0,0 +1,101 @@
+"""In-process request metrics, exposed in the Prometheus text format.
+
+Each worker process keeps its own numbers; scrape every worker (or sum them
+on the Prometheus side) to see the whole site.
+"""
+from bisect import bisect_left
+import threading
+
+DURATION_BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{%s}' % ','.join(
+        '%s="%s"' % (name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+        for name, value in labels)
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter(object):
+    kind = 'counter'
+
+    def __init__(self):
+        self.value = 0
+
+    def observe(self, amount=1):
+        self.value += amount
+
+    def samples(self, name, labels):
+        yield name, labels, self.value
+
+
+class Histogram(object):
+    kind = 'histogram'
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            cumulative += count
+            yield name + '_bucket', labels + (('le', bound),), cumulative
+        yield name + '_sum', labels, self.sum
+        yield name + '_count', labels, self.count
+
+
+class Registry(object):
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _observe(self, name, help_text, factory, labels, value):
+        labels = tuple(sorted(labels.items()))
+        with self._lock:
+            family = self._metrics.setdefault(name, (help_text, factory().kind, {}))
+            series = family[2]
+            if labels not in series:
+                series[labels] = factory()
+            series[labels].observe(value)
+
+    def inc(self, name, help_text, labels, amount=1):
+        self._observe(name, help_text, Counter, labels, amount)
+
+    def observe(self, name, help_text, labels, value, buckets=DURATION_BUCKETS):
+        self._observe(name, help_text, lambda: Histogram(buckets), labels, value)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for name in sorted(self._metrics):
+                help_text, kind, series = self._metrics[name]
+                lines.append('# HELP %s %s' % (name, help_text))
+                lines.append('# TYPE %s %s' % (name, kind))
+                for labels in sorted(series):
+                    for sample, sample_labels, value in series[labels].samples(name, labels):
+                        lines.append('%s%s %s' % (
+                            sample, _format_labels(sample_labels), _format_value(value)))
+        return '\n'.join(lines) + '\n'
+
+    def clear(self):
+        with self._lock:
+            self._metrics.clear()
+
+
+registry = Registry()
@@ -0,0 +1,122 @@
+import logging
+import threading
+from time import time
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.utils import CursorWrapper
+
+from superlists.metrics import QUERY_COUNT_BUCKETS, SIZE_BUCKETS, registry
+
+logger = logging.getLogger(__name__)
+_local = threading.local()
+
+
+class RequestStats(object):
+
+    def __init__(self):
+        self.queries = []
+        self.db_time = 0.0
+        self.template_time = 0.0
+
+    def record_query(self, sql, duration):
+        self.queries.append((duration, sql))
+        self.db_time += duration
+
+    def slowest_queries(self, count):
+        return sorted(self.queries, key=lambda query: query[0], reverse=True)[:count]
+
+
+def record_template_time(duration):
+    stats = getattr(_local, 'stats', None)
+    if stats is not None:
+        stats.template_time += duration
+
+
+class TimedCursorWrapper(CursorWrapper):
+    """Times statements for the request being served, if any.
+
+    Much cheaper than turning on connection.queries: that path re-quotes
+    every parameter (with an extra query on sqlite) and keeps a log.
+    """
+
+    def execute(self, sql, params=None):
+        start = time()
+        try:
+            return super().execute(sql, params)
+        finally:
+            self._record(sql, time() - start)
+
+    def executemany(self, sql, param_list):
+        start = time()
+        try:
+            return super().executemany(sql, param_list)
+        finally:
+            self._record(sql, time() - start)
+
+    def _record(self, sql, duration):
+        stats = getattr(_local, 'stats', None)
+        if stats is not None:
+            stats.record_query(sql, duration)
+
+
+def instrument_connection(connection):
+    if getattr(connection, '_timed_cursors', False):
+        return
+    make_cursor = connection.make_cursor
+    make_debug_cursor = connection.make_debug_cursor
+    connection.make_cursor = lambda cursor: TimedCursorWrapper(make_cursor(cursor), connection)
+    connection.make_debug_cursor = lambda cursor: TimedCursorWrapper(make_debug_cursor(cursor), connection)
+    connection._timed_cursors = True
+
+
+class PerformanceMiddleware(object):
+    """Records wall time, query count, DB time, template time and response
+    size for every request, labelled by URL name, into superlists.metrics.
+    Requests slower than SLOW_REQUEST_THRESHOLD seconds are logged along
+    with their slowest SQL."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        for connection in connections.all():
+            instrument_connection(connection)
+        stats = _local.stats = request.performance_stats = RequestStats()
+        start = time()
+        try:
+            response = self.get_response(request)
+        finally:
+            _local.stats = None
+        duration = time() - start
+        self.record(request, response, stats, duration)
+        return response
+
+    def record(self, request, response, stats, duration):
+        match = getattr(request, 'resolver_match', None)
+        view = (match.url_name or match.view_name) if match else 'unresolved'
+        labels = {'view': view}
+        registry.inc('superlists_requests_total', 'Requests served',
+                     dict(labels, method=request.method, status=response.status_code))
+        registry.observe('superlists_request_duration_seconds',
+                         'Wall time spent in Django', labels, duration)
+        registry.observe('superlists_request_db_queries',
+                         'Database queries per request', labels, len(stats.queries),
+                         buckets=QUERY_COUNT_BUCKETS)
+        registry.observe('superlists_request_db_duration_seconds',
+                         'Database time per request', labels, stats.db_time)
+        registry.observe('superlists_request_template_duration_seconds',
+                         'Template rendering time per request', labels, stats.template_time)
+        if not response.streaming:
+            registry.observe('superlists_response_size_bytes',
+                             'Response body size', labels, len(response.content),
+                             buckets=SIZE_BUCKETS)
+
+        threshold = settings.SLOW_REQUEST_THRESHOLD
+        if threshold is not None and duration >= threshold:
+            logger.warning(
+                'Slow request: %s %s (%s) took %.3fs, %d queries in %.3fs, templates %.3fs%s',
+                request.method, request.path, view, duration,
+                len(stats.queries), stats.db_time, stats.template_time,
+                ''.join('\n  (%.3fs) %s' % query for query in
+                        stats.slowest_queries(settings.SLOW_REQUEST_LOGGED_QUERIES)))
@@ -0,0 +1,64 @@
+"""Catching queries that have lost their index.
+
+    class MyTest(QueryPlanMixin, TestCase):
+        def test_view(self):
+            with self.assertNoFullScans():
+                self.client.get('/lists/1/')
+
+captures the SQL run inside the block, asks SQLite for each SELECT's
+EXPLAIN QUERY PLAN and fails, printing the plans, if any of them reads a
+whole table. Plans depend on the data and on ANALYZE's statistics, so run
+it against a seeded database (benchmarks.seed) after ANALYZE, the way
+sqlite_maintenance leaves production.
+"""
+import contextlib
+import re
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+# "SCAN lists_item" or, before SQLite 3.36, "SCAN TABLE lists_item"; also
+# matches full index scans ("... USING INDEX"), which are just as slow.
+# Subqueries, constant rows and virtual tables (FTS5) aren't tables on disk.
+_FULL_SCAN_RE = re.compile(r'^SCAN (?:TABLE )?(?!CONSTANT ROW)(\w+)')
+
+
+def explain(sql):
+    """SQLite's query plan for an already-interpolated statement, as a
+    list of detail strings."""
+    # straight to the DB-API connection, so the EXPLAINs aren't themselves
+    # captured or counted
+    rows = connection.connection.execute('EXPLAIN QUERY PLAN ' + sql).fetchall()
+    return [row[-1] for row in rows]
+
+
+def full_scans(plan):
+    """The tables a plan reads in full."""
+    tables = []
+    for detail in plan:
+        match = _FULL_SCAN_RE.match(detail)
+        if match and 'VIRTUAL TABLE' not in detail:
+            tables.append(match.group(1))
+    return tables
+
+
+class QueryPlanMixin(object):
+
+    @contextlib.contextmanager
+    def assertNoFullScans(self, allow=()):
+        """Fails if a SELECT run inside the block scans a table not in
+        `allow`."""
+        with CaptureQueriesContext(connection) as captured:
+            yield captured
+        problems = []
+        for query in captured.captured_queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            plan = explain(sql)
+            scanned = [table for table in full_scans(plan) if table not in allow]
+            if scanned:
+                problems.append('%s\n  scans %s\n  %s' % (
+                    sql, ', '.join(scanned), '\n  '.join(plan)))
+        if problems:
+            self.fail('Full table scans:\n\n' + '\n\n'.join(problems))
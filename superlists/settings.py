@@ -34,6 +34,18 @@ EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_PASSWORD')
 EMAIL_USE_TLS = True
 EMAIL_PORT = 587
 
+# Outgoing mail is queued and sent by `manage.py send_queued_mail --loop`.
+# A failed message is retried after QUEUED_EMAIL_RETRY_DELAY seconds,
+# doubling each time, up to QUEUED_EMAIL_MAX_ATTEMPTS tries.
+QUEUED_EMAIL_RETRY_DELAY = 30
+QUEUED_EMAIL_MAX_ATTEMPTS = 5
+# A worker claims a batch for QUEUED_EMAIL_LEASE seconds; if it dies before
+# sending it, the messages are due again after that.
+QUEUED_EMAIL_LEASE = 5 * 60
+
+# Seconds a login link stays valid
+LOGIN_TOKEN_LIFETIME = 60 * 60
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -45,7 +57,8 @@ INSTALLED_APPS = [
     'django_extensions',
     'lists',
     'accounts',
-    'functional_tests'
+    'functional_tests',
+    'benchmarks',
 ]
 
 AUTH_USER_MODEL = 'accounts.User'
@@ -54,6 +67,7 @@ AUTHENTICATION_BACKENDS = [
 ]
 
 MIDDLEWARE = [
+    'superlists.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -65,12 +79,22 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'superlists.urls'
 
+# With DEBUG off (as the fabfile sets it in production) templates are
+# compiled once per process and kept, rather than read and parsed again on
+# every render.
+UNCACHED_TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'superlists.template_backend.DjangoTemplates',
         'DIRS': [],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': UNCACHED_TEMPLATE_LOADERS if DEBUG else [
+                ('django.template.loaders.cached.Loader', UNCACHED_TEMPLATE_LOADERS),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -89,11 +113,60 @@ WSGI_APPLICATION = 'superlists.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'superlists.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, '../database/db.sqlite3'),
+        # keep connections open across requests, checking they still work
+        # before reusing them. The gevent workers serving live updates set
+        # DJANGO_CONN_MAX_AGE=0: a greenlet's connection is never reused.
+        'CONN_MAX_AGE': int(os.environ.get('DJANGO_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Applied to every new SQLite connection. WAL lets readers carry on while a
+# gunicorn worker writes; busy_timeout (ms) makes a blocked writer wait
+# instead of failing with "database is locked". Check them with
+# `manage.py sqlite_maintenance --check`.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -20000,  # negative means KiB, so ~20MB
+    'temp_store': 'MEMORY',
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/1.10/topics/cache/
+# deploy_tools/fabfile.py switches production over to memcached, shared by
+# every gunicorn worker
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Seconds a rendered list fragment may live in the cache. Fragments are
+# keyed on the list's version (or, on my_lists, on the user's lists'
+# count and latest change), so this only bounds how long unreachable
+# ones linger.
+LIST_CACHE_TIMEOUT = 60 * 60
+
+# Seconds lists.permissions keeps the ids of the lists shared with a user.
+# Any change to their shares invalidates it.
+LIST_ACCESS_CACHE_TIMEOUT = 60 * 60
+
+# Sessions are read from the cache, falling back to the database, so most
+# requests don't touch the django_session table. Expired rows are removed by
+# `manage.py purge_sessions`.
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+# Seconds PasswordlessAuthenticationBackend.get_user keeps a user cached.
+# Saving or deleting the user invalidates it.
+USER_CACHE_TIMEOUT = 60 * 5
+
 
 # Password validation
 # https://docs.djangoproject.com/en/1.10/ref/settings/#auth-password-validators
@@ -134,6 +207,66 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.abspath(os.path.join(BASE_DIR, '../static'))
 
+# Performance metrics, served at /metrics in the Prometheus text format to
+# the IPs below or to requests carrying "Authorization: Bearer METRICS_TOKEN".
+# Behind nginx every request comes in over the unix socket with an empty
+# REMOTE_ADDR, so in production only the token works.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+
+# Requests slower than this many seconds are logged with their slowest SQL;
+# None turns the log off
+SLOW_REQUEST_THRESHOLD = 1.0
+SLOW_REQUEST_LOGGED_QUERIES = 5
+
+# Item pagination on the list page
+LIST_ITEMS_PAGE_SIZE = 100
+LIST_ITEMS_MAX_PAGE_SIZE = 1000
+LIST_ITEMS_STREAM_BATCH_SIZE = 500
+
+# Rows per INSERT / IN (...) lookup when adding items in bulk; keep under
+# sqlite's 999 bound parameter limit
+BULK_ITEMS_BATCH_SIZE = 400
+
+# Keep a set of hashes of each list's item texts in the cache, so bulk adds
+# only look up the texts a list might already have. Building it reads the
+# whole list once; every bulk add then rewrites it.
+CACHE_LIST_ITEM_TEXTS = False
+
+# Most lists one batch GET of /api/lists/?ids= may ask for
+LIST_API_MAX_BATCH = 100
+
+# Most lists, and most emails, one batch share may name
+BATCH_SHARE_MAX = 100
+
+# How long `manage.py compact_list_changes` keeps the change log clients
+# sync from; clients further behind than this get a full snapshot
+LIST_CHANGES_RETENTION_DAYS = 30
+
+# How long a list nobody owns or shares may go untouched before `manage.py
+# archive_lists` moves it into the archive
+ARCHIVE_LISTS_AFTER_DAYS = 90
+
+# Item search (lists/fts.py): 'auto' uses SQLite FTS5 where it's compiled
+# in and the ItemTerm index elsewhere; 'fts5' or 'terms' forces one.
+ITEM_SEARCH_BACKEND = 'auto'
+SEARCH_RESULTS_LIMIT = 50
+
+# Live list updates (lists/live.py). LocalBroker only reaches subscribers in
+# the same process; the fabfile switches production, which runs several
+# gunicorn workers, over to CacheBroker.
+LIVE_BROKER = 'lists.live.LocalBroker'
+# CacheBroker's seconds between looks at the cache
+LIVE_POLL_INTERVAL = 0.5
+# Longest a long-poll of /api/lists/<id>/changes/?wait= is held, kept under
+# nginx's 60s proxy_read_timeout
+LIVE_MAX_WAIT = 25
+# Event streams send a comment this often so proxies don't drop them, and
+# end after LIVE_STREAM_DURATION; browsers reconnect after LIVE_RETRY_MS
+LIVE_HEARTBEAT = 15
+LIVE_STREAM_DURATION = 5 * 60
+LIVE_RETRY_MS = 2000
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -147,6 +280,11 @@ LOGGING = {
         'django': {
             'handlers': ['console'],
         },
+        'superlists': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
     'root': {'level': 'INFO'},
 }
@@ -0,0 +1,73 @@
+"""Static files with content hashes in their names, pre-compressed.
+
+collectstatic writes each file under a name like base.5e0b8f4a3c1d.css and,
+next to the hashed copy, .gz (and .br, if the brotli package is installed)
+versions for nginx's gzip_static / brotli_static to send as they are. Since
+a changed file gets a new name, nginx can tell browsers to cache them
+forever (see deploy_tools/nginx.template.conf).
+"""
+import gzip
+import io
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# text formats; fonts like woff and images are compressed already
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.map', '.svg', '.html', '.txt', '.json', '.eot', '.ttf')
+
+# below this, the response headers outweigh what compression would save
+MIN_COMPRESS_SIZE = 256
+
+
+def gzip_compress(content):
+    # mtime=0 so the same input always gives the same bytes
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb', compresslevel=9, mtime=0) as f:
+        f.write(content)
+    return buffer.getvalue()
+
+
+def brotli_compress(content):
+    return brotli.compress(content)
+
+
+def compressors():
+    """(extension, function) for each encoding collectstatic writes."""
+    available = [('.gz', gzip_compress)]
+    if brotli is not None:
+        available.append(('.br', brotli_compress))
+    return available
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+
+    def post_process(self, paths, dry_run=False, **options):
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                self.compress(hashed_name, overwrite=processed)
+            yield name, hashed_name, processed
+
+    def compress(self, name, overwrite=False):
+        """Writes the compressed siblings of a collected file, skipping
+        any encoding that doesn't make it smaller."""
+        if os.path.splitext(name)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+            return
+        with self.open(name) as original:
+            content = original.read()
+        if len(content) < MIN_COMPRESS_SIZE:
+            return
+        for extension, compress in compressors():
+            compressed_name = name + extension
+            if self.exists(compressed_name):
+                if not overwrite:
+                    continue
+                self.delete(compressed_name)
+            compressed = compress(content)
+            if len(compressed) < len(content):
+                self._save(compressed_name, ContentFile(compressed))
@@ -0,0 +1,31 @@
+from time import time
+
+from django.template import TemplateDoesNotExist
+from django.template.backends import django as django_backend
+
+from superlists.middleware import record_template_time
+
+
+class Template(django_backend.Template):
+
+    def render(self, context=None, request=None):
+        start = time()
+        try:
+            return super().render(context, request)
+        finally:
+            record_template_time(time() - start)
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """The stock Django backend, timing each top-level render for the
+    performance middleware. Includes and {% extends %} are rendered by the
+    engine directly, so they're counted as part of their parent."""
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django_backend.reraise(exc, self)
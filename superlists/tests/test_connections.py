@@ -0,0 +1,69 @@
+import sqlite3
+from unittest.mock import Mock, patch
+from django.db import connection
+from django.test import SimpleTestCase, TransactionTestCase
+from superlists.backends.pool import ConnectionPool
+
+
+class ConnectionPoolTest(SimpleTestCase):
+
+    def test_creates_connection_when_pool_empty(self):
+        pool = ConnectionPool()
+        conn = pool.acquire(create=lambda: sqlite3.connect(':memory:'))
+        self.assertIsInstance(conn, sqlite3.Connection)
+
+    def test_reuses_released_connection(self):
+        pool = ConnectionPool()
+        conn = pool.acquire(create=lambda: sqlite3.connect(':memory:'))
+        pool.release(conn)
+        self.assertIs(pool.acquire(create=Mock()), conn)
+
+    def test_discards_connection_failing_validation(self):
+        pool = ConnectionPool()
+        stale = Mock()
+        pool.release(stale)
+        fresh = object()
+        self.assertIs(pool.acquire(create=lambda: fresh, validate=lambda c: False), fresh)
+        stale.close.assert_called_once_with()
+
+    def test_discards_connection_idle_too_long(self):
+        pool = ConnectionPool(max_idle=-1)
+        stale = Mock()
+        pool.release(stale)
+        fresh = object()
+        self.assertIs(pool.acquire(create=lambda: fresh), fresh)
+        stale.close.assert_called_once_with()
+
+    def test_keeps_at_most_max_size_idle(self):
+        pool = ConnectionPool(max_size=2)
+        extra = Mock()
+        for conn in (Mock(), Mock(), extra):
+            pool.release(conn)
+        self.assertEqual(len(pool), 2)
+        extra.close.assert_called_once_with()
+
+
+class HealthCheckTest(TransactionTestCase):
+
+    def test_unusable_connection_is_closed_before_reuse(self):
+        connection.ensure_connection()
+        connection.close_if_unusable_or_obsolete()
+        with patch.object(connection, 'is_usable', return_value=False), \
+                patch.object(connection, 'close') as close:
+            connection.ensure_connection()
+        close.assert_called_once_with()
+
+    def test_usable_connection_is_kept(self):
+        connection.ensure_connection()
+        old = connection.connection
+        connection.close_if_unusable_or_obsolete()
+        connection.ensure_connection()
+        self.assertIs(connection.connection, old)
+
+    def test_checks_only_once_per_request(self):
+        connection.ensure_connection()
+        connection.close_if_unusable_or_obsolete()
+        with patch.object(connection, 'is_usable', return_value=True) as is_usable:
+            connection.ensure_connection()
+            connection.ensure_connection()
+        self.assertEqual(is_usable.call_count, 1)
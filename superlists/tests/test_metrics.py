@@ -0,0 +1,30 @@
+from django.test import SimpleTestCase
+from superlists.metrics import Registry
+
+
+class RegistryTest(SimpleTestCase):
+
+    def test_renders_counter(self):
+        registry = Registry()
+        registry.inc('hits_total', 'Hits', {'view': 'home'})
+        registry.inc('hits_total', 'Hits', {'view': 'home'})
+        output = registry.render()
+        self.assertIn('# TYPE hits_total counter', output)
+        self.assertIn('hits_total{view="home"} 2', output)
+
+    def test_renders_cumulative_histogram_buckets(self):
+        registry = Registry()
+        for value in (0.5, 1.5, 1.5, 10):
+            registry.observe('took_seconds', 'Took', {}, value, buckets=(1, 2))
+        output = registry.render()
+        self.assertIn('# TYPE took_seconds histogram', output)
+        self.assertIn('took_seconds_bucket{le="1"} 1', output)
+        self.assertIn('took_seconds_bucket{le="2"} 3', output)
+        self.assertIn('took_seconds_bucket{le="+Inf"} 4', output)
+        self.assertIn('took_seconds_sum 13.5', output)
+        self.assertIn('took_seconds_count 4', output)
+
+    def test_escapes_label_values(self):
+        registry = Registry()
+        registry.inc('hits_total', 'Hits', {'view': 'say "hi"'})
+        self.assertIn('hits_total{view="say \\"hi\\""} 1', registry.render())
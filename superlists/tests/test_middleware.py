@@ -0,0 +1,74 @@
+import re
+from django.test import TestCase, override_settings
+from lists.models import List
+from superlists.metrics import registry
+
+
+def sample(name, **labels):
+    pattern = r'^%s\{%s\} (\S+)$' % (
+        re.escape(name),
+        ','.join('%s="%s"' % (k, re.escape(str(v))) for k, v in sorted(labels.items())))
+    match = re.search(pattern, registry.render(), re.MULTILINE)
+    return float(match.group(1)) if match else None
+
+
+class PerformanceMiddlewareTest(TestCase):
+
+    def setUp(self):
+        registry.clear()
+
+    def test_counts_requests_by_url_name(self):
+        list_ = List.create_new('item')
+        self.client.get('/lists/%d/' % (list_.id,))
+        self.client.get('/lists/%d/' % (list_.id,))
+        self.assertEqual(sample(
+            'superlists_requests_total',
+            method='GET', status=200, view='view_list'), 2)
+
+    def test_records_query_count(self):
+        list_ = List.create_new('item')
+        with self.assertNumQueries(3):
+            self.client.get('/lists/%d/' % (list_.id,))
+        self.assertEqual(sample(
+            'superlists_request_db_queries_sum', view='view_list'), 3)
+
+    def test_records_template_time_and_response_size(self):
+        self.client.get('/')
+        self.assertEqual(sample(
+            'superlists_request_template_duration_seconds_count', view='home'), 1)
+        self.assertGreater(sample(
+            'superlists_response_size_bytes_sum', view='home'), 0)
+
+    @override_settings(SLOW_REQUEST_THRESHOLD=0)
+    def test_logs_slow_requests_with_their_sql(self):
+        list_ = List.create_new('item')
+        with self.assertLogs('superlists.middleware', 'WARNING') as logs:
+            self.client.get('/lists/%d/' % (list_.id,))
+        self.assertIn('Slow request: GET', logs.output[0])
+        self.assertIn('lists_list', logs.output[0])
+
+
+class MetricsViewTest(TestCase):
+
+    def test_served_to_allowed_ip(self):
+        self.client.get('/')
+        response = self.client.get('/metrics', REMOTE_ADDR='127.0.0.1')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'superlists_requests_total', response.content)
+
+    @override_settings(METRICS_TOKEN=None)
+    def test_hidden_from_other_ips(self):
+        response = self.client.get('/metrics', REMOTE_ADDR='')
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(METRICS_TOKEN='s3cret')
+    def test_served_with_bearer_token(self):
+        response = self.client.get(
+            '/metrics', REMOTE_ADDR='', HTTP_AUTHORIZATION='Bearer s3cret')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(METRICS_TOKEN='s3cret')
+    def test_wrong_token_refused(self):
+        response = self.client.get(
+            '/metrics', REMOTE_ADDR='', HTTP_AUTHORIZATION='Bearer nope')
+        self.assertEqual(response.status_code, 404)
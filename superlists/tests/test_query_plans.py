@@ -0,0 +1,79 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from benchmarks.seed import seed
+from lists.models import List
+from superlists.query_plans import QueryPlanMixin, explain, full_scans
+
+User = get_user_model()
+
+
+class FullScansTest(TestCase):
+
+    def test_spots_table_and_index_scans(self):
+        self.assertEqual(full_scans([
+            'SCAN lists_item',
+            'SCAN TABLE lists_list USING INDEX lists_list_owner',
+            'SEARCH accounts_user USING INDEX sqlite_autoindex (email=?)',
+            'SCAN lists_item_fts VIRTUAL TABLE INDEX 0:M2',
+            'SCAN (subquery-2)',
+            'SCAN CONSTANT ROW',
+        ]), ['lists_item', 'lists_list'])
+
+    def test_explains_real_queries(self):
+        self.assertEqual(full_scans(explain('SELECT * FROM lists_item')), ['lists_item'])
+        self.assertEqual(full_scans(explain('SELECT * FROM lists_item WHERE id = 1')), [])
+
+
+class HotQueryPlanTest(QueryPlanMixin, TestCase):
+    """The queries behind the busiest pages, planned against a seeded
+    database the way production's statistics would see it."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = seed(users=200, lists_per_user=5, items_per_list=5, share_ratio=0.3)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def setUp(self):
+        self.list_id = self.dataset['list_ids'][7]
+        self.email = List.objects.get(id=self.list_id).owner_id
+        self.client.force_login(User.objects.get(email=self.email))
+
+    def test_home_page(self):
+        with self.assertNoFullScans():
+            self.client.get('/')
+
+    def test_view_list(self):
+        with self.assertNoFullScans():
+            self.client.get('/lists/%d/' % (self.list_id,))
+            self.client.get('/lists/%d/?page_size=10&after=1' % (self.list_id,))
+
+    def test_add_item(self):
+        with self.assertNoFullScans():
+            self.client.post('/lists/%d/' % (self.list_id,), {'text': 'a new item'})
+
+    def test_new_list(self):
+        with self.assertNoFullScans():
+            self.client.post('/lists/new', {'text': 'a new list'})
+
+    def test_my_lists(self):
+        with self.assertNoFullScans():
+            self.client.get('/lists/users/%s/' % (self.email,))
+
+    def test_share_list(self):
+        other = self.dataset['emails'][-1]
+        with self.assertNoFullScans():
+            self.client.post('/lists/%d/share' % (self.list_id,), {'share_with': other})
+
+    def test_api(self):
+        ids = ','.join(str(id_) for id_ in self.dataset['list_ids'][:20])
+        with self.assertNoFullScans():
+            self.client.get('/api/lists/?ids=%s' % (ids,))
+            self.client.get('/api/lists/')
+            self.client.get('/api/lists/%d/items/?page_size=10' % (self.list_id,))
+            self.client.get('/api/lists/%d/changes/?since=0' % (self.list_id,))
+
+    def test_search(self):
+        with self.assertNoFullScans():
+            self.client.get('/api/search/?q=milk')
@@ -0,0 +1,59 @@
+from io import StringIO
+import os
+import sqlite3
+import tempfile
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from superlists.backends.sqlite3.pragmas import apply_pragmas, expected_value, read_pragma
+
+
+class ApplyPragmasTest(SimpleTestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(fd)
+        self.conn = sqlite3.connect(self.path)
+
+    def tearDown(self):
+        self.conn.close()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
+
+    def test_applies_each_pragma(self):
+        apply_pragmas(self.conn, {
+            'journal_mode': 'WAL', 'synchronous': 'NORMAL',
+            'busy_timeout': 1234, 'temp_store': 'MEMORY'})
+        cursor = self.conn.cursor()
+        self.assertEqual(read_pragma(cursor, 'journal_mode'), 'wal')
+        self.assertEqual(read_pragma(cursor, 'synchronous'), 1)
+        self.assertEqual(read_pragma(cursor, 'busy_timeout'), 1234)
+        self.assertEqual(read_pragma(cursor, 'temp_store'), 2)
+
+    def test_rejects_suspicious_values(self):
+        with self.assertRaises(ValueError):
+            apply_pragmas(self.conn, {'cache_size': '1; DROP TABLE x'})
+
+
+class ExpectedValueTest(SimpleTestCase):
+
+    def test_translates_named_values(self):
+        self.assertEqual(expected_value('synchronous', 'normal'), 1)
+        self.assertEqual(expected_value('temp_store', 'MEMORY'), 2)
+        self.assertEqual(expected_value('journal_mode', 'WAL'), 'wal')
+        self.assertEqual(expected_value('cache_size', -2000), -2000)
+
+
+class BackendTest(TestCase):
+
+    def test_new_connections_get_configured_pragmas(self):
+        with connection.cursor() as cursor:
+            self.assertEqual(read_pragma(cursor, 'busy_timeout'), 5000)
+            self.assertEqual(read_pragma(cursor, 'temp_store'), 2)
+
+    def test_maintenance_command_reports_pragmas(self):
+        out = StringIO()
+        call_command('sqlite_maintenance', analyze=True, optimize=True, stdout=out)
+        self.assertIn('busy_timeout', out.getvalue())
+        self.assertIn('analyze: done', out.getvalue())
@@ -0,0 +1,101 @@
+import gzip
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import skipIf
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from superlists import storage
+
+STORAGE = 'superlists.storage.CompressedManifestStaticFilesStorage'
+
+
+class CollectedStaticTestMixin(object):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.static_root = tempfile.mkdtemp()
+        cls._settings = override_settings(STATIC_ROOT=cls.static_root, STATICFILES_STORAGE=STORAGE)
+        cls._settings.enable()
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._settings.disable()
+        shutil.rmtree(cls.static_root)
+        super().tearDownClass()
+
+    def collected(self, name):
+        return os.path.join(self.static_root, name)
+
+
+class CompressedManifestStorageTest(CollectedStaticTestMixin, SimpleTestCase):
+
+    def test_hashes_file_names(self):
+        name = staticfiles_storage.stored_name('list.js')
+        self.assertRegex(name, r'^list\.[0-9a-f]{12}\.js$')
+        self.assertTrue(os.path.exists(self.collected(name)))
+
+    def test_writes_gzipped_copy_of_hashed_file(self):
+        name = staticfiles_storage.stored_name('jquery-3.1.1.js')
+        with open(self.collected(name), 'rb') as f:
+            original = f.read()
+        with gzip.open(self.collected(name + '.gz')) as f:
+            self.assertEqual(f.read(), original)
+        self.assertLess(os.path.getsize(self.collected(name + '.gz')), len(original))
+
+    @skipIf(storage.brotli is None, 'brotli is not installed')
+    def test_writes_brotli_copy_of_hashed_file(self):
+        name = staticfiles_storage.stored_name('jquery-3.1.1.js')
+        self.assertTrue(os.path.exists(self.collected(name + '.br')))
+
+    def test_leaves_compressed_formats_alone(self):
+        name = staticfiles_storage.stored_name('bootstrap/fonts/glyphicons-halflings-regular.woff2')
+        self.assertTrue(os.path.exists(self.collected(name)))
+        self.assertFalse(os.path.exists(self.collected(name + '.gz')))
+
+    def test_gzip_output_is_reproducible(self):
+        content = b'body { color: red; }' * 50
+        self.assertEqual(storage.gzip_compress(content), storage.gzip_compress(content))
+
+
+class StaticTemplateTest(CollectedStaticTestMixin, TestCase):
+
+    def test_pages_link_to_hashed_files(self):
+        response = self.client.get('/')
+        self.assertContains(response, staticfiles_storage.url('base.css'))
+        self.assertContains(response, staticfiles_storage.url('jquery-3.1.1.js'))
+        self.assertNotContains(response, '"/static/base.css"')
+
+
+class StaticReportTest(CollectedStaticTestMixin, SimpleTestCase):
+
+    def test_reports_assets_base_html_links_to(self):
+        out = StringIO()
+        call_command('static_report', stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(
+            [line.split()[0] for line in lines],
+            ['bootstrap/css/bootstrap.min.css', 'base.css', 'jquery-3.1.1.js', 'list.js', 'total'])
+        self.assertIn(staticfiles_storage.stored_name('list.js'), lines[3])
+
+    def sizes(self, path, encodings):
+        name = staticfiles_storage.stored_name(path)
+        return [os.path.getsize(self.collected(name + ext))
+                for ext in encodings if os.path.exists(self.collected(name + ext))]
+
+    def test_sent_size_is_gzip_as_nginx_serves_no_brotli(self):
+        out = StringIO()
+        call_command('static_report', 'jquery-3.1.1.js', stdout=out)
+        self.assertIn(
+            'sent %9d' % (min(self.sizes('jquery-3.1.1.js', ('', '.gz'))),), out.getvalue())
+
+    def test_sent_size_counts_brotli_when_asked(self):
+        out = StringIO()
+        call_command('static_report', 'jquery-3.1.1.js', brotli=True, stdout=out)
+        self.assertIn(
+            'sent %9d' % (min(self.sizes('jquery-3.1.1.js', ('', '.gz', '.br'))),),
+            out.getvalue())
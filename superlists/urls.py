@@ -17,10 +17,14 @@ from django.conf.urls import include, url
 from django.contrib import admin
 from lists import views as list_views
 from lists import urls as list_urls
+from lists import api_urls
 from accounts import urls as account_urls
+from superlists import views as superlists_views
 
 urlpatterns = [
     url(r'^$', list_views.home_page, name='home'),
     url(r'^lists/', include(list_urls)),
     url(r'^accounts/', include(account_urls)),
+    url(r'^api/', include(api_urls)),
+    url(r'^metrics$', superlists_views.metrics, name='metrics'),
 ]
@@ -0,0 +1,23 @@
+import hmac
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+
+from superlists.metrics import registry
+
+
+def _metrics_allowed(request):
+    if request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS:
+        return True
+    token = settings.METRICS_TOKEN
+    if not token:
+        return False
+    supplied = request.META.get('HTTP_AUTHORIZATION', '')
+    return hmac.compare_digest(supplied.encode(), ('Bearer ' + token).encode())
+
+
+def metrics(request):
+    # a 404 rather than a 403 so the endpoint doesn't advertise itself
+    if not _metrics_allowed(request):
+        raise Http404
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4')